@@ -0,0 +1,146 @@
+"""
+Configuración de la aplicación desde variables de entorno
+"""
+
+import os
+
+
+def _entero(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, "") else defecto
+
+
+def _decimal(nombre: str, defecto: float) -> float:
+    valor = os.getenv(nombre)
+    return float(valor) if valor not in (None, "") else defecto
+
+
+def _booleano(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor in (None, ""):
+        return defecto
+    return valor.strip().lower() in ("1", "true", "yes", "si", "on")
+
+
+class Settings:
+    """Valores de configuración (ver .env.example)"""
+
+    def __init__(self):
+        # Base de datos y servidor
+        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./usuarios.db")
+        self.host = os.getenv("HOST", "127.0.0.1")
+        self.port = _entero("PORT", 8000)
+        self.debug = _booleano("DEBUG", True)
+        # Reconstruir el manifiesto de estáticos si cambian los archivos (solo
+        # desarrollo: revisa el directorio una vez por segundo)
+        self.static_reload = _booleano("STATIC_RELOAD", self.debug)
+        # Workers en modo producción (0 = uno por CPU)
+        self.workers = _entero("WORKERS", 0)
+        # Segundos para terminar las peticiones en curso al apagar
+        self.shutdown_timeout = _entero("SHUTDOWN_TIMEOUT", 10)
+
+        # SQLite compartido entre procesos: WAL y espera ante bloqueos
+        self.sqlite_wal = _booleano("SQLITE_WAL", True)
+        self.sqlite_busy_timeout_ms = _entero("SQLITE_BUSY_TIMEOUT_MS", 5000)
+        # Archivo con la versión de datos común a todos los workers (vacío = por proceso)
+        self.data_version_file = os.getenv("DATA_VERSION_FILE", "")
+        # Archivo por el que los workers se reenvían los eventos del feed SSE (vacío = por proceso)
+        self.events_file = os.getenv("EVENTS_FILE", "")
+
+        # Usuarios repartidos por hash en varios archivos SQLite (0 = una sola BD)
+        self.shard_count = _entero("SHARD_COUNT", 0)
+        self.shard_path_template = os.getenv("SHARD_PATH_TEMPLATE", "./usuarios_{n}.db")
+
+        # Motor de usuarios: "sqlalchemy" (BD/fragmentos) o "memoria" (un solo proceso,
+        # log de escrituras e instantáneas periódicas en MEMORY_SNAPSHOT_PATH)
+        self.user_repository = os.getenv("USER_REPOSITORY", "sqlalchemy")
+        self.memory_snapshot_path = os.getenv("MEMORY_SNAPSHOT_PATH", "./usuarios_memoria.db")
+        self.memory_snapshot_interval = _decimal("MEMORY_SNAPSHOT_INTERVAL", 30.0)
+        self.memory_wal_fsync = _booleano("MEMORY_WAL_FSYNC", False)
+
+        # Zonas horarias (IANA, separadas por comas) con resumen diario de
+        # registros además de UTC; las demás se calculan desde el resumen por hora
+        self.signup_rollup_zones = os.getenv("SIGNUP_ROLLUP_ZONES", "")
+
+        # Logs de la app: nivel, archivo en líneas JSON (vacío = solo consola),
+        # registros recientes en memoria y lectura máxima del final del archivo
+        self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        self.log_file = os.getenv("LOG_FILE", "")
+        self.log_buffer_size = _entero("LOG_BUFFER_SIZE", 2000)
+        self.log_tail_max_mb = _entero("LOG_TAIL_MAX_MB", 16)
+        # Cola entre quien loguea y el hilo escritor: capacidad (llena = se
+        # descarta), 1 de cada N DEBUG/INFO con la cola al 80 %, y una línea
+        # de acceso por petición con su id
+        self.log_queue_size = _entero("LOG_QUEUE_SIZE", 10000)
+        self.log_sample_every = _entero("LOG_SAMPLE_EVERY", 10)
+        self.log_access = _booleano("LOG_ACCESS", True)
+
+        # Mantenimiento de SQLite en segundo plano: segundos entre ejecuciones
+        # de cada tarea (0 = nunca), ventana UTC "HH:MM-HH:MM" para ANALYZE y
+        # vacuum (vacía = cualquier hora) y peticiones en curso por encima de
+        # las cuales se posterga. El archivo de estado (por defecto junto a la
+        # BD) coordina a los workers
+        self.maintenance_enabled = _booleano("MAINTENANCE_ENABLED", True)
+        self.maintenance_tick_seconds = _decimal("MAINTENANCE_TICK_SECONDS", 60.0)
+        self.maintenance_optimize_interval = _decimal("MAINTENANCE_OPTIMIZE_INTERVAL", 3600.0)
+        self.maintenance_checkpoint_interval = _decimal("MAINTENANCE_CHECKPOINT_INTERVAL", 300.0)
+        self.maintenance_analyze_interval = _decimal("MAINTENANCE_ANALYZE_INTERVAL", 86400.0)
+        self.maintenance_vacuum_interval = _decimal("MAINTENANCE_VACUUM_INTERVAL", 21600.0)
+        self.maintenance_window = os.getenv("MAINTENANCE_WINDOW", "")
+        self.maintenance_max_active = _entero("MAINTENANCE_MAX_ACTIVE", 2)
+        self.maintenance_analysis_limit = _entero("MAINTENANCE_ANALYSIS_LIMIT", 1000)
+        self.maintenance_vacuum_pages = _entero("MAINTENANCE_VACUUM_PAGES", 5000)
+        self.maintenance_state_file = os.getenv("MAINTENANCE_STATE_FILE", "")
+
+        # Token para endpoints de administración (vacío = deshabilitados)
+        self.admin_token = os.getenv("ADMIN_TOKEN", "")
+
+        # Consultas SQL ad hoc (/api/admin/sql): tiempo de SQLite, máximo de
+        # filas, conexiones de solo lectura por archivo y planes en caché
+        self.adhoc_sql_timeout_ms = _entero("ADHOC_SQL_TIMEOUT_MS", 2000)
+        self.adhoc_sql_max_rows = _entero("ADHOC_SQL_MAX_ROWS", 10000)
+        self.adhoc_sql_connections = _entero("ADHOC_SQL_CONNECTIONS", 2)
+        self.adhoc_sql_cache_size = _entero("ADHOC_SQL_CACHE_SIZE", 128)
+
+        # Ejecutar las lecturas frecuentes al arrancar para calentar cachés
+        self.startup_warmup = _booleano("STARTUP_WARMUP", True)
+
+        # Incluir estadísticas y primera página de usuarios en index.html
+        self.bootstrap_enabled = _booleano("BOOTSTRAP_ENABLED", True)
+
+        # Compresión de respuestas: umbral, perfil por defecto y perfiles por ruta
+        self.compression_enabled = _booleano("COMPRESSION_ENABLED", True)
+        self.compression_min_bytes = _entero("COMPRESSION_MIN_BYTES", 1024)
+        self.compression_profile = os.getenv("COMPRESSION_PROFILE", "equilibrado")
+        self.compression_route_profiles = os.getenv("COMPRESSION_ROUTE_PROFILES", "/api/eventos=rapido")
+
+        # Control de admisión: peticiones simultáneas y en cola por clase de ruta
+        self.admission_enabled = _booleano("ADMISSION_ENABLED", True)
+        self.admission_read_concurrency = _entero("ADMISSION_READ_CONCURRENCY", 32)
+        self.admission_read_queue = _entero("ADMISSION_READ_QUEUE", 128)
+        self.admission_write_concurrency = _entero("ADMISSION_WRITE_CONCURRENCY", 4)
+        self.admission_write_queue = _entero("ADMISSION_WRITE_QUEUE", 64)
+        self.admission_queue_timeout = _decimal("ADMISSION_QUEUE_TIMEOUT", 2.0)
+        self.admission_retry_after = _entero("ADMISSION_RETRY_AFTER", 1)
+
+        # Métricas: con varios workers, directorio compartido para sumarlas
+        self.metrics_enabled = _booleano("METRICS_ENABLED", True)
+        self.metrics_multiproc_dir = os.getenv("METRICS_MULTIPROC_DIR", "")
+        self.metrics_flush_interval = _decimal("METRICS_FLUSH_INTERVAL", 5.0)
+
+        # Instrumentación SQL: umbral de consulta lenta, valores de los
+        # parámetros en consultas lentas (por defecto solo sus tipos: llevan
+        # emails y nombres) y máximo de consultas por petición antes de
+        # marcarla como posible N+1
+        self.sql_slow_query_ms = _decimal("SQL_SLOW_QUERY_MS", 100.0)
+        self.sql_log_parameters = _booleano("SQL_LOG_PARAMETERS", False)
+        self.sql_max_queries_read = _entero("SQL_MAX_QUERIES_READ", 2)
+        self.sql_max_queries_write = _entero("SQL_MAX_QUERIES_WRITE", 4)
+
+        # Captura de tráfico para reproducirlo (vacío = deshabilitada)
+        self.traffic_capture_file = os.getenv("TRAFFIC_CAPTURE_FILE", "")
+        self.traffic_capture_sample_rate = _decimal("TRAFFIC_CAPTURE_SAMPLE_RATE", 1.0)
+        self.traffic_capture_max_mb = _entero("TRAFFIC_CAPTURE_MAX_MB", 100)
+
+
+settings = Settings()
@@ -0,0 +1,8 @@
+"""
+Componentes transversales de la aplicación (caché HTTP, versionado, eventos)
+"""
+
+from .versioning import data_version, CacheCondicional
+from .events import broadcaster
+
+__all__ = ["data_version", "CacheCondicional", "broadcaster"]
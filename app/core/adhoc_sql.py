@@ -0,0 +1,341 @@
+"""
+Consultas SQL ad hoc de solo lectura con tiempo, filas y concurrencia acotados
+"""
+
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.database import rutas_sqlite
+
+logger = logging.getLogger("app.sql.adhoc")
+
+# Filas leídas de SQLite por paso del streaming
+LOTE = 500
+# Instrucciones de la VM de SQLite entre comprobaciones del tiempo límite
+PASOS_PROGRESO = 1000
+# Segundos que una petición espera una conexión libre antes de responder 503
+ESPERA_CONEXION = 1.0
+
+# Solo lectura de tablas y funciones: ni PRAGMA, ni ATTACH, ni escrituras
+_PERMITIDAS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# Literales de texto (se conservan), comentarios (se quitan) y espacios (se colapsan)
+_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|(?:\s|--[^\n]*|/\*.*?\*/)+", re.S)
+
+
+class ConsultaRechazada(Exception):
+    """SQL inválido, con varias sentencias o que intenta algo distinto de leer"""
+
+
+class ConsultaInterrumpida(Exception):
+    """La consulta agotó su tiempo de SQLite"""
+
+
+class SinConexionLibre(Exception):
+    """No hay conexión disponible: todas ocupadas o el archivo no se puede abrir"""
+
+
+def normalizar(sql: str) -> str:
+    """Sin comentarios, espacios colapsados y sin `;` final: la clave de las cachés"""
+    return _TOKENS.sub(lambda m: m.group(1) or " ", sql).strip().rstrip(";").strip()
+
+
+def rutas_consultables() -> List[str]:
+    """Archivos SQLite del motor configurado (la instantánea en modo memoria)"""
+    if settings.user_repository == "memoria":
+        return [settings.memory_snapshot_path]
+    return rutas_sqlite()
+
+
+def _autorizar(accion, *args) -> int:
+    return sqlite3.SQLITE_OK if accion in _PERMITIDAS else sqlite3.SQLITE_DENY
+
+
+def _json(valor):
+    return valor.hex() if isinstance(valor, bytes) else str(valor)
+
+
+class _Limite:
+    """Tiempo de SQLite restante; el progress handler interrumpe al agotarse"""
+
+    def __init__(self, segundos: float):
+        self.restante = segundos
+        self.hasta = 0.0
+        self.agotado = False
+
+    def __call__(self) -> int:
+        if time.perf_counter() > self.hasta:
+            self.agotado = True
+            return 1
+        return 0
+
+    def medir(self, funcion, *args):
+        """Ejecutar `funcion` descontando del tiempo solo lo que pasa dentro de SQLite"""
+        inicio = time.perf_counter()
+        self.hasta = inicio + self.restante
+        try:
+            return funcion(*args)
+        finally:
+            self.restante -= time.perf_counter() - inicio
+
+
+class LineasNDJSON:
+    """
+    Iterador de la respuesta que devuelve la conexión exactamente una vez
+
+    Al agotarse, al cerrarse o al ser recolectado: si el cliente se
+    desconecta antes del primer trozo, el generador nunca llega a su
+    `finally` y sin esto la conexión quedaría tomada.
+    """
+
+    def __init__(self, lineas: Iterator[str], liberar: Callable[[], None]):
+        self._lineas = lineas
+        self._liberar: Optional[Callable[[], None]] = liberar
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._lineas)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        self._lineas.close()
+        liberar, self._liberar = self._liberar, None
+        if liberar is not None:
+            liberar()
+
+    def __del__(self):
+        self.close()
+
+
+class ConsultasAdHoc:
+    """
+    Ejecutor de SELECT arbitrarios para análisis, sin poner en riesgo el worker
+
+    - Conexiones propias abiertas con `mode=ro` y `query_only`, y un
+      autorizador que solo permite leer: ni escrituras, ni PRAGMA, ni ATTACH.
+    - Un progress handler interrumpe la consulta cuando agota su tiempo de
+      SQLite (el que espera un cliente lento leyendo la respuesta no cuenta).
+    - Máximo de filas por consulta, leídas por lotes para el streaming: la
+      respuesta nunca está entera en memoria.
+    - Pocas conexiones por archivo: si están todas ocupadas se responde 503
+      en lugar de acumular consultas pesadas.
+    - Por SQL normalizado se guarda su `EXPLAIN QUERY PLAN`; y como lo que se
+      ejecuta es el texto normalizado, la caché de sentencias de sqlite3
+      reutiliza la sentencia preparada aunque cambien espacios o comentarios.
+    """
+
+    def __init__(self, rutas=rutas_consultables):
+        self._rutas = rutas
+        self._pools: dict = {}
+        self._abiertas: dict = {}
+        self._planes: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.repetidas = 0
+        self.rechazadas = 0
+        self.interrumpidas = 0
+        self.truncadas = 0
+        self.sin_conexion = 0
+
+    def rutas(self) -> List[str]:
+        return self._rutas()
+
+    # ---- conexiones ----
+
+    def _abrir(self, ruta: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{Path(ruta).resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=settings.adhoc_sql_cache_size,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.set_authorizer(_autorizar)
+        return conn
+
+    def _tomar(self, ruta: str) -> sqlite3.Connection:
+        with self._lock:
+            pool = self._pools.setdefault(ruta, queue.LifoQueue())
+            if pool.empty() and self._abiertas.get(ruta, 0) < settings.adhoc_sql_connections:
+                self._abiertas[ruta] = self._abiertas.get(ruta, 0) + 1
+                nueva = True
+            else:
+                nueva = False
+        if nueva:
+            try:
+                return self._abrir(ruta)
+            except sqlite3.Error as error:
+                with self._lock:
+                    self._abiertas[ruta] -= 1
+                raise SinConexionLibre(f"No se pudo abrir {ruta}: {error}")
+        try:
+            return pool.get(timeout=ESPERA_CONEXION)
+        except queue.Empty:
+            with self._lock:
+                self.sin_conexion += 1
+            raise SinConexionLibre("Todas las conexiones de consultas ad hoc están ocupadas")
+
+    def _devolver(self, ruta: str, conn: sqlite3.Connection):
+        conn.set_progress_handler(None, 0)
+        self._pools[ruta].put(conn)
+
+    def cerrar(self):
+        """Cerrar las conexiones libres (las que están en uso se cierran al devolverse)"""
+        with self._lock:
+            for ruta, pool in self._pools.items():
+                while not pool.empty():
+                    pool.get_nowait().close()
+                    self._abiertas[ruta] -= 1
+
+    # ---- ejecución ----
+
+    def _plan(self, conn: sqlite3.Connection, sql: str) -> Tuple[List[str], bool]:
+        with self._lock:
+            plan = self._planes.get(sql)
+            if plan is not None:
+                self._planes.move_to_end(sql)
+                self.repetidas += 1
+                return plan, True
+        plan = [fila[-1] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        with self._lock:
+            self._planes[sql] = plan
+            while len(self._planes) > settings.adhoc_sql_cache_size:
+                self._planes.popitem(last=False)
+        return plan, False
+
+    def ejecutar(self, consulta: str, limite: Optional[int] = None, fragmento: int = 0) -> Tuple[dict, LineasNDJSON]:
+        """
+        Preparar y empezar a leer la consulta; retorna (encabezado, líneas NDJSON)
+
+        Los errores de compilación, de autorización y de tiempo del primer
+        lote se lanzan aquí (antes de empezar a responder); los posteriores
+        terminan el stream con una línea `{"error": ...}`.
+        """
+        sql = normalizar(consulta)
+        if not sql:
+            raise ConsultaRechazada("Consulta vacía")
+        rutas = self.rutas()
+        if not rutas:
+            raise ConsultaRechazada("Las consultas ad hoc requieren SQLite")
+        if not 0 <= fragmento < len(rutas):
+            raise ConsultaRechazada(f"Fragmento fuera de rango (0-{len(rutas) - 1})")
+        maximo = settings.adhoc_sql_max_rows
+        limite = maximo if limite is None else min(limite, maximo)
+
+        ruta = rutas[fragmento]
+        conn = self._tomar(ruta)
+        tiempo = _Limite(settings.adhoc_sql_timeout_ms / 1000)
+        conn.set_progress_handler(tiempo, PASOS_PROGRESO)
+        try:
+            plan, repetida = tiempo.medir(self._plan, conn, sql)
+            cursor = tiempo.medir(conn.execute, sql)
+            primeras = tiempo.medir(cursor.fetchmany, min(LOTE, limite + 1))
+        except (sqlite3.Error, sqlite3.Warning) as error:
+            self._devolver(ruta, conn)
+            with self._lock:
+                if tiempo.agotado:
+                    self.interrumpidas += 1
+                else:
+                    self.rechazadas += 1
+            if tiempo.agotado:
+                raise ConsultaInterrumpida(f"La consulta superó {settings.adhoc_sql_timeout_ms} ms de SQLite")
+            raise ConsultaRechazada(str(error))
+
+        with self._lock:
+            self.consultas += 1
+        columnas = [descripcion[0] for descripcion in cursor.description or ()]
+        encabezado = {"columnas": columnas, "plan": plan, "limite": limite, "plan_en_cache": repetida}
+
+        def liberar():
+            cursor.close()
+            self._devolver(ruta, conn)
+
+        lineas = self._lineas(cursor, tiempo, encabezado, primeras, sql)
+        return encabezado, LineasNDJSON(lineas, liberar)
+
+    def _lineas(self, cursor, tiempo: _Limite, encabezado: dict, filas: list, sql: str) -> Iterator[str]:
+        inicio = time.perf_counter()
+        enviadas = 0
+        limite = encabezado["limite"]
+        columnas = encabezado["columnas"]
+        yield json.dumps(encabezado, ensure_ascii=False) + "\n"
+        while filas:
+            restantes = limite - enviadas
+            lote = filas[:restantes]
+            if lote:
+                yield "".join(
+                    json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_json) + "\n"
+                    for fila in lote
+                )
+            enviadas += len(lote)
+            if len(filas) > restantes:
+                break
+            try:
+                filas = tiempo.medir(cursor.fetchmany, min(LOTE, limite - enviadas + 1))
+            except sqlite3.Error as error:
+                if tiempo.agotado:
+                    with self._lock:
+                        self.interrumpidas += 1
+                motivo = f"superó {settings.adhoc_sql_timeout_ms} ms de SQLite" if tiempo.agotado else str(error)
+                yield json.dumps({"error": motivo, "filas": enviadas}, ensure_ascii=False) + "\n"
+                return
+        # Solo se sale del bucle con filas pendientes al llegar al límite
+        truncado = bool(filas)
+        if truncado:
+            with self._lock:
+                self.truncadas += 1
+        yield json.dumps({
+            "fin": True,
+            "filas": enviadas,
+            "truncado": truncado,
+            "ms_sqlite": round((settings.adhoc_sql_timeout_ms / 1000 - tiempo.restante) * 1000, 3),
+            "ms_total": round((time.perf_counter() - inicio) * 1000, 3),
+        }) + "\n"
+        logger.info("Consulta ad hoc: %d filas%s | %s", enviadas, " (truncada)" if truncado else "", sql)
+
+    # ---- estado ----
+
+    def planes_en_cache(self) -> int:
+        return len(self._planes)
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "consultas": self.consultas,
+                "plan_reutilizado": self.repetidas,
+                "rechazadas": self.rechazadas,
+                "interrumpidas": self.interrumpidas,
+                "truncadas": self.truncadas,
+                "sin_conexion_libre": self.sin_conexion,
+                "planes_en_cache": len(self._planes),
+                "conexiones_abiertas": dict(self._abiertas),
+                "limites": {
+                    "tiempo_ms": settings.adhoc_sql_timeout_ms,
+                    "filas": settings.adhoc_sql_max_rows,
+                    "conexiones_por_archivo": settings.adhoc_sql_connections,
+                },
+            }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        yield ("adhoc_sql_queries_total", "counter", "Consultas ad hoc ejecutadas", (), self.consultas)
+        yield ("adhoc_sql_rejected_total", "counter", "Consultas ad hoc rechazadas", (), self.rechazadas)
+        yield ("adhoc_sql_interrupted_total", "counter", "Consultas ad hoc que agotaron su tiempo", (), self.interrumpidas)
+        yield ("adhoc_sql_truncated_total", "counter", "Consultas ad hoc cortadas por el máximo de filas", (), self.truncadas)
+
+
+consultas_adhoc = ConsultasAdHoc()
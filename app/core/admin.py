@@ -0,0 +1,28 @@
+"""
+Protección de endpoints de administración
+"""
+
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import settings
+
+
+def token_admin_valido(token: Optional[str]) -> bool:
+    """Comparar el token recibido con ADMIN_TOKEN en tiempo constante"""
+    if not settings.admin_token or not token:
+        return False
+    return secrets.compare_digest(token, settings.admin_token)
+
+
+def requerir_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependencia que exige el encabezado `X-Admin-Token`"""
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=403,
+            detail="Endpoints de administración deshabilitados (configure ADMIN_TOKEN)"
+        )
+    if not token_admin_valido(x_admin_token):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
@@ -0,0 +1,280 @@
+"""
+Instantánea en columnas (NumPy) de edad, activo y fecha de registro para reportes
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.memory import monitor_memoria
+from app.core.singleflight import lecturas
+from app.core.versioning import data_version
+
+PERIODOS = ("dia", "semana", "mes")
+SIN_EDAD = -1
+# Las filas se releen desde la mayor `updated_at` vista menos este margen,
+# para no perder escrituras de otros workers que confirman con retraso
+SOLAPE = timedelta(seconds=5)
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+# Resultados memorizados por versión de datos
+MAX_RESULTADOS = 256
+
+
+def _dia(fecha: datetime) -> int:
+    """Días desde 1970-01-01 (UTC, como se guarda created_at)"""
+    return fecha.toordinal() - _ORDINAL_EPOCA
+
+
+def _fecha(dia: int) -> str:
+    return date.fromordinal(int(dia) + _ORDINAL_EPOCA).isoformat()
+
+
+def _periodos(dias, periodo: str):
+    """
+    Día de inicio del periodo de cada elemento (días desde la época)
+
+    Semanas desde el lunes: el 1970-01-01 fue jueves, así que desplazar 3
+    días alinea la división entera. Los meses salen de una tabla día -> mes
+    que solo cubre el rango presente, así que no se convierte cada fecha.
+    """
+    if periodo == "dia" or len(dias) == 0:
+        return dias
+    if periodo == "semana":
+        return (dias + 3) // 7 * 7 - 3
+    primero, ultimo = int(dias.min()), int(dias.max())
+    rango = np.arange(primero, ultimo + 1).astype("datetime64[D]")
+    inicio_mes = rango.astype("datetime64[M]").astype("datetime64[D]").astype(np.int32)
+    return inicio_mes[dias - primero]
+
+
+def _conteos(claves, pesos=None) -> Tuple[list, list]:
+    """Claves distintas (ordenadas) y sus conteos, con bincount en lugar de ordenar"""
+    if len(claves) == 0:
+        return [], []
+    base = int(claves.min())
+    conteos = np.bincount(claves - base, weights=pesos)
+    presentes = np.flatnonzero(np.bincount(claves - base)) if pesos is not None else np.flatnonzero(conteos)
+    return (presentes + base).tolist(), conteos[presentes].tolist()
+
+
+class ColumnasUsuarios:
+    """
+    Copia en arrays de las columnas que usan los reportes
+
+    Ids ordenados con su edad (int16, -1 = sin edad), activo (bool) y día
+    de registro (int32, días desde 1970): 15 bytes por usuario. Los
+    agregados son pasadas vectorizadas (bincount, sin ordenar) sobre estos
+    arrays y se memorizan por versión de datos, así que repetir un reporte
+    sin escrituras entre medio es una búsqueda en un dict.
+
+    `refrescar` solo consulta si cambió la versión de datos, y entonces lee
+    únicamente las filas con `updated_at` posterior a la última vista. Las
+    eliminaciones se detectan porque el total deja de coincidir.
+    """
+
+    def __init__(self):
+        self.ids = self.edad = self.activo = self.dia = None
+        self.version: Optional[str] = None
+        self.marca: Optional[datetime] = None
+        self.refrescos = 0
+        self.refrescos_completos = 0
+        self.filas_leidas = 0
+        self.ultimo_refresco_ms = 0.0
+        self._resultados: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return 0 if self.ids is None else len(self.ids)
+
+    @staticmethod
+    def _arrays(filas: List[tuple]):
+        total = len(filas)
+        ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=total)
+        edad = np.fromiter((SIN_EDAD if f[1] is None else f[1] for f in filas), dtype=np.int16, count=total)
+        activo = np.fromiter((bool(f[2]) for f in filas), dtype=bool, count=total)
+        dia = np.fromiter((_dia(f[3]) for f in filas), dtype=np.int32, count=total)
+        return ids, edad, activo, dia
+
+    def _reemplazar(self, ids, edad, activo, dia):
+        orden = np.argsort(ids, kind="stable")
+        self.ids, self.edad, self.activo, self.dia = ids[orden], edad[orden], activo[orden], dia[orden]
+
+    def _combinar(self, filas: List[tuple]):
+        ids, edad, activo, dia = self._arrays(filas)
+        if len(self.ids):
+            posiciones = np.searchsorted(self.ids, ids)
+            existentes = self.ids[np.minimum(posiciones, len(self.ids) - 1)] == ids
+        else:
+            posiciones = np.zeros(len(ids), dtype=np.int64)
+            existentes = np.zeros(len(ids), dtype=bool)
+        # Filas ya conocidas: se actualizan en su lugar
+        destino = posiciones[existentes]
+        self.edad[destino] = edad[existentes]
+        self.activo[destino] = activo[existentes]
+        self.dia[destino] = dia[existentes]
+        nuevas = ~existentes
+        if nuevas.any():
+            self._reemplazar(
+                np.concatenate([self.ids, ids[nuevas]]),
+                np.concatenate([self.edad, edad[nuevas]]),
+                np.concatenate([self.activo, activo[nuevas]]),
+                np.concatenate([self.dia, dia[nuevas]]),
+            )
+
+    def _quitar_eliminados(self, vigentes: List[int]):
+        conservar = np.isin(self.ids, np.fromiter(vigentes, dtype=np.int64, count=len(vigentes)))
+        self.ids, self.edad, self.activo, self.dia = (
+            self.ids[conservar], self.edad[conservar], self.activo[conservar], self.dia[conservar]
+        )
+
+    def refrescar(
+        self,
+        leer_filas: Callable[[Optional[datetime]], Tuple[List[tuple], int]],
+        leer_ids: Callable[[], List[int]],
+    ):
+        """
+        Poner las columnas al día con la versión de datos actual
+
+        `leer_filas(desde)` retorna las filas (id, edad, activo, created_at)
+        con updated_at >= desde (todas si `desde` es None) y el total de
+        usuarios; `leer_ids()` todos los ids vigentes. Los refrescos
+        simultáneos se coalescen en uno.
+        """
+        version = data_version.etag()
+        if self.version == version:
+            return
+        lecturas.ejecutar(("analitica_refrescar", version), lambda: self._refrescar(version, leer_filas, leer_ids))
+
+    def _refrescar(self, version: str, leer_filas, leer_ids):
+        inicio = time.perf_counter()
+        with self._lock:
+            if self.version == version:
+                return
+            # Se toma antes de leer: lo escrito durante la lectura se relee después
+            marca = datetime.utcnow()
+            completo = self.ids is None
+            filas, total = leer_filas(None if completo else self.marca - SOLAPE)
+            if completo:
+                self._reemplazar(*self._arrays(filas))
+                self.refrescos_completos += 1
+            elif filas:
+                self._combinar(filas)
+            if len(self.ids) != total:
+                self._quitar_eliminados(leer_ids())
+            self._resultados.clear()
+            self.marca = marca
+            self.version = version
+            self.refrescos += 1
+            self.filas_leidas += len(filas)
+            self.ultimo_refresco_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+    def invalidar(self):
+        """Descartar todo; el próximo refresco relee la tabla completa"""
+        with self._lock:
+            self.ids = self.edad = self.activo = self.dia = None
+            self.version = self.marca = None
+            self._resultados.clear()
+
+    # ---- agregados ----
+
+    def _memorizado(self, clave: tuple, calcular: Callable[[], object]):
+        with self._lock:
+            if clave in self._resultados:
+                return self._resultados[clave]
+            resultado = calcular()
+            if len(self._resultados) < MAX_RESULTADOS:
+                self._resultados[clave] = resultado
+            return resultado
+
+    def _rango(self, desde: Optional[date], hasta: Optional[date]):
+        if desde is None and hasta is None:
+            return slice(None)
+        mascara = np.ones(len(self.dia), dtype=bool)
+        if desde is not None:
+            mascara &= self.dia >= desde.toordinal() - _ORDINAL_EPOCA
+        if hasta is not None:
+            mascara &= self.dia <= hasta.toordinal() - _ORDINAL_EPOCA
+        return mascara
+
+    def histograma_edades(self, ancho: int = 10, activo: Optional[bool] = None) -> dict:
+        return self._memorizado(("edades", ancho, activo), lambda: self._histograma_edades(ancho, activo))
+
+    def _histograma_edades(self, ancho: int, activo: Optional[bool]) -> dict:
+        edades = self.edad if activo is None else self.edad[self.activo == activo]
+        # Una sola pasada: usuarios por edad exacta (índice 0 = sin edad);
+        # rangos, media y percentiles salen de esos ~120 conteos
+        por_edad = np.bincount(edades + 1, minlength=1)
+        sin_edad = int(por_edad[0])
+        por_edad = por_edad[1:]
+        total = int(por_edad.sum())
+        relleno = np.zeros(-len(por_edad) % ancho, dtype=por_edad.dtype)
+        por_rango = np.concatenate([por_edad, relleno]).reshape(-1, ancho).sum(axis=1)
+        acumulado = np.cumsum(por_edad)
+        return {
+            "ancho": ancho,
+            "rangos": [
+                {"desde": int(r * ancho), "hasta": int(r * ancho + ancho - 1), "usuarios": int(por_rango[r])}
+                for r in np.flatnonzero(por_rango)
+            ],
+            "sin_edad": sin_edad,
+            "media": round(float(np.dot(por_edad, np.arange(len(por_edad))) / total), 2) if total else None,
+            # Percentil por rango más cercano, como benchmarks/common.percentil
+            "percentiles": {
+                f"p{p}": int(np.searchsorted(acumulado, max(1, -(-p * total // 100))))
+                for p in (25, 50, 75)
+            } if total else None,
+        }
+
+    def registros_por_periodo(
+        self, periodo: str = "dia", desde: Optional[date] = None, hasta: Optional[date] = None
+    ) -> List[dict]:
+        def calcular():
+            periodos, conteos = _conteos(_periodos(self.dia[self._rango(desde, hasta)], periodo))
+            return [{"periodo": _fecha(p), "usuarios": n} for p, n in zip(periodos, conteos)]
+
+        return self._memorizado(("registros", periodo, desde, hasta), calcular)
+
+    def activos_por_cohorte(
+        self, periodo: str = "mes", desde: Optional[date] = None, hasta: Optional[date] = None
+    ) -> List[dict]:
+        def calcular():
+            seleccion = self._rango(desde, hasta)
+            cohortes = _periodos(self.dia[seleccion], periodo)
+            claves, usuarios = _conteos(cohortes)
+            _, activos = _conteos(cohortes, pesos=self.activo[seleccion].astype(np.float64))
+            return [
+                {
+                    "cohorte": _fecha(c),
+                    "usuarios": n,
+                    "activos": int(a),
+                    "ratio_activos": round(a / n, 4),
+                }
+                for c, n, a in zip(claves, usuarios, activos)
+            ]
+
+        return self._memorizado(("cohortes", periodo, desde, hasta), calcular)
+
+    def bytes_en_memoria(self) -> int:
+        if self.ids is None:
+            return 0
+        return sum(columna.nbytes for columna in (self.ids, self.edad, self.activo, self.dia))
+
+    def estado(self) -> dict:
+        return {
+            "usuarios": len(self),
+            "bytes": self.bytes_en_memoria(),
+            "version": self.version,
+            "refrescos": self.refrescos,
+            "refrescos_completos": self.refrescos_completos,
+            "filas_leidas": self.filas_leidas,
+            "ultimo_refresco_ms": self.ultimo_refresco_ms,
+            "resultados_memorizados": len(self._resultados),
+        }
+
+
+columnas_usuarios = ColumnasUsuarios()
+# El módulo se importa con la primera petición de estadísticas (ver el router)
+monitor_memoria.registrar_cache("analitica_bytes", columnas_usuarios.bytes_en_memoria)
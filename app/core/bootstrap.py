@@ -0,0 +1,107 @@
+"""
+Datos iniciales incrustados en index.html para el primer render
+"""
+
+import gzip
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from app.core.singleflight import lecturas
+from app.core.static_assets import Recurso, brotli
+from app.core.versioning import data_version
+
+ID_SCRIPT = "datos-iniciales"
+
+# Escapes para que el JSON no pueda cerrar el <script> ni romper el HTML
+_ESCAPES_HTML = {ord("<"): "\\u003c", ord(">"): "\\u003e", ord("&"): "\\u0026",
+                 0x2028: "\\u2028", 0x2029: "\\u2029"}
+
+
+def script_json(datos: dict) -> str:
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f'<script id="{ID_SCRIPT}" type="application/json">{contenido.translate(_ESCAPES_HTML)}</script>'
+
+
+def incrustar(html: bytes, datos: dict) -> bytes:
+    """Insertar el bloque JSON antes de </head> (o al inicio si no hay head)"""
+    bloque = script_json(datos).encode("utf-8")
+    posicion = html.find(b"</head>")
+    if posicion == -1:
+        return bloque + html
+    return html[:posicion] + bloque + b"\n" + html[posicion:]
+
+
+def consultar_datos_iniciales(db, limite: int) -> dict:
+    """Lo mismo que devuelven /api/estadisticas y /api/usuarios/?limit=`limite`"""
+    from app.schemas.user import UsuarioLista
+    from app.services.user_service import UsuarioService
+
+    usuarios = UsuarioService.obtener_usuarios(db, limit=limite)
+    return {
+        "estadisticas": UsuarioService.obtener_estadisticas(db),
+        "usuarios": [UsuarioLista.model_validate(u).model_dump(mode="json") for u in usuarios],
+    }
+
+
+class BootstrapInicial:
+    """
+    index.html con estadísticas y primera página de usuarios incluidas
+
+    El HTML resultante (y sus variantes comprimidas) se guarda en memoria y
+    solo se reconstruye cuando cambia la versión de los datos, el día (por
+    `usuarios_hoy`) o el propio index.html. Las reconstrucciones simultáneas
+    se coalescen en una sola.
+    """
+
+    def __init__(self, limite: int = 100):
+        self.limite = limite
+        self.reconstrucciones = 0
+        self._clave: Optional[Tuple] = None
+        self._recurso: Optional[Recurso] = None
+        self._lock = threading.Lock()
+
+    def clave(self, indice: Recurso) -> Tuple:
+        return (indice.hash, data_version.etag(), datetime.utcnow().date())
+
+    def vigente(self, indice: Recurso) -> Optional[Recurso]:
+        """HTML en caché si sigue siendo válido (sin tocar la BD)"""
+        with self._lock:
+            if self._clave == self.clave(indice):
+                return self._recurso
+        return None
+
+    def obtener(self, indice: Recurso, consultar: Callable[[int], dict]) -> Recurso:
+        """
+        HTML con los datos actuales
+
+        `consultar(limite)` devuelve el dict con `estadisticas` y `usuarios`;
+        solo se llama si la caché no es válida.
+        """
+        recurso = self.vigente(indice)
+        if recurso is not None:
+            return recurso
+        clave = self.clave(indice)
+        return lecturas.ejecutar(("bootstrap_index",) + clave, lambda: self._construir(indice, clave, consultar))
+
+    def _construir(self, indice: Recurso, clave: Tuple, consultar: Callable[[int], dict]) -> Recurso:
+        datos = {"version": clave[1], **consultar(self.limite)}
+        html = incrustar(indice.variantes[""], datos)
+        recurso = Recurso(indice.ruta, html, indice.media_type, inmutable=False)
+        # Compresión rápida: se rehace en cada cambio de datos
+        recurso.agregar_variante("gzip", gzip.compress(html, compresslevel=6, mtime=0))
+        if brotli is not None:
+            recurso.agregar_variante("br", brotli.compress(html, quality=5))
+        with self._lock:
+            self._clave = clave
+            self._recurso = recurso
+            self.reconstrucciones += 1
+        return recurso
+
+    def bytes_en_memoria(self) -> int:
+        recurso = self._recurso
+        return recurso.bytes_en_memoria() if recurso is not None else 0
+
+
+bootstrap_inicial = BootstrapInicial()
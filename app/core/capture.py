@@ -0,0 +1,203 @@
+"""
+Captura de tráfico real para reproducirlo en pruebas de carga
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Parámetros cuyo valor nunca se guarda
+PARAMETROS_SENSIBLES = ("token", "password", "clave", "secret", "key", "email", "auth")
+VALOR_OCULTO = "*"
+
+# Largo máximo de un valor guardado (evita trazas enormes por URLs anómalas)
+MAX_LARGO_VALOR = 64
+
+# Trazas por escritura del hilo escritor
+MAX_LOTE = 256
+_FIN = object()
+
+
+def _sanitizar(parametros: Dict[str, str]) -> Dict[str, str]:
+    limpios = {}
+    for nombre, valor in parametros.items():
+        if any(sensible in nombre.lower() for sensible in PARAMETROS_SENSIBLES):
+            valor = VALOR_OCULTO
+        limpios[nombre] = str(valor)[:MAX_LARGO_VALOR]
+    return limpios
+
+
+def traza(
+    inicio: float,
+    metodo: str,
+    ruta: str,
+    path_params: Dict[str, str],
+    query: Dict[str, str],
+    bytes_cuerpo: int,
+    status: int,
+    duracion: float,
+) -> dict:
+    """
+    Registro compacto de una petición (claves cortas, sin encabezados ni cuerpo)
+
+    `ts` es la hora de llegada (epoch, para ordenar trazas de varios workers)
+    y `d` la duración original en ms.
+    """
+    registro = {"ts": round(inicio, 4), "m": metodo, "r": ruta}
+    if path_params:
+        registro["p"] = _sanitizar(path_params)
+    if query:
+        registro["q"] = _sanitizar(query)
+    if bytes_cuerpo:
+        registro["b"] = bytes_cuerpo
+    registro["s"] = status
+    registro["d"] = round(duracion * 1000, 3)
+    return registro
+
+
+class GrabadorTrafico:
+    """
+    Escribe trazas como líneas JSON en un archivo de solo anexado
+
+    `grabar` solo encola la traza (cola acotada: llena = se descarta y se
+    cuenta), así que el event loop nunca espera al disco. Un hilo saca las
+    trazas por lotes y escribe cada lote con una única escritura O_APPEND
+    de líneas completas: varios workers pueden compartir el archivo sin
+    intercalarlas. Se deja de grabar al alcanzar `max_bytes`; `muestreo` es
+    la fracción de peticiones grabadas.
+    """
+
+    def __init__(
+        self, ruta: str, muestreo: float = 1.0, max_bytes: int = 100 * 1024 * 1024, capacidad: int = 10_000
+    ):
+        self.ruta = ruta
+        self.muestreo = muestreo
+        self.max_bytes = max_bytes
+        self.grabadas = 0
+        self.descartadas = 0
+        self.descartadas_cola = 0
+        self._fd: Optional[int] = None
+        self._bytes = 0
+        self._cola: queue.Queue = queue.Queue(capacidad)
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def _abrir(self) -> int:
+        if self._fd is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._fd = os.open(self.ruta, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._bytes = os.fstat(self._fd).st_size
+        return self._fd
+
+    def muestrear(self) -> bool:
+        """Decidir al llegar la petición si se grabará"""
+        return self.muestreo >= 1 or self._random.random() < self.muestreo
+
+    def grabar(self, registro: dict):
+        """Encolar una traza sin esperar; la escribe el hilo escritor"""
+        if self._hilo is None:
+            self._iniciar()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            with self._lock:
+                self.descartadas_cola += 1
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="captura-trafico", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < MAX_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._escribir([registro for registro in lote if registro is not _FIN])
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+            if any(registro is _FIN for registro in lote):
+                return
+
+    def _escribir(self, registros: List[dict]):
+        lineas = []
+        with self._lock:
+            fd = self._abrir()
+            for registro in registros:
+                linea = (json.dumps(registro, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+                if self._bytes + len(linea) > self.max_bytes:
+                    self.descartadas += 1
+                    continue
+                lineas.append(linea)
+                self._bytes += len(linea)
+                self.grabadas += 1
+            if lineas:
+                os.write(fd, b"".join(lineas))
+
+    def vaciar(self, espera: float = 1.0) -> bool:
+        """Esperar a que se escriba lo encolado; False si no terminó a tiempo"""
+        limite = time.monotonic() + espera
+        while self._cola.unfinished_tasks:
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def cerrar(self):
+        """Escribir lo pendiente, detener el hilo y cerrar el archivo"""
+        hilo = self._hilo
+        if hilo is not None:
+            self._cola.put(_FIN)
+            hilo.join()
+            self._hilo = None
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def estado(self) -> dict:
+        return {
+            "archivo": self.ruta,
+            "muestreo": self.muestreo,
+            "grabadas": self.grabadas,
+            "descartadas_por_tamano": self.descartadas,
+            "descartadas_cola_llena": self.descartadas_cola,
+            "en_cola": self._cola.qsize(),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def leer_trazas(rutas: List[str]) -> List[dict]:
+    """Cargar trazas de uno o varios archivos, ordenadas por llegada"""
+    trazas = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            trazas.extend(_lineas_validas(f))
+    trazas.sort(key=lambda registro: registro["ts"])
+    return trazas
+
+
+def _lineas_validas(lineas) -> Iterator[dict]:
+    for linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except json.JSONDecodeError:
+            # Última línea truncada si el proceso murió mientras escribía
+            continue
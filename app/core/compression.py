@@ -0,0 +1,166 @@
+"""
+Compresores en streaming (gzip, brotli, zstd) y negociación de Accept-Encoding
+"""
+
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # dependencia opcional
+    zstandard = None
+
+
+# Niveles por perfil; cada formato tiene su propia escala
+PERFILES: Dict[str, Dict[str, int]] = {
+    "rapido": {"zstd": 1, "br": 1, "gzip": 1},
+    "equilibrado": {"zstd": 3, "br": 4, "gzip": 6},
+    "maximo": {"zstd": 19, "br": 11, "gzip": 9},
+}
+PERFIL_POR_DEFECTO = "equilibrado"
+SIN_COMPRESION = "ninguno"
+
+
+class _Gzip:
+    def __init__(self, nivel: int):
+        # wbits 16 + MAX_WBITS: cabecera y checksum de gzip
+        self._objeto = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._objeto.compress(datos)
+
+    def vaciar(self) -> bytes:
+        return self._objeto.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        return self._objeto.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, nivel: int):
+        self._objeto = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._objeto.process(datos)
+
+    def vaciar(self) -> bytes:
+        return self._objeto.flush()
+
+    def terminar(self) -> bytes:
+        return self._objeto.finish()
+
+
+class _Zstd:
+    def __init__(self, nivel: int):
+        self._objeto = zstandard.ZstdCompressor(level=nivel).compressobj()
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._objeto.compress(datos)
+
+    def vaciar(self) -> bytes:
+        return self._objeto.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def terminar(self) -> bytes:
+        return self._objeto.flush()
+
+
+# Formatos disponibles en orden de preferencia del servidor
+COMPRESORES = {
+    nombre: clase
+    for nombre, clase, disponible in (
+        ("zstd", _Zstd, zstandard is not None),
+        ("br", _Brotli, brotli is not None),
+        ("gzip", _Gzip, True),
+    )
+    if disponible
+}
+
+
+def crear_compresor(codificacion: str, nivel: int):
+    """Compresor en streaming con `comprimir`, `vaciar` y `terminar`"""
+    return COMPRESORES[codificacion](nivel)
+
+
+def aceptadas(accept_encoding: Optional[str], soportadas: Tuple[str, ...] = ("br", "gzip")) -> List[str]:
+    """Codificaciones `soportadas` que acepta el cliente, de mayor a menor calidad"""
+    if not accept_encoding:
+        return []
+    calidades: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        calidades[nombre.strip().lower()] = calidad
+    comodin = calidades.get("*")
+    candidatas = []
+    for posicion, codificacion in enumerate(soportadas):
+        calidad = calidades.get(codificacion, comodin)
+        if calidad:
+            candidatas.append((calidad, -posicion, codificacion))
+    return [codificacion for _, _, codificacion in sorted(candidatas, reverse=True)]
+
+
+class EstadisticasCompresion:
+    """Bytes antes/después y tiempo de CPU por formato"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_formato: Dict[str, Dict[str, float]] = {}
+        self.omitidas_por_tamano = 0
+
+    def registrar(self, codificacion: str, entrada: int, salida: int, segundos: float):
+        with self._lock:
+            datos = self._por_formato.setdefault(
+                codificacion, {"respuestas": 0, "bytes_entrada": 0, "bytes_salida": 0, "segundos": 0.0}
+            )
+            datos["respuestas"] += 1
+            datos["bytes_entrada"] += entrada
+            datos["bytes_salida"] += salida
+            datos["segundos"] += segundos
+
+    def omitir_por_tamano(self):
+        with self._lock:
+            self.omitidas_por_tamano += 1
+
+    def estado(self) -> dict:
+        with self._lock:
+            formatos = {
+                nombre: {
+                    **datos,
+                    "segundos": round(datos["segundos"], 6),
+                    "ahorro": round(1 - datos["bytes_salida"] / datos["bytes_entrada"], 4)
+                    if datos["bytes_entrada"] else 0.0,
+                }
+                for nombre, datos in self._por_formato.items()
+            }
+            return {
+                "disponibles": list(COMPRESORES),
+                "formatos": formatos,
+                "omitidas_por_tamano": self.omitidas_por_tamano,
+            }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        estado = self.estado()
+        yield ("compression_skipped_total", "counter", "Respuestas sin comprimir por estar bajo el umbral",
+               (), estado["omitidas_por_tamano"])
+        for nombre, datos in estado["formatos"].items():
+            etiquetas = (("encoding", nombre),)
+            yield ("compression_responses_total", "counter", "Respuestas comprimidas", etiquetas, datos["respuestas"])
+            yield ("compression_bytes_in_total", "counter", "Bytes antes de comprimir", etiquetas, datos["bytes_entrada"])
+            yield ("compression_bytes_out_total", "counter", "Bytes después de comprimir", etiquetas, datos["bytes_salida"])
+            yield ("compression_seconds_total", "counter", "Tiempo dedicado a comprimir", etiquetas, datos["segundos"])
+
+
+estadisticas_compresion = EstadisticasCompresion()
@@ -0,0 +1,265 @@
+"""
+Difusión de cambios en memoria para el feed de eventos (SSE)
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+
+# Marca que cierra el stream de un cliente descartado por lento
+_DESCARTADO = object()
+
+
+class ClienteDescartado(Exception):
+    """El cliente no consumió eventos a tiempo y su buffer se desbordó"""
+
+
+def formatear_sse(evento: str, datos: dict, id_evento: Optional[int] = None) -> bytes:
+    """Codificar un evento en formato text/event-stream"""
+    lineas = []
+    if id_evento is not None:
+        lineas.append(f"id: {id_evento}")
+    lineas.append(f"event: {evento}")
+    lineas.append(f"data: {json.dumps(datos, default=str, separators=(',', ':'))}")
+    return ("\n".join(lineas) + "\n\n").encode("utf-8")
+
+
+class Suscripcion:
+    """Buffer acotado de un cliente conectado al feed"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_buffer: int):
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self.descartada = False
+
+    def entregar(self, mensaje: bytes) -> bool:
+        """Encolar sin bloquear; retorna False si el cliente no da abasto"""
+        if self.descartada:
+            return False
+        try:
+            self.cola.put_nowait(mensaje)
+            return True
+        except asyncio.QueueFull:
+            self.descartada = True
+            # Vaciar para dejar sitio a la marca de cierre
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(_DESCARTADO)
+            return False
+
+    async def siguiente(self, timeout: float) -> Optional[bytes]:
+        """
+        Esperar el próximo mensaje
+
+        Retorna None si pasó `timeout` sin eventos y lanza ClienteDescartado
+        si el buffer del cliente se desbordó.
+        """
+        try:
+            mensaje = await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if mensaje is _DESCARTADO:
+            raise ClienteDescartado()
+        return mensaje
+
+
+class Broadcaster:
+    """
+    Fan-out en proceso de eventos de cambio hacia los clientes SSE
+
+    `publicar` se llama desde el threadpool (los endpoints son síncronos),
+    así que cada evento se serializa una sola vez y se reparte con una
+    única llamada `call_soon_threadsafe` por event loop. Cada cliente tiene
+    un buffer acotado; si se llena, el cliente se descarta y debe reconectar
+    y recargar. Sin cambios no se ejecuta nada.
+
+    Con varios workers, `compartir(ruta)` anota además cada evento en un
+    archivo compartido (una línea JSON, con `flock`); `relevar` lee las
+    líneas nuevas y publica a los clientes de este worker las que anotaron
+    los demás. El archivo se rota al pasar `max_bytes_compartido`; si se
+    rota dos veces entre dos lecturas, se pierde lo del medio.
+    """
+
+    def __init__(self, max_buffer: int = 64):
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._suscripciones: Set[Suscripcion] = set()
+        self._secuencia = 0
+        self._al_suscribir: Optional[Callable[[], None]] = None
+        self.publicados = 0
+        self.descartados = 0
+        self.relevados = 0
+        self.max_bytes_compartido = 1024 * 1024
+        self._ruta: Optional[str] = None
+        self._lock_relevo = threading.Lock()
+        self._fd_relevo: Optional[int] = None
+        self._resto = b""
+
+    @property
+    def clientes(self) -> int:
+        return len(self._suscripciones)
+
+    def al_suscribir(self, callback: Callable[[], None]):
+        """Registrar un callback (en el event loop) para cada nueva suscripción"""
+        self._al_suscribir = callback
+
+    def suscribir(self) -> Suscripcion:
+        """Crear la suscripción de un cliente (llamar desde el event loop)"""
+        suscripcion = Suscripcion(asyncio.get_running_loop(), self.max_buffer)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        if self._al_suscribir:
+            self._al_suscribir()
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def compartido(self) -> bool:
+        return self._ruta is not None
+
+    def compartir(self, ruta: str):
+        """Reenviar los eventos entre workers por el archivo `ruta` (se crea si no existe)"""
+        os.close(os.open(ruta, os.O_WRONLY | os.O_CREAT, 0o600))
+        self._ruta = ruta
+
+    def _origen(self) -> str:
+        # Por proceso y por instancia: los workers creados con fork no se confunden
+        return f"{os.getpid()}:{id(self)}"
+
+    def publicar(self, evento: str, datos: dict, solo_local: bool = False):
+        """
+        Enviar un evento a todos los clientes conectados
+
+        Con `solo_local` no se anota para los demás workers (eventos que
+        cada worker calcula por su cuenta, como las estadísticas).
+        """
+        if self._ruta is not None and not solo_local:
+            linea = json.dumps(
+                {"origen": self._origen(), "evento": evento, "datos": datos},
+                default=str, separators=(",", ":"),
+            )
+            self._anotar(linea.encode("utf-8") + b"\n")
+        self._publicar_local(evento, datos)
+
+    def _anotar(self, linea: bytes):
+        """Agregar una línea al archivo compartido, rotándolo si pasó el máximo"""
+        import fcntl
+
+        while True:
+            fd = os.open(self._ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_ino != os.stat(self._ruta).st_ino:
+                    continue  # otro worker lo rotó mientras esperábamos el lock
+                if os.fstat(fd).st_size + len(linea) > self.max_bytes_compartido:
+                    # Con el lock del archivo viejo tomado nadie más le escribe
+                    temporal = f"{self._ruta}.{os.getpid()}"
+                    os.close(os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+                    os.replace(temporal, self._ruta)
+                    continue
+                os.write(fd, linea)
+                return
+            finally:
+                os.close(fd)
+
+    def iniciar_relevo(self):
+        """Empezar a relevar desde el final del archivo (lo anterior no tiene a quién llegar)"""
+        with self._lock_relevo:
+            if self._fd_relevo is not None:
+                os.close(self._fd_relevo)
+            self._fd_relevo = os.open(self._ruta, os.O_RDONLY)
+            os.lseek(self._fd_relevo, 0, os.SEEK_END)
+            self._resto = b""
+
+    def _leer_lineas(self) -> List[bytes]:
+        lineas: List[bytes] = []
+        while True:
+            # Si ya se rotó, el archivo viejo no recibe más escrituras: leerlo
+            # hasta el final y seguir con el nuevo desde el principio
+            rotado = os.fstat(self._fd_relevo).st_ino != os.stat(self._ruta).st_ino
+            while True:
+                bloque = os.read(self._fd_relevo, 65536)
+                if not bloque:
+                    break
+                self._resto += bloque
+            *completas, self._resto = self._resto.split(b"\n")
+            lineas.extend(completas)
+            if not rotado:
+                return lineas
+            os.close(self._fd_relevo)
+            self._fd_relevo = os.open(self._ruta, os.O_RDONLY)
+            self._resto = b""
+
+    def relevar(self) -> int:
+        """Publicar aquí los eventos anotados por otros workers desde la última llamada"""
+        with self._lock_relevo:
+            if self._fd_relevo is None:
+                return 0
+            lineas = self._leer_lineas()
+        origen = self._origen()
+        relevados = 0
+        for linea in lineas:
+            registro = json.loads(linea)
+            if registro["origen"] != origen:
+                self._publicar_local(registro["evento"], registro["datos"])
+                relevados += 1
+        self.relevados += relevados
+        return relevados
+
+    def _publicar_local(self, evento: str, datos: dict):
+        with self._lock:
+            if not self._suscripciones:
+                return
+            self._secuencia += 1
+            mensaje = formatear_sse(evento, datos, self._secuencia)
+            por_loop: Dict[asyncio.AbstractEventLoop, list] = {}
+            for suscripcion in self._suscripciones:
+                por_loop.setdefault(suscripcion.loop, []).append(suscripcion)
+            self.publicados += 1
+
+        for loop, suscripciones in por_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._difundir, suscripciones, mensaje)
+            except RuntimeError:
+                # El loop ya se cerró (p. ej. al apagar el worker)
+                for suscripcion in suscripciones:
+                    self.cancelar(suscripcion)
+
+    def _difundir(self, suscripciones, mensaje: bytes):
+        for suscripcion in suscripciones:
+            if suscripcion.descartada:
+                continue
+            if not suscripcion.entregar(mensaje):
+                self.descartados += 1
+                self.cancelar(suscripcion)
+
+    def mensajes_en_buffers(self) -> int:
+        """Eventos encolados sin enviar, sumando todos los clientes"""
+        with self._lock:
+            return sum(s.cola.qsize() for s in self._suscripciones)
+
+    def estado(self) -> dict:
+        return {
+            "clientes": self.clientes,
+            "eventos_publicados": self.publicados,
+            "clientes_descartados": self.descartados,
+            "max_buffer": self.max_buffer,
+            "compartido": self.compartido,
+            "eventos_relevados": self.relevados,
+        }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        yield ("sse_clients", "gauge", "Clientes conectados al feed de eventos", (), self.clientes)
+        yield ("sse_events_published_total", "counter", "Eventos publicados", (), self.publicados)
+        yield ("sse_clients_dropped_total", "counter", "Clientes descartados por lentos", (), self.descartados)
+        yield ("sse_events_relayed_total", "counter", "Eventos de otros workers publicados aquí", (), self.relevados)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,413 @@
+"""
+Registros de log recientes: buffer circular en memoria y lectura del final del archivo
+"""
+
+import json
+import logging
+import os
+import re
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+
+# Formato de `logging.basicConfig` del backend legado (fastapi_empresa.log)
+_LINEA_TEXTO = re.compile(
+    r"^(?P<ts>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:,\d+)?) - (?P<logger>.+?) - "
+    r"(?P<nivel>DEBUG|INFO|WARNING|ERROR|CRITICAL) - (?P<mensaje>.*)$"
+)
+BLOQUE = 64 * 1024
+_CAMPOS = ("ts", "nivel", "logger", "mensaje", "pid", "request_id", "excepcion")
+
+# Id de la petición en curso (ver app/middleware/request_id.py); el threadpool copia el contexto
+_id_peticion: ContextVar[Optional[str]] = ContextVar("id_peticion", default=None)
+
+
+def asignar_id_peticion(valor: Optional[str]):
+    """Fijar el id de la petición en curso; retorna el token para restaurarlo"""
+    return _id_peticion.set(valor)
+
+
+def restaurar_id_peticion(token):
+    _id_peticion.reset(token)
+
+
+def id_peticion_actual() -> Optional[str]:
+    return _id_peticion.get()
+
+
+NIVELES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def valor_nivel(nivel: Optional[str]) -> int:
+    """Número de un nivel por nombre (0 = todos); ValueError si no existe"""
+    if not nivel:
+        return 0
+    valor = logging.getLevelName(nivel.upper())
+    if not isinstance(valor, int):
+        raise ValueError(f"Nivel desconocido: {nivel}")
+    return valor
+
+
+def registro_a_dict(record: logging.LogRecord) -> dict:
+    """Campos estructurados de un LogRecord (los mismos que las líneas JSON del archivo)"""
+    datos = {
+        "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+        "nivel": record.levelname,
+        "logger": record.name,
+        "mensaje": record.getMessage(),
+        "pid": record.process,
+    }
+    request_id = getattr(record, "request_id", None) or _id_peticion.get()
+    if request_id:
+        datos["request_id"] = request_id
+    if record.exc_info:
+        datos["excepcion"] = logging.Formatter().formatException(record.exc_info)
+    elif record.exc_text:
+        datos["excepcion"] = record.exc_text
+    # Campos estructurados pasados con extra={"campos": {...}}
+    for clave, valor in (getattr(record, "campos", None) or {}).items():
+        if clave not in _CAMPOS:
+            datos[clave] = valor
+    return datos
+
+
+def interpretar_linea(linea: str) -> dict:
+    """Línea JSON o del formato de texto legado; si no, solo el mensaje"""
+    if linea.startswith("{"):
+        try:
+            return json.loads(linea)
+        except ValueError:
+            pass
+    coincidencia = _LINEA_TEXTO.match(linea)
+    if coincidencia:
+        datos = coincidencia.groupdict()
+        # asctime está en hora local y sin zona
+        local = datetime.strptime(datos["ts"].replace(",", "."), "%Y-%m-%d %H:%M:%S.%f")
+        datos["ts"] = local.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+        return datos
+    return {"mensaje": linea}
+
+
+def _instante(datos: dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(datos["ts"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _coincide(datos: dict, nivel_minimo: int) -> bool:
+    if not nivel_minimo:
+        return True
+    nivel = logging.getLevelName(datos.get("nivel") or "")
+    return isinstance(nivel, int) and nivel >= nivel_minimo
+
+
+def lineas_desde_el_final(ruta: str, max_bytes: int) -> Iterator[str]:
+    """
+    Líneas del archivo de la última a la primera, leyendo bloques hacia atrás
+
+    Nunca lee más de `max_bytes`: el costo depende de cuánto se pide, no
+    del tamaño del archivo. Una línea cortada por el límite se descarta.
+    """
+    with open(ruta, "rb") as f:
+        posicion = f.seek(0, os.SEEK_END)
+        limite = max(0, posicion - max_bytes)
+        resto = b""
+        while posicion > limite:
+            tamano = min(BLOQUE, posicion - limite)
+            posicion -= tamano
+            f.seek(posicion)
+            partes = (f.read(tamano) + resto).split(b"\n")
+            resto = partes.pop(0)
+            for parte in reversed(partes):
+                if parte.strip():
+                    yield parte.decode("utf-8", "replace").rstrip("\r")
+        if limite == 0 and resto.strip():
+            yield resto.decode("utf-8", "replace").rstrip("\r")
+
+
+def leer_final(
+    ruta: str,
+    n: int,
+    nivel_minimo: int = 0,
+    desde: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> dict:
+    """
+    Las últimas `n` entradas del archivo con nivel >= `nivel_minimo` y posteriores a `desde`
+
+    Se recorre desde el final y se para en cuanto hay `n` coincidencias, al
+    llegar a una entrada anterior a `desde` (el archivo está en orden) o al
+    leer `max_bytes`. Las entradas se retornan de la más antigua a la más reciente.
+    """
+    max_bytes = max_bytes if max_bytes is not None else settings.log_tail_max_mb * 1024 * 1024
+    # Sin filtro de fecha, una línea que no nombra ningún nivel aceptado se
+    # descarta sin interpretarla
+    aceptados = [nombre for nombre in NIVELES if logging.getLevelName(nombre) >= nivel_minimo] if nivel_minimo else None
+    entradas: List[dict] = []
+    leidas = 0
+    for linea in lineas_desde_el_final(ruta, max_bytes):
+        leidas += 1
+        if aceptados and desde is None and not any(nombre in linea for nombre in aceptados):
+            continue
+        datos = interpretar_linea(linea)
+        instante = _instante(datos)
+        if desde is not None and instante is not None and instante < desde:
+            break
+        if _coincide(datos, nivel_minimo):
+            entradas.append(datos)
+            if len(entradas) >= n:
+                break
+    entradas.reverse()
+    return {"fuente": "archivo", "archivo": ruta, "lineas_leidas": leidas, "entradas": entradas}
+
+
+class BufferLogs(logging.Handler):
+    """
+    Handler que guarda los últimos registros como dicts en un buffer circular
+
+    Anotar un registro es formatear el mensaje y un `append` a un deque con
+    tamaño máximo; consultar recorre a lo sumo el buffer, nunca un archivo.
+    """
+
+    def __init__(self, capacidad: int = 2000):
+        super().__init__()
+        self._registros: deque = deque(maxlen=capacidad)
+        self.descartados = 0
+
+    @property
+    def capacidad(self) -> int:
+        return self._registros.maxlen
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            datos = registro_a_dict(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._registros) == self.capacidad:
+            self.descartados += 1
+        self._registros.append((record.created, datos))
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def recientes(self, n: int, nivel_minimo: int = 0, desde: Optional[float] = None) -> dict:
+        """Hasta `n` registros que cumplen los filtros, del más antiguo al más reciente"""
+        entradas: List[dict] = []
+        for creado, datos in reversed(list(self._registros)):
+            if desde is not None and creado < desde:
+                break
+            if _coincide(datos, nivel_minimo):
+                entradas.append(datos)
+                if len(entradas) >= n:
+                    break
+        entradas.reverse()
+        return {"fuente": "memoria", "en_buffer": len(self._registros), "entradas": entradas}
+
+    def cubre(self, desde: Optional[float]) -> bool:
+        """True si el buffer nunca descartó nada o aún contiene todo lo posterior a `desde`"""
+        if not self.descartados:
+            return True
+        return desde is not None and bool(self._registros) and self._registros[0][0] <= desde
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `registro_a_dict`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(registro_a_dict(record), ensure_ascii=False)
+
+
+class ColaLogs(QueueHandler):
+    """
+    QueueHandler con cola acotada: en el hilo que loguea solo se encola
+
+    El registro se deja listo para cruzar de hilo (mensaje ya interpolado,
+    id de la petición en curso) y se encola sin esperar. Con la cola por
+    encima de `umbral` solo pasa uno de cada `muestreo` registros
+    DEBUG/INFO; si está llena se descarta el registro, cualquiera sea su
+    nivel. Ambos casos se cuentan.
+    """
+
+    def __init__(self, capacidad: int = 10_000, muestreo: int = 10, umbral: float = 0.8):
+        super().__init__(queue.Queue(capacidad))
+        self.capacidad = capacidad
+        self.muestreo = max(1, muestreo)
+        self.umbral = int(capacidad * umbral)
+        self.encolados = 0
+        self.omitidos_por_muestreo = 0
+        self.descartados: Dict[str, int] = {}
+        self._vistos_bajo_presion = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # La cola no sale del proceso: la excepción se formatea en el hilo escritor
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = _id_peticion.get()
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.umbral:
+            with self._lock:
+                self._vistos_bajo_presion += 1
+                if self._vistos_bajo_presion % self.muestreo:
+                    self.omitidos_por_muestreo += 1
+                    return
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._lock:
+                self.descartados[record.levelname] = self.descartados.get(record.levelname, 0) + 1
+            return
+        except Exception:
+            self.handleError(record)
+            return
+        with self._lock:
+            self.encolados += 1
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "capacidad": self.capacidad,
+                "en_cola": self.queue.qsize(),
+                "encolados": self.encolados,
+                "omitidos_por_muestreo": self.omitidos_por_muestreo,
+                "descartados_cola_llena": dict(self.descartados),
+                "muestreo_bajo_presion": f"1 de cada {self.muestreo}",
+            }
+
+
+class _Escritor(QueueListener):
+    """QueueListener cuyo aviso de parada espera hueco aunque la cola esté llena"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class RegistroLogs:
+    """
+    Configuración de logging de la app y consulta de entradas recientes
+
+    `instalar` cuelga del logger "app" un único `ColaLogs`; un hilo
+    (QueueListener) saca los registros y los pasa al buffer en memoria, a
+    la consola y, con LOG_FILE, al archivo en líneas JSON. Así un disco o
+    una consola lentos retrasan ese hilo, no las peticiones. Es idempotente.
+    """
+
+    def __init__(self):
+        self.buffer = BufferLogs(settings.log_buffer_size)
+        self.cola: Optional[ColaLogs] = None
+        self.archivo: Optional[str] = None
+        self._escritor: Optional[_Escritor] = None
+        self._handlers: List[logging.Handler] = []
+        self._lock = threading.Lock()
+
+    def instalar(self, archivo: Optional[str] = None, nivel: Optional[str] = None):
+        with self._lock:
+            if self.cola is not None:
+                return
+            logger = logging.getLogger("app")
+            logger.setLevel(valor_nivel(nivel or settings.log_level) or logging.INFO)
+            consola = logging.StreamHandler()
+            consola.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            self._handlers = [self.buffer, consola]
+            self.archivo = archivo if archivo is not None else (settings.log_file or None)
+            if self.archivo:
+                directorio = os.path.dirname(self.archivo)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                en_archivo = logging.FileHandler(self.archivo, encoding="utf-8")
+                en_archivo.setFormatter(FormatoJSON())
+                self._handlers.append(en_archivo)
+            self.cola = ColaLogs(settings.log_queue_size, settings.log_sample_every)
+            self._escritor = _Escritor(self.cola.queue, *self._handlers, respect_handler_level=True)
+            self._escritor.start()
+            logger.addHandler(self.cola)
+
+    def desinstalar(self):
+        """Quitar el handler y escribir lo que quede en la cola antes de cerrar"""
+        with self._lock:
+            if self.cola is None:
+                return
+            logging.getLogger("app").removeHandler(self.cola)
+            self._escritor.stop()
+            for handler in self._handlers:
+                if handler is not self.buffer:
+                    handler.close()
+            self.cola = self._escritor = None
+            self._handlers = []
+
+    def vaciar(self, espera: float = 1.0) -> bool:
+        """Esperar a que el hilo escritor procese lo encolado; False si no terminó a tiempo"""
+        cola = self.cola
+        if cola is None:
+            return True
+        limite = time.monotonic() + espera
+        while cola.queue.unfinished_tasks:
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def estado(self) -> dict:
+        return {
+            "instalado": self.cola is not None,
+            "archivo": self.archivo,
+            "en_buffer": len(self.buffer),
+            "cola": self.cola.estado() if self.cola is not None else None,
+        }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        cola = self.cola
+        if cola is None:
+            return
+        yield ("log_records_enqueued_total", "counter", "Registros de log encolados", (), cola.encolados)
+        yield ("log_queue_depth", "gauge", "Registros de log esperando al escritor", (), cola.queue.qsize())
+        yield (
+            "log_records_dropped_total", "counter", "Registros de log no escritos por presión",
+            (("reason", "sampled"),), cola.omitidos_por_muestreo,
+        )
+        for nivel, descartados in cola.descartados.items():
+            yield (
+                "log_records_dropped_total", "counter", "Registros de log no escritos por presión",
+                (("reason", "queue_full"), ("level", nivel)), descartados,
+            )
+
+    def recientes(
+        self, n: int = 50, nivel: Optional[str] = None, desde: Optional[datetime] = None, fuente: str = "auto"
+    ) -> dict:
+        """
+        Últimas entradas filtradas por nivel mínimo y fecha
+
+        `auto` responde desde memoria salvo que el buffer ya haya descartado
+        entradas que la consulta necesitaría; entonces lee el final del archivo.
+        """
+        nivel_minimo = valor_nivel(nivel)
+        # Lo ya logueado por esta petición debe estar en el buffer o el archivo
+        self.vaciar(0.1)
+        instante = None
+        if desde is not None:
+            instante = (desde if desde.tzinfo else desde.replace(tzinfo=timezone.utc)).timestamp()
+        if fuente == "memoria" or not self.archivo:
+            return self.buffer.recientes(n, nivel_minimo, instante)
+        if fuente == "auto":
+            resultado = self.buffer.recientes(n, nivel_minimo, instante)
+            if len(resultado["entradas"]) >= n or self.buffer.cubre(instante):
+                return resultado
+        try:
+            return leer_final(self.archivo, n, nivel_minimo, instante)
+        except FileNotFoundError:
+            return self.buffer.recientes(n, nivel_minimo, instante)
+
+
+registro_logs = RegistroLogs()
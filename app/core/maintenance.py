@@ -0,0 +1,375 @@
+"""
+Mantenimiento periódico de SQLite: optimize, ANALYZE, checkpoint del WAL y vacuum incremental
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine
+
+from app.config import settings
+
+logger = logging.getLogger("app.mantenimiento")
+
+# Tarea -> pesada (solo dentro de la ventana de baja carga, si hay una)
+TAREAS: Dict[str, bool] = {
+    "optimize": False,
+    "checkpoint": False,
+    "analyze": True,
+    "vacuum": True,
+}
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+class MantenimientoOcupado(Exception):
+    """Otro worker está ejecutando mantenimiento"""
+
+
+def intervalos() -> Dict[str, float]:
+    """Segundos entre ejecuciones de cada tarea (0 = deshabilitada)"""
+    return {
+        "optimize": settings.maintenance_optimize_interval,
+        "checkpoint": settings.maintenance_checkpoint_interval,
+        "analyze": settings.maintenance_analyze_interval,
+        "vacuum": settings.maintenance_vacuum_interval,
+    }
+
+
+def interpretar_ventana(texto: str) -> Optional[Tuple[int, int]]:
+    """`HH:MM-HH:MM` (UTC) en minutos desde medianoche; None si está vacía"""
+    if not texto.strip():
+        return None
+    try:
+        inicio, fin = (datetime.strptime(parte.strip(), "%H:%M") for parte in texto.split("-"))
+    except ValueError:
+        raise ValueError(f"Ventana de mantenimiento inválida: {texto!r} (se espera HH:MM-HH:MM)")
+    return inicio.hour * 60 + inicio.minute, fin.hour * 60 + fin.minute
+
+
+def en_ventana(ventana: Optional[Tuple[int, int]], ahora: datetime) -> bool:
+    """True sin ventana o si `ahora` (UTC) cae dentro; la ventana puede cruzar la medianoche"""
+    if ventana is None:
+        return True
+    minuto = ahora.hour * 60 + ahora.minute
+    inicio, fin = ventana
+    if inicio <= fin:
+        return inicio <= minuto < fin
+    return minuto >= inicio or minuto < fin
+
+
+# ---- tareas ----
+
+def _medidas(cursor, ruta: str) -> dict:
+    """Tamaño del archivo y del WAL, y páginas libres, para ver el efecto de una tarea"""
+    wal = f"{ruta}-wal"
+    return {
+        "bytes_archivo": os.path.getsize(ruta) if os.path.exists(ruta) else 0,
+        "bytes_wal": os.path.getsize(wal) if os.path.exists(wal) else 0,
+        "paginas_libres": cursor.execute("PRAGMA freelist_count").fetchone()[0],
+    }
+
+
+def _estadisticas(cursor) -> int:
+    """Filas de sqlite_stat1: tablas e índices con estadísticas para el planificador"""
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        return 0
+    return cursor.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+
+
+def _optimize(cursor) -> dict:
+    # Con un límite de análisis, ANALYZE (si optimize lo decide) muestrea en lugar de recorrer
+    cursor.execute(f"PRAGMA analysis_limit = {int(settings.maintenance_analysis_limit)}")
+    cursor.execute("PRAGMA optimize").fetchall()
+    return {"estadisticas": _estadisticas(cursor)}
+
+
+def _analyze(cursor) -> dict:
+    cursor.execute(f"PRAGMA analysis_limit = {int(settings.maintenance_analysis_limit)}")
+    cursor.execute("ANALYZE")
+    return {"estadisticas": _estadisticas(cursor)}
+
+
+def _checkpoint(cursor, modo: str = "PASSIVE") -> dict:
+    # PASSIVE copia lo que puede sin esperar a lectores ni escritores (el WAL
+    # se reutiliza desde el principio, sin achicarse); TRUNCATE espera a que
+    # terminen y deja el WAL en 0 bytes
+    ocupado, paginas_wal, copiadas = cursor.execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+    return {"modo": modo, "ocupado": bool(ocupado), "paginas_wal": paginas_wal, "paginas_copiadas": copiadas}
+
+
+def _vacuum(cursor) -> dict:
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != _AUTO_VACUUM_INCREMENTAL:
+        return {"omitida": "auto_vacuum no es INCREMENTAL (requiere un VACUUM completo una vez)"}
+    # Cada paso de la sentencia libera una página; `execute` de sqlite3 da un
+    # solo paso a lo que no retorna filas, `executescript` la corre completa
+    cursor.executescript(f"PRAGMA incremental_vacuum({int(settings.maintenance_vacuum_pages)});")
+    # Con WAL el archivo se acorta recién al copiar el WAL a la BD
+    return {"checkpoint": _checkpoint(cursor, "TRUNCATE")}
+
+
+_FUNCIONES: Dict[str, Callable] = {
+    "optimize": _optimize,
+    "analyze": _analyze,
+    "checkpoint": _checkpoint,
+    "vacuum": _vacuum,
+}
+# Ejecución pedida por un admin: el checkpoint deja el WAL en 0 bytes
+_FUNCIONES_MANUALES: Dict[str, Callable] = {
+    **_FUNCIONES,
+    "checkpoint": lambda cursor: _checkpoint(cursor, "TRUNCATE"),
+}
+
+
+def ejecutar_tarea(tarea: str, motor: Engine, manual: bool = False) -> dict:
+    """
+    Ejecutar una tarea sobre una BD; retorna duración, resultado y medidas antes y después
+
+    Usa una conexión del pool del motor: `PRAGMA optimize` decide qué
+    analizar según las consultas que esa conexión ya ejecutó. El checkpoint
+    programado es PASSIVE; el `manual` (pedido por un admin) es TRUNCATE.
+    """
+    ruta = motor.url.database
+    with motor.connect() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            antes = _medidas(cursor, ruta)
+            inicio = time.perf_counter()
+            resultado = (_FUNCIONES_MANUALES if manual else _FUNCIONES)[tarea](cursor)
+            duracion = time.perf_counter() - inicio
+            despues = _medidas(cursor, ruta)
+        finally:
+            cursor.close()
+    return {
+        "ruta": ruta,
+        "ms": round(duracion * 1000, 3),
+        "resultado": resultado,
+        "antes": antes,
+        "despues": despues,
+    }
+
+
+# ---- planificador ----
+
+class PlanificadorMantenimiento:
+    """
+    Hilo que ejecuta las tareas de mantenimiento cuando les toca
+
+    Cada `tick` revisa qué tareas vencieron su intervalo. Ninguna corre si
+    hay más de MAINTENANCE_MAX_ACTIVE peticiones en curso; ANALYZE y
+    vacuum, además, solo dentro de MAINTENANCE_WINDOW. Las ejecuciones se
+    coordinan entre workers con un `flock` no bloqueante y un archivo de
+    estado compartido con la última ejecución de cada tarea, así que cada
+    tarea corre una vez por intervalo en total, no una vez por worker.
+    """
+
+    def __init__(self):
+        self.motores: List[Engine] = []
+        self.carga: Callable[[], int] = lambda: 0
+        self.ruta_estado: Optional[str] = None
+        self.ejecuciones: Dict[Tuple[str, str], int] = {}
+        self.omitidas: Dict[str, int] = {}
+        self.historial: deque = deque(maxlen=50)
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def configurar(self, motores: List[Engine], carga: Optional[Callable[[], int]] = None):
+        """BDs a mantener y función que retorna las peticiones en curso"""
+        self.motores = list(motores)
+        if carga is not None:
+            self.carga = carga
+        self.ruta_estado = settings.maintenance_state_file or (
+            f"{self.motores[0].url.database}-mantenimiento.json" if self.motores else None
+        )
+
+    def iniciar(self, motores: List[Engine], carga: Optional[Callable[[], int]] = None):
+        if self._hilo is not None:
+            return
+        self.configurar(motores, carga)
+        interpretar_ventana(settings.maintenance_window)  # falla al arrancar, no en el hilo
+        self._detener.clear()
+
+        def bucle():
+            while not self._detener.wait(settings.maintenance_tick_seconds):
+                try:
+                    self.revisar()
+                except Exception:
+                    logger.exception("Falló la revisión de mantenimiento")
+
+        self._hilo = threading.Thread(target=bucle, name="mantenimiento", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detener el hilo; una tarea en curso termina antes"""
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+            self._hilo = None
+
+    # ---- estado compartido ----
+
+    def _leer_estado(self) -> dict:
+        try:
+            with open(self.ruta_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _guardar_estado(self, estado: dict):
+        temporal = f"{self.ruta_estado}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta_estado)
+
+    def _bloquear(self) -> Optional[int]:
+        """Descriptor con el flock tomado, o None si lo tiene otro proceso"""
+        import fcntl
+
+        fd = os.open(f"{self.ruta_estado}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _omitir(self, motivo: str):
+        self.omitidas[motivo] = self.omitidas.get(motivo, 0) + 1
+
+    # ---- ejecución ----
+
+    def pendientes(self, ahora: float, estado: dict) -> List[str]:
+        """Tareas habilitadas cuyo intervalo venció según el estado compartido"""
+        ultimas = estado.get("tareas", {})
+        return [
+            tarea for tarea, intervalo in intervalos().items()
+            if intervalo > 0 and ahora - ultimas.get(tarea, {}).get("ultima", 0) >= intervalo
+        ]
+
+    def revisar(self, ahora: Optional[float] = None) -> List[dict]:
+        """Una pasada del planificador; retorna las ejecuciones hechas"""
+        if not self.motores:
+            return []
+        ahora = time.time() if ahora is None else ahora
+        if not self.pendientes(ahora, self._leer_estado()):
+            return []
+        if self.carga() > settings.maintenance_max_active:
+            self._omitir("carga")
+            return []
+        dentro = en_ventana(
+            interpretar_ventana(settings.maintenance_window), datetime.fromtimestamp(ahora, timezone.utc)
+        )
+        with self._lock:
+            fd = self._bloquear()
+            if fd is None:
+                self._omitir("otro_worker")
+                return []
+            try:
+                # Releer bajo el lock: otro worker pudo ejecutarlas recién
+                estado = self._leer_estado()
+                hechas = []
+                for tarea in self.pendientes(ahora, estado):
+                    if TAREAS[tarea] and not dentro:
+                        self._omitir("fuera_de_ventana")
+                        continue
+                    if self.carga() > settings.maintenance_max_active:
+                        self._omitir("carga")
+                        break
+                    hechas.append(self._ejecutar(tarea, estado, ahora))
+                return hechas
+            finally:
+                os.close(fd)
+
+    def ejecutar(self, tarea: str) -> dict:
+        """
+        Ejecutar una tarea ahora, sin mirar intervalo, ventana ni carga
+
+        ValueError si la tarea no existe; RuntimeError sin BDs que mantener
+        (motor en memoria); MantenimientoOcupado si otro worker tiene el lock.
+        """
+        if tarea not in TAREAS:
+            raise ValueError(f"Tarea desconocida: {tarea} (válidas: {', '.join(TAREAS)})")
+        if not self.motores:
+            raise RuntimeError("No hay bases SQLite que mantener")
+        with self._lock:
+            fd = self._bloquear()
+            if fd is None:
+                raise MantenimientoOcupado("Otro worker está ejecutando mantenimiento")
+            try:
+                return self._ejecutar(tarea, self._leer_estado(), time.time(), manual=True)
+            finally:
+                os.close(fd)
+
+    def _ejecutar(self, tarea: str, estado: dict, ahora: float, manual: bool = False) -> dict:
+        """Ejecutar en todas las BDs y anotar en el estado compartido (con el lock tomado)"""
+        ejecucion = {"tarea": tarea, "inicio": ahora, "pid": os.getpid(), "bases": []}
+        try:
+            for motor in self.motores:
+                ejecucion["bases"].append(ejecutar_tarea(tarea, motor, manual))
+        except Exception as error:
+            ejecucion["error"] = str(error)
+            logger.warning("Mantenimiento %s falló: %s", tarea, error)
+        ejecucion["ms"] = round(sum(base["ms"] for base in ejecucion["bases"]), 3)
+        resultado = "error" if "error" in ejecucion else "ok"
+        self.ejecuciones[(tarea, resultado)] = self.ejecuciones.get((tarea, resultado), 0) + 1
+        self.historial.append(ejecucion)
+        if resultado == "ok":
+            # Con error se reintenta en la próxima revisión
+            estado.setdefault("tareas", {})[tarea] = {"ultima": ejecucion["inicio"], **ejecucion}
+            self._guardar_estado(estado)
+            logger.info("Mantenimiento %s en %.1f ms", tarea, ejecucion["ms"])
+        return ejecucion
+
+    def estado(self) -> dict:
+        ahora = time.time()
+        compartido = self._leer_estado().get("tareas", {}) if self.ruta_estado else {}
+        tareas = {}
+        for tarea, intervalo in intervalos().items():
+            ultima = compartido.get(tarea)
+            tareas[tarea] = {
+                "intervalo_s": intervalo,
+                "pesada": TAREAS[tarea],
+                "proxima_en_s": (
+                    max(0.0, round(ultima["ultima"] + intervalo - ahora, 1)) if ultima and intervalo else None
+                ),
+                "ultima": ultima,
+            }
+        return {
+            "activo": self._hilo is not None,
+            "bases": [motor.url.database for motor in self.motores],
+            "ventana_utc": settings.maintenance_window or None,
+            "max_peticiones_en_curso": settings.maintenance_max_active,
+            "tareas": tareas,
+            "omitidas": dict(self.omitidas),
+            "historial_de_este_worker": list(self.historial)[-10:],
+        }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        for (tarea, resultado), total in self.ejecuciones.items():
+            yield (
+                "sqlite_maintenance_runs_total", "counter", "Ejecuciones de mantenimiento de SQLite",
+                (("task", tarea), ("result", resultado)), total,
+            )
+        for motivo, total in self.omitidas.items():
+            yield (
+                "sqlite_maintenance_skipped_total", "counter", "Revisiones de mantenimiento omitidas",
+                (("reason", motivo),), total,
+            )
+        ultimas: Dict[str, dict] = {}
+        for ejecucion in self.historial:
+            ultimas[ejecucion["tarea"]] = ejecucion
+        for tarea, ejecucion in ultimas.items():
+            yield (
+                "sqlite_maintenance_last_duration_seconds", "gauge", "Duración de la última ejecución",
+                (("task", tarea),), ejecucion["ms"] / 1000,
+            )
+
+
+planificador_mantenimiento = PlanificadorMantenimiento()
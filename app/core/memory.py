@@ -0,0 +1,161 @@
+"""
+Diagnóstico de memoria: snapshots de tracemalloc, RSS y tamaños de cachés
+"""
+
+import gc
+import os
+import threading
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import session as orm_session
+
+# Marcos que no aportan información sobre la aplicación
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+AGRUPACIONES = ("lineno", "filename", "traceback")
+
+
+class SnapshotNoEncontrado(KeyError):
+    """No existe un snapshot con ese nombre"""
+
+
+def rss_bytes() -> Optional[int]:
+    """Memoria residente actual del proceso (None si no se puede leer)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss es el pico (KB en Linux, bytes en macOS); mejor que nada
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _estadistica(stat) -> dict:
+    marco = stat.traceback[0]
+    return {
+        "archivo": marco.filename,
+        "linea": marco.lineno,
+        "tamano_kb": round(stat.size / 1024, 2),
+        "bloques": stat.count,
+    }
+
+
+def _diferencia(stat) -> dict:
+    return {
+        **_estadistica(stat),
+        "diferencia_kb": round(stat.size_diff / 1024, 2),
+        "diferencia_bloques": stat.count_diff,
+    }
+
+
+class MonitorMemoria:
+    """
+    Control de tracemalloc y snapshots con nombre para comparar
+
+    Los snapshots se guardan en memoria (los más antiguos se descartan al
+    superar `max_snapshots`) y se comparan agrupando por archivo o línea.
+    """
+
+    def __init__(self, max_snapshots: int = 10):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._caches: Dict[str, Callable[[], int]] = {}
+        self._lock = threading.Lock()
+
+    # --- tracemalloc ---------------------------------------------------------
+
+    @property
+    def activo(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def iniciar(self, frames: int = 1) -> bool:
+        """Iniciar el rastreo; False si ya estaba activo"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        return True
+
+    def detener(self) -> bool:
+        """Detener el rastreo (los snapshots guardados se conservan)"""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        return True
+
+    def tomar_snapshot(self, nombre: str) -> dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTROS)
+        with self._lock:
+            self._snapshots.pop(nombre, None)
+            self._snapshots[nombre] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        total = sum(stat.size for stat in snapshot.statistics("filename"))
+        return {"nombre": nombre, "total_kb": round(total / 1024, 2)}
+
+    def _snapshot(self, nombre: str) -> tracemalloc.Snapshot:
+        with self._lock:
+            try:
+                return self._snapshots[nombre]
+            except KeyError:
+                raise SnapshotNoEncontrado(nombre)
+
+    def top(self, nombre: str, agrupar: str = "lineno", limite: int = 20) -> List[dict]:
+        """Sitios que más memoria retienen en un snapshot"""
+        estadisticas = self._snapshot(nombre).statistics(agrupar)
+        return [_estadistica(stat) for stat in estadisticas[:limite]]
+
+    def diferencia(self, desde: str, hasta: str, agrupar: str = "lineno", limite: int = 20) -> List[dict]:
+        """Crecimiento entre dos snapshots, ordenado por diferencia absoluta"""
+        cambios = self._snapshot(hasta).compare_to(self._snapshot(desde), agrupar)
+        return [_diferencia(stat) for stat in cambios[:limite]]
+
+    # --- Estado del proceso --------------------------------------------------
+
+    def registrar_cache(self, nombre: str, tamano: Callable[[], int]):
+        """Registrar una estructura en memoria de la app para informar su tamaño"""
+        self._caches[nombre] = tamano
+
+    @staticmethod
+    def sesiones_orm() -> dict:
+        """Sesiones de SQLAlchemy vivas y objetos en sus identity maps"""
+        sesiones = list(getattr(orm_session, "_sessions", {}).values())
+        return {
+            "sesiones_abiertas": len(sesiones),
+            "objetos_en_identity_map": sum(len(s.identity_map) for s in sesiones),
+        }
+
+    def estado(self) -> dict:
+        actual, pico = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = list(self._snapshots)
+        return {
+            "pid": os.getpid(),
+            "rss_kb": (rss_bytes() or 0) // 1024,
+            "tracemalloc": {
+                "activo": tracemalloc.is_tracing(),
+                "frames": tracemalloc.get_traceback_limit(),
+                "actual_kb": round(actual / 1024, 2),
+                "pico_kb": round(pico / 1024, 2),
+            },
+            "snapshots": snapshots,
+            "orm": self.sesiones_orm(),
+            "caches": {nombre: tamano() for nombre, tamano in self._caches.items()},
+            "gc": {
+                "objetos": len(gc.get_objects()),
+                "generaciones": gc.get_count(),
+            },
+        }
+
+
+monitor_memoria = MonitorMemoria()
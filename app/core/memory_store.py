@@ -0,0 +1,459 @@
+"""
+Motor de usuarios en memoria con log de escritura anticipada e instantáneas SQLite
+"""
+
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger("app.memoria")
+
+CAMPOS = ("id", "nombre", "email", "edad", "activo", "created_at", "updated_at", "version")
+
+
+class RegistroUsuario:
+    """
+    Un usuario en memoria (inmutable una vez publicado)
+
+    Con __slots__ cada registro ocupa una fracción de lo que ocupa una
+    instancia ORM. Las escrituras reemplazan el registro por uno nuevo en
+    lugar de modificarlo, así que una lectura nunca ve un registro a medias.
+    """
+
+    __slots__ = CAMPOS
+
+    def __init__(self, id, nombre, email, edad, activo, created_at, updated_at, version):
+        self.id = id
+        self.nombre = nombre
+        self.email = email
+        self.edad = edad
+        self.activo = activo
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.version = version
+
+    def como_tupla(self) -> tuple:
+        return tuple(getattr(self, campo) for campo in CAMPOS)
+
+    def con_cambios(self, cambios: dict) -> "RegistroUsuario":
+        valores = dict(zip(CAMPOS, self.como_tupla()))
+        valores.update(cambios)
+        return RegistroUsuario(**valores)
+
+    def __repr__(self):
+        return f"<RegistroUsuario(id={self.id}, email='{self.email}')>"
+
+
+class EmailDuplicado(Exception):
+    pass
+
+
+class VersionNoCoincide(Exception):
+    pass
+
+
+def _a_json(registro: RegistroUsuario) -> list:
+    fila = list(registro.como_tupla())
+    fila[5] = fila[5].isoformat()
+    fila[6] = fila[6].isoformat() if fila[6] else None
+    return fila
+
+
+def _a_sqlite(registro: RegistroUsuario) -> tuple:
+    # Mismo formato de fecha que escribe SQLAlchemy en SQLite
+    fila = list(registro.como_tupla())
+    fila[5] = fila[5].isoformat(" ", "microseconds")
+    fila[6] = fila[6].isoformat(" ", "microseconds") if fila[6] else None
+    return tuple(fila)
+
+
+def _de_fila(fila) -> RegistroUsuario:
+    """Registro desde una fila JSON del log o de SQLite (fechas como texto)"""
+    valores = list(fila)
+    valores[4] = bool(valores[4])
+    valores[5] = datetime.fromisoformat(valores[5])
+    valores[6] = datetime.fromisoformat(valores[6]) if valores[6] else None
+    return RegistroUsuario(*valores)
+
+
+class AlmacenMemoria:
+    """
+    Todos los usuarios en memoria, con índices para cada lectura de la API
+
+    - `por_id` y `por_email`: dicts para búsquedas puntuales
+    - `_ids`, y `_ids_activo[True/False]`: ids ordenados para paginar
+    - `_por_creacion`: pares (created_at, id) ordenados para `usuarios_hoy` y la serie de registros
+
+    Cada escritura se anexa primero al log (`ruta_log`, una línea JSON con
+    el estado completo de la fila) y después se aplica en memoria. Cada
+    `intervalo` segundos el estado completo se vuelca a SQLite
+    (`ruta_instantanea`, mismo esquema que la BD principal) y el log se
+    descarta. Al arrancar se carga la instantánea y se reproduce el log.
+
+    Es un motor de un solo proceso: con varios workers cada uno tendría su
+    propia copia de los datos.
+    """
+
+    def __init__(self, ruta_instantanea: str, ruta_log: Optional[str] = None, sincronizar: bool = False):
+        self.ruta_instantanea = ruta_instantanea
+        self.ruta_log = ruta_log or ruta_instantanea + ".log"
+        self.sincronizar = sincronizar
+        self.por_id: Dict[int, RegistroUsuario] = {}
+        self.por_email: Dict[str, int] = {}
+        self._ids: List[int] = []
+        self._ids_activo: Dict[bool, List[int]] = {True: [], False: []}
+        self._por_creacion: List[Tuple[datetime, int]] = []
+        self._siguiente_id = 1
+        self._lock = threading.RLock()
+        self._lock_instantanea = threading.Lock()
+        self._fd: Optional[int] = None
+        self._cargado = False
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self.escrituras_en_log = 0
+        self.instantaneas = 0
+        self.ultima_instantanea: Optional[dict] = None
+
+    # ---- índices ----
+
+    @staticmethod
+    def _quitar(lista: list, valor):
+        posicion = bisect.bisect_left(lista, valor)
+        if posicion < len(lista) and lista[posicion] == valor:
+            del lista[posicion]
+
+    @staticmethod
+    def _insertar(lista: list, valor):
+        # Los ids nuevos suelen ser los mayores: anexar es O(1)
+        if not lista or lista[-1] < valor:
+            lista.append(valor)
+        else:
+            bisect.insort(lista, valor)
+
+    def _indexar(self, registro: RegistroUsuario):
+        self.por_id[registro.id] = registro
+        self.por_email[registro.email] = registro.id
+        self._insertar(self._ids, registro.id)
+        self._insertar(self._ids_activo[bool(registro.activo)], registro.id)
+        self._insertar(self._por_creacion, (registro.created_at, registro.id))
+        self._siguiente_id = max(self._siguiente_id, registro.id + 1)
+
+    def _desindexar(self, registro: RegistroUsuario):
+        del self.por_id[registro.id]
+        if self.por_email.get(registro.email) == registro.id:
+            del self.por_email[registro.email]
+        self._quitar(self._ids, registro.id)
+        self._quitar(self._ids_activo[bool(registro.activo)], registro.id)
+        self._quitar(self._por_creacion, (registro.created_at, registro.id))
+
+    def _aplicar(self, operacion: str, datos):
+        anterior = self.por_id.get(datos if operacion == "d" else datos.id)
+        if anterior is not None:
+            self._desindexar(anterior)
+        if operacion != "d":
+            self._indexar(datos)
+
+    # ---- log ----
+
+    def _anotar(self, operacion: str, datos):
+        entrada = {"op": operacion, "id": datos} if operacion == "d" else {"op": operacion, "r": _a_json(datos)}
+        os.write(self._fd, (json.dumps(entrada, ensure_ascii=False) + "\n").encode("utf-8"))
+        if self.sincronizar:
+            os.fsync(self._fd)
+        self.escrituras_en_log += 1
+
+    def _escribir(self, operacion: str, datos):
+        """Anexar al log y después aplicar en memoria (con el lock tomado)"""
+        self._anotar(operacion, datos)
+        self._aplicar(operacion, datos)
+
+    def _abrir_log(self):
+        directorio = os.path.dirname(self.ruta_log)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._fd = os.open(self.ruta_log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _reproducir(self, ruta: str) -> int:
+        if not os.path.exists(ruta):
+            return 0
+        aplicadas = 0
+        with open(ruta, "rb+") as f:
+            valido = 0
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Última línea a medias por una caída: se corta para que
+                    # las escrituras nuevas no queden detrás de ella
+                    logger.warning("Línea incompleta al final de %s", ruta)
+                    f.truncate(valido)
+                    break
+                valido += len(linea)
+                if entrada["op"] == "d":
+                    if entrada["id"] in self.por_id:
+                        self._aplicar("d", entrada["id"])
+                else:
+                    self._aplicar(entrada["op"], _de_fila(entrada["r"]))
+                aplicadas += 1
+        return aplicadas
+
+    # ---- carga e instantáneas ----
+
+    def cargar(self, importar: Optional[Callable[[], Iterable[RegistroUsuario]]] = None) -> dict:
+        """
+        Cargar la instantánea y reproducir el log
+
+        Si no hay ni instantánea ni log (primer arranque), `importar()`
+        entrega los usuarios iniciales, por ejemplo los de la BD principal.
+        """
+        inicio = time.perf_counter()
+        with self._lock:
+            origen = "vacio"
+            if os.path.exists(self.ruta_instantanea):
+                conn = sqlite3.connect(f"file:{self.ruta_instantanea}?mode=ro", uri=True)
+                try:
+                    for fila in conn.execute(f"SELECT {', '.join(CAMPOS)} FROM usuarios ORDER BY id"):
+                        self._indexar(_de_fila(fila))
+                finally:
+                    conn.close()
+                origen = "instantanea"
+            elif importar is not None and not os.path.exists(self.ruta_log):
+                for registro in importar():
+                    self._indexar(registro)
+                origen = "importacion"
+            reproducidas = self._reproducir(self.ruta_log + ".previo") + self._reproducir(self.ruta_log)
+            self._abrir_log()
+            self._cargado = True
+        return {
+            "origen": origen,
+            "usuarios": len(self.por_id),
+            "entradas_log": reproducidas,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+    def instantanea(self) -> dict:
+        """
+        Volcar el estado a SQLite y descartar el log ya incluido
+
+        Bajo el lock solo se copia la lista de registros (son inmutables) y
+        se rota el log; la escritura del archivo ocurre sin bloquear a nadie.
+        La instantánea se escribe en un archivo temporal y se reemplaza con
+        os.replace, así que una caída a mitad deja intacta la anterior.
+        """
+        with self._lock_instantanea:
+            inicio = time.perf_counter()
+            previo = self.ruta_log + ".previo"
+            with self._lock:
+                registros = [self.por_id[usuario_id] for usuario_id in self._ids]
+                os.close(self._fd)
+                if os.path.exists(previo):
+                    # Una instantánea anterior falló: se conservan ambas partes
+                    with open(previo, "ab") as destino, open(self.ruta_log, "rb") as origen:
+                        destino.write(origen.read())
+                    os.remove(self.ruta_log)
+                elif os.path.exists(self.ruta_log):
+                    os.replace(self.ruta_log, previo)
+                self._abrir_log()
+                self.escrituras_en_log = 0
+
+            temporal = self.ruta_instantanea + ".tmp"
+            _escribir_sqlite(temporal, registros)
+            os.replace(temporal, self.ruta_instantanea)
+            if os.path.exists(previo):
+                os.remove(previo)
+
+            self.instantaneas += 1
+            self.ultima_instantanea = {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "usuarios": len(registros),
+                "segundos": round(time.perf_counter() - inicio, 3),
+            }
+            return self.ultima_instantanea
+
+    def iniciar_instantaneas(self, intervalo: float):
+        """Hilo que toma una instantánea cada `intervalo` segundos si hubo escrituras"""
+        if self._hilo is not None or intervalo <= 0:
+            return
+        self._detener.clear()
+
+        def bucle():
+            while not self._detener.wait(intervalo):
+                if self.escrituras_en_log:
+                    try:
+                        self.instantanea()
+                    except Exception:
+                        logger.exception("Falló la instantánea de %s", self.ruta_instantanea)
+
+        self._hilo = threading.Thread(target=bucle, name="instantaneas-memoria", daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        """Detener el hilo, tomar una última instantánea y cerrar el log"""
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+            self._hilo = None
+        if not self._cargado:
+            return
+        if self.escrituras_en_log:
+            self.instantanea()
+        with self._lock:
+            os.close(self._fd)
+            self._fd = None
+            self._cargado = False
+
+    # ---- lecturas ----
+
+    def listar(self, skip: int = 0, limit: int = 100, activo: Optional[bool] = None) -> List[RegistroUsuario]:
+        with self._lock:
+            ids = self._ids if activo is None else self._ids_activo[bool(activo)]
+            return [self.por_id[usuario_id] for usuario_id in ids[skip:skip + limit]]
+
+    def obtener(self, usuario_id: int) -> Optional[RegistroUsuario]:
+        return self.por_id.get(usuario_id)
+
+    def obtener_por_email(self, email: str) -> Optional[RegistroUsuario]:
+        with self._lock:
+            usuario_id = self.por_email.get(email)
+            return self.por_id.get(usuario_id) if usuario_id is not None else None
+
+    def estadisticas(self, desde: Optional[datetime] = None) -> dict:
+        """Conteos como `obtener_estadisticas`; `usuarios_hoy` desde el inicio del día"""
+        desde = desde or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        with self._lock:
+            total = len(self._ids)
+            activos = len(self._ids_activo[True])
+            hoy = len(self._por_creacion) - bisect.bisect_left(self._por_creacion, (desde, 0))
+        return {
+            "total_usuarios": total,
+            "usuarios_activos": activos,
+            "usuarios_inactivos": total - activos,
+            "usuarios_hoy": hoy,
+        }
+
+    def creados_entre(self, inicio: datetime, fin: datetime) -> List[datetime]:
+        """`created_at` de los usuarios creados en [inicio, fin)"""
+        with self._lock:
+            desde = bisect.bisect_left(self._por_creacion, (inicio, 0))
+            hasta = bisect.bisect_left(self._por_creacion, (fin, 0))
+            return [creado for creado, _ in self._por_creacion[desde:hasta]]
+
+    # ---- escrituras ----
+
+    def crear(self, datos: dict) -> RegistroUsuario:
+        ahora = datetime.utcnow()
+        with self._lock:
+            if datos["email"] in self.por_email:
+                raise EmailDuplicado(datos["email"])
+            registro = RegistroUsuario(
+                id=self._siguiente_id,
+                nombre=datos["nombre"],
+                email=datos["email"],
+                edad=datos.get("edad"),
+                activo=datos.get("activo", True),
+                created_at=ahora,
+                updated_at=ahora,
+                version=1,
+            )
+            self._escribir("c", registro)
+            return registro
+
+    def actualizar(self, usuario_id: int, cambios: dict, version_esperada: Optional[int] = None) -> RegistroUsuario:
+        with self._lock:
+            actual = self.por_id.get(usuario_id)
+            if actual is None:
+                raise KeyError(usuario_id)
+            if version_esperada is not None and actual.version != version_esperada:
+                raise VersionNoCoincide(usuario_id)
+            email = cambios.get("email")
+            if email is not None and self.por_email.get(email, usuario_id) != usuario_id:
+                raise EmailDuplicado(email)
+            registro = actual.con_cambios(
+                {**cambios, "version": actual.version + 1, "updated_at": datetime.utcnow()}
+            )
+            self._escribir("u", registro)
+            return registro
+
+    def eliminar(self, usuario_id: int) -> RegistroUsuario:
+        with self._lock:
+            actual = self.por_id.get(usuario_id)
+            if actual is None:
+                raise KeyError(usuario_id)
+            self._escribir("d", usuario_id)
+            return actual
+
+    def estado(self) -> dict:
+        return {
+            "usuarios": len(self.por_id),
+            "escrituras_en_log": self.escrituras_en_log,
+            "instantaneas": self.instantaneas,
+            "ultima_instantanea": self.ultima_instantanea,
+            "ruta_instantanea": self.ruta_instantanea,
+        }
+
+
+def _escribir_sqlite(ruta: str, registros: List[RegistroUsuario]):
+    """Archivo SQLite nuevo con el esquema de la app y todos los registros"""
+    from sqlalchemy import create_engine
+
+    from app.database import crear_esquema
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    engine = create_engine(f"sqlite:///{ruta}")
+    crear_esquema(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("BEGIN")
+        conn.executemany(
+            f"INSERT INTO usuarios ({', '.join(CAMPOS)}) VALUES ({', '.join('?' * len(CAMPOS))})",
+            (_a_sqlite(registro) for registro in registros),
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    # El archivo debe estar en disco antes de reemplazar la instantánea anterior
+    with open(ruta, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def importar_de_sqlalchemy(session_factory, lote: int = 10_000) -> Iterator[RegistroUsuario]:
+    """Usuarios de la BD principal, para el primer arranque del motor en memoria"""
+    from app.models.user import UsuarioORM
+
+    db = session_factory()
+    try:
+        consulta = db.query(*(getattr(UsuarioORM, campo) for campo in CAMPOS))
+        for fila in consulta.order_by(UsuarioORM.id).yield_per(lote):
+            yield RegistroUsuario(*fila)
+    finally:
+        db.close()
+
+
+class SesionMemoria:
+    """Lo que entrega `get_db` con el motor en memoria (no hay nada que cerrar)"""
+
+    def __init__(self, almacen: AlmacenMemoria):
+        self.almacen = almacen
+
+    def close(self):
+        pass
+
+
+# Almacén del proceso (None = motor SQLAlchemy)
+almacen_memoria = (
+    AlmacenMemoria(settings.memory_snapshot_path, sincronizar=settings.memory_wal_fsync)
+    if settings.user_repository == "memoria" else None
+)
@@ -0,0 +1,234 @@
+"""
+Métricas de peticiones HTTP en formato Prometheus (multi-proceso)
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Límites superiores (segundos) del histograma de latencia
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (nombre, tipo, ayuda, etiquetas, valor)
+Muestra = Tuple[str, str, str, Tuple[Tuple[str, str], ...], float]
+
+
+class _Histograma:
+    __slots__ = ("cuentas", "suma", "total")
+
+    def __init__(self, n_buckets: int):
+        self.cuentas = [0] * (n_buckets + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+
+class RegistroMetricas:
+    """
+    Contadores y histogramas de latencia por ruta (plantilla), método y status
+
+    Cada observación es una búsqueda binaria y tres sumas bajo un lock. Con
+    varios workers, cada proceso vuelca periódicamente su estado a un
+    directorio compartido y `/api/metrics` suma los archivos de los
+    procesos vivos. Al apagar, cada worker borra el suyo (`retirar`).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._peticiones: Dict[Tuple[str, str, str], int] = {}
+        self._latencias: Dict[Tuple[str, str], _Histograma] = {}
+        self._colectores: List[Callable[[], Iterable[Muestra]]] = []
+        self._directorio: Optional[str] = None
+
+    def observar(self, metodo: str, ruta: str, status: int, duracion: float):
+        indice = bisect_left(self.buckets, duracion)
+        with self._lock:
+            clave = (metodo, ruta, str(status))
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+            histograma = self._latencias.get((metodo, ruta))
+            if histograma is None:
+                histograma = self._latencias[(metodo, ruta)] = _Histograma(len(self.buckets))
+            histograma.cuentas[indice] += 1
+            histograma.suma += duracion
+            histograma.total += 1
+
+    def series(self) -> int:
+        """Cantidad de series de contadores e histogramas en memoria"""
+        return len(self._peticiones) + len(self._latencias)
+
+    def registrar_colector(self, colector: Callable[[], Iterable[Muestra]]):
+        """Añadir métricas de otros componentes (se leen al exportar)"""
+        self._colectores.append(colector)
+
+    def snapshot(self) -> dict:
+        """Estado del proceso en un formato serializable y sumable"""
+        with self._lock:
+            peticiones = [[*clave, valor] for clave, valor in self._peticiones.items()]
+            latencias = [
+                [metodo, ruta, list(h.cuentas), h.suma, h.total]
+                for (metodo, ruta), h in self._latencias.items()
+            ]
+        extras = []
+        for colector in self._colectores:
+            for nombre, tipo, ayuda, etiquetas, valor in colector():
+                extras.append([nombre, tipo, ayuda, [list(e) for e in etiquetas], valor])
+        return {
+            "buckets": list(self.buckets),
+            "peticiones": peticiones,
+            "latencias": latencias,
+            "extras": extras,
+        }
+
+    # --- Modo multi-proceso -------------------------------------------------
+
+    def iniciar_volcado(self, directorio: str, intervalo: float = 5.0):
+        """Volcar el snapshot de este proceso a `directorio` cada `intervalo` s"""
+        os.makedirs(directorio, exist_ok=True)
+        self._directorio = directorio
+        hilo = threading.Thread(
+            target=self._bucle_volcado, args=(intervalo,), name="metricas", daemon=True
+        )
+        hilo.start()
+        atexit.register(self.retirar)
+
+    def _bucle_volcado(self, intervalo: float):
+        while True:
+            time.sleep(intervalo)
+            self.volcar()
+
+    def _archivo(self, pid: int) -> str:
+        return os.path.join(self._directorio, f"metricas_{pid}.json")
+
+    def volcar(self):
+        if not self._directorio:
+            return
+        destino = self._archivo(os.getpid())
+        temporal = f"{destino}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(temporal, destino)
+
+    def retirar(self):
+        """Borrar el archivo de este proceso y dejar de volcar (al apagar el worker)"""
+        if not self._directorio:
+            return
+        destino, self._directorio = self._archivo(os.getpid()), None
+        try:
+            os.remove(destino)
+        except FileNotFoundError:
+            pass
+
+    def recolectar(self) -> List[dict]:
+        """Snapshots de todos los procesos (o solo el propio sin directorio)"""
+        if not self._directorio:
+            return [self.snapshot()]
+        self.volcar()
+        snapshots = []
+        for ruta in glob.glob(os.path.join(self._directorio, "metricas_*.json")):
+            pid = os.path.basename(ruta)[len("metricas_"):-len(".json")]
+            if pid.isdigit() and not _proceso_vivo(int(pid)):
+                # Worker muerto o reiniciado sin apagarse: sus gauges ya no valen
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Archivo a medio escribir por otro worker: se omite esta vez
+                continue
+        return snapshots
+
+    # --- Exportación ------------------------------------------------------
+
+    def exportar_prometheus(self) -> str:
+        return exportar_prometheus(self.recolectar(), self.buckets)
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(pares) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+def exportar_prometheus(snapshots: List[dict], buckets: Tuple[float, ...] = BUCKETS) -> str:
+    """Sumar los snapshots de todos los procesos y formatearlos (text 0.0.4)"""
+    peticiones: Dict[tuple, float] = {}
+    latencias: Dict[tuple, list] = {}
+    extras: Dict[str, dict] = {}
+
+    for snap in snapshots:
+        if tuple(snap.get("buckets", ())) != tuple(buckets):
+            continue
+        for metodo, ruta, status, valor in snap["peticiones"]:
+            clave = (metodo, ruta, status)
+            peticiones[clave] = peticiones.get(clave, 0) + valor
+        for metodo, ruta, cuentas, suma, total in snap["latencias"]:
+            acumulado = latencias.setdefault((metodo, ruta), [[0] * len(cuentas), 0.0, 0])
+            acumulado[0] = [a + b for a, b in zip(acumulado[0], cuentas)]
+            acumulado[1] += suma
+            acumulado[2] += total
+        for nombre, tipo, ayuda, etiquetas, valor in snap.get("extras", []):
+            familia = extras.setdefault(nombre, {"tipo": tipo, "ayuda": ayuda, "valores": {}})
+            clave = tuple(tuple(e) for e in etiquetas)
+            familia["valores"][clave] = familia["valores"].get(clave, 0) + valor
+
+    lineas = [
+        "# HELP http_requests_total Peticiones HTTP por método, ruta y status",
+        "# TYPE http_requests_total counter",
+    ]
+    for (metodo, ruta, status), valor in sorted(peticiones.items()):
+        etiquetas = _etiquetas((("method", metodo), ("route", ruta), ("status", status)))
+        lineas.append(f"http_requests_total{etiquetas} {_numero(valor)}")
+
+    lineas += [
+        "# HELP http_request_duration_seconds Latencia de peticiones HTTP",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (metodo, ruta), (cuentas, suma, total) in sorted(latencias.items()):
+        acumulado = 0
+        for limite, cuenta in zip((*buckets, "+Inf"), cuentas):
+            acumulado += cuenta
+            etiquetas = _etiquetas((("method", metodo), ("route", ruta), ("le", limite)))
+            lineas.append(f"http_request_duration_seconds_bucket{etiquetas} {acumulado}")
+        base = _etiquetas((("method", metodo), ("route", ruta)))
+        lineas.append(f"http_request_duration_seconds_sum{base} {_numero(suma)}")
+        lineas.append(f"http_request_duration_seconds_count{base} {total}")
+
+    for nombre, familia in sorted(extras.items()):
+        lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+        lineas.append(f"# TYPE {nombre} {familia['tipo']}")
+        for etiquetas, valor in sorted(familia["valores"].items()):
+            lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+    return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
@@ -0,0 +1,150 @@
+"""
+Profiler de muestreo de pilas para workers en ejecución
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+# Funciones hoja que indican un hilo ocioso (esperando trabajo o E/S)
+_FUNCIONES_OCIOSAS = frozenset({
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("selectors", "select"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+})
+
+
+class MuestreadorPerfil:
+    """
+    Muestreo periódico de las pilas de todos los hilos del proceso
+
+    Un hilo auxiliar lee `sys._current_frames()` cada `intervalo` segundos y
+    acumula las pilas en formato colapsado (raíz;...;hoja), listo para
+    flamegraph.pl o speedscope. Sin muestreo activo no hay ningún costo.
+    """
+
+    def __init__(self, intervalo: float = 0.005, incluir_ociosos: bool = False):
+        self.intervalo = intervalo
+        self.incluir_ociosos = incluir_ociosos
+        self.muestras: Counter = Counter()
+        self.total_muestras = 0
+        self._etiquetas: Dict[object, str] = {}
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name="profiler", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> Counter:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        return self.muestras
+
+    def _bucle(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            nombres = {h.ident: h.name for h in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = self._colapsar(frame)
+                if pila is None:
+                    continue
+                self.muestras[f"{nombres.get(ident, ident)};{pila}"] += 1
+            self.total_muestras += 1
+
+    def _etiqueta(self, frame) -> str:
+        codigo = frame.f_code
+        etiqueta = self._etiquetas.get(codigo)
+        if etiqueta is None:
+            modulo = frame.f_globals.get("__name__") or os.path.basename(codigo.co_filename)
+            etiqueta = f"{modulo}:{codigo.co_name}"
+            self._etiquetas[codigo] = etiqueta
+        return etiqueta
+
+    def _colapsar(self, frame) -> Optional[str]:
+        if not self.incluir_ociosos:
+            modulo = frame.f_globals.get("__name__")
+            if (modulo, frame.f_code.co_name) in _FUNCIONES_OCIOSAS:
+                return None
+        pila = []
+        while frame is not None:
+            pila.append(self._etiqueta(frame))
+            frame = frame.f_back
+        pila.reverse()
+        return ";".join(pila)
+
+
+def formato_colapsado(muestras: Counter) -> str:
+    """Una línea por pila: `marco;marco;... cuenta`"""
+    return "".join(f"{pila} {cuenta}\n" for pila, cuenta in muestras.most_common())
+
+
+class GestorPerfiles:
+    """
+    Coordina los perfiles del proceso (uno a la vez) y guarda los resultados
+    de peticiones perfiladas individualmente
+    """
+
+    def __init__(self, max_resultados: int = 20):
+        self._lock = threading.Lock()
+        self._activo = False
+        self._resultados: "OrderedDict[str, str]" = OrderedDict()
+        self._max_resultados = max_resultados
+        self._secuencia = 0
+
+    def comenzar(self, intervalo: float, incluir_ociosos: bool = False) -> Optional[MuestreadorPerfil]:
+        """Iniciar un muestreo; None si ya hay otro en curso"""
+        with self._lock:
+            if self._activo:
+                return None
+            self._activo = True
+        muestreador = MuestreadorPerfil(intervalo, incluir_ociosos)
+        muestreador.iniciar()
+        return muestreador
+
+    def terminar(self, muestreador: MuestreadorPerfil) -> Counter:
+        try:
+            return muestreador.detener()
+        finally:
+            with self._lock:
+                self._activo = False
+
+    def guardar(self, muestras: Counter) -> str:
+        """Guardar el perfil de una petición y devolver su id"""
+        with self._lock:
+            self._secuencia += 1
+            perfil_id = f"{os.getpid()}-{self._secuencia}"
+            self._resultados[perfil_id] = formato_colapsado(muestras)
+            while len(self._resultados) > self._max_resultados:
+                self._resultados.popitem(last=False)
+        return perfil_id
+
+    def guardados(self) -> int:
+        return len(self._resultados)
+
+    def obtener(self, perfil_id: str) -> Optional[str]:
+        with self._lock:
+            return self._resultados.get(perfil_id)
+
+
+gestor_perfiles = GestorPerfiles()
+
+
+async def perfilar_por(segundos: float, intervalo: float, incluir_ociosos: bool = False) -> Optional[str]:
+    """Muestrear el proceso `segundos` y devolver las pilas colapsadas"""
+    muestreador = gestor_perfiles.comenzar(intervalo, incluir_ociosos)
+    if muestreador is None:
+        return None
+    try:
+        await asyncio.sleep(segundos)
+    finally:
+        muestras = gestor_perfiles.terminar(muestreador)
+    return formato_colapsado(muestras)
@@ -0,0 +1,163 @@
+"""
+Instrumentación de consultas SQL por petición (conteo, tiempo, consultas lentas)
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger("app.sql")
+
+
+class EstadisticasPeticion:
+    """Consultas ejecutadas durante una petición HTTP"""
+
+    __slots__ = ("consultas", "tiempo_db", "lentas")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.lentas = 0
+
+
+# El objeto se comparte con el threadpool (copia del contexto), así que las
+# consultas ejecutadas en endpoints síncronos se suman a la misma petición
+_peticion_actual: ContextVar[Optional[EstadisticasPeticion]] = ContextVar(
+    "estadisticas_sql", default=None
+)
+
+
+def iniciar_peticion() -> EstadisticasPeticion:
+    estadisticas = EstadisticasPeticion()
+    _peticion_actual.set(estadisticas)
+    return estadisticas
+
+
+def estadisticas_actuales() -> Optional[EstadisticasPeticion]:
+    return _peticion_actual.get()
+
+
+def describir_parametros(parameters) -> str:
+    """Tipos de los parámetros, sin sus valores (emails, nombres)"""
+    if isinstance(parameters, dict):
+        return repr({clave: type(valor).__name__ for clave, valor in parameters.items()})
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} conjuntos de {describir_parametros(parameters[0])}"
+        return repr(tuple(type(valor).__name__ for valor in parameters))
+    return type(parameters).__name__
+
+
+class MonitorConsultas:
+    """
+    Hooks de cursor sobre el engine de SQLAlchemy
+
+    Cada consulta suma su duración a la petición en curso. Las que superan
+    el umbral se registran en el log con su `EXPLAIN QUERY PLAN` y se
+    guardan en un buffer para /api/sql/lentas. De los parámetros solo se
+    anotan los tipos, salvo con `con_parametros` (SQL_LOG_PARAMETERS).
+    """
+
+    def __init__(self, umbral_lenta: float = 0.1, max_lentas: int = 100, con_parametros: bool = False):
+        self.umbral_lenta = umbral_lenta
+        self.con_parametros = con_parametros
+        self._lentas: deque = deque(maxlen=max_lentas)
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.consultas_lentas = 0
+        self.tiempo_total = 0.0
+        self.peticiones_n_mas_1 = 0
+
+    def instrumentar(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+
+        with self._lock:
+            self.consultas += 1
+            self.tiempo_total += duracion
+
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.consultas += 1
+            peticion.tiempo_db += duracion
+
+        if duracion >= self.umbral_lenta:
+            if peticion is not None:
+                peticion.lentas += 1
+            self._registrar_lenta(conn, statement, parameters, duracion, executemany)
+
+    def _registrar_lenta(self, conn, statement, parameters, duracion, executemany):
+        plan = None if executemany else self._plan(conn, statement, parameters)
+        parametros = repr(parameters) if self.con_parametros else describir_parametros(parameters)
+        registro = {
+            "timestamp": datetime.now().isoformat(),
+            "duracion_ms": round(duracion * 1000, 3),
+            "sql": statement,
+            "parametros": parametros,
+            "plan": plan,
+        }
+        with self._lock:
+            self.consultas_lentas += 1
+            self._lentas.append(registro)
+        logger.warning(
+            "Consulta lenta (%.1f ms): %s | parámetros=%s | plan=%s",
+            duracion * 1000, statement, parametros, plan
+        )
+
+    @staticmethod
+    def _plan(conn, statement, parameters) -> Optional[List[str]]:
+        # Cursor DBAPI directo para no volver a disparar los hooks
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return [fila[-1] for fila in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception:
+            return None
+
+    def registrar_n_mas_1(self):
+        with self._lock:
+            self.peticiones_n_mas_1 += 1
+
+    def lentas_guardadas(self) -> int:
+        return len(self._lentas)
+
+    def consultas_lentas_recientes(self) -> List[dict]:
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def estado(self) -> dict:
+        return {
+            "consultas": self.consultas,
+            "consultas_lentas": self.consultas_lentas,
+            "tiempo_total_ms": round(self.tiempo_total * 1000, 3),
+            "peticiones_n_mas_1": self.peticiones_n_mas_1,
+            "umbral_lenta_ms": self.umbral_lenta * 1000,
+        }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        yield ("db_queries_total", "counter", "Consultas SQL ejecutadas", (), self.consultas)
+        yield ("db_query_seconds_total", "counter", "Tiempo total en SQLite", (), self.tiempo_total)
+        yield ("db_slow_queries_total", "counter", "Consultas sobre el umbral de lentitud", (), self.consultas_lentas)
+        yield ("db_n_plus_one_requests_total", "counter", "Peticiones con demasiadas consultas", (), self.peticiones_n_mas_1)
+
+
+monitor_consultas = MonitorConsultas(settings.sql_slow_query_ms / 1000, con_parametros=settings.sql_log_parameters)
@@ -0,0 +1,191 @@
+"""
+Almacenamiento de usuarios repartido por hash entre varios archivos SQLite
+"""
+
+import contextvars
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+# Tablas propias del modo fragmentado (además de las del modelo)
+metadata_fragmentos = MetaData()
+
+# Índice de emails: cada email vive en el fragmento que indica su hash, así
+# la restricción UNIQUE local basta para que sea único en todo el sistema
+emails_usuarios = Table(
+    "emails_usuarios",
+    metadata_fragmentos,
+    Column("email", String, primary_key=True),
+    Column("usuario_id", Integer, nullable=False),
+)
+
+# Secuencia global de IDs (solo se usa en el fragmento 0)
+secuencias = Table(
+    "secuencias",
+    metadata_fragmentos,
+    Column("nombre", String, primary_key=True),
+    Column("siguiente", Integer, nullable=False),
+)
+
+SECUENCIA_USUARIOS = "usuarios"
+BLOQUE_IDS = 100
+
+
+def fragmento_de_id(usuario_id: int, total: int) -> int:
+    """Fragmento que guarda la fila del usuario (estable entre procesos y versiones)"""
+    return zlib.crc32(int(usuario_id).to_bytes(8, "little")) % total
+
+
+def fragmento_de_email(email: str, total: int) -> int:
+    """Fragmento que guarda la entrada del email en el índice de unicidad"""
+    return zlib.crc32(email.lower().encode("utf-8")) % total
+
+
+def rutas_fragmentos(plantilla: str, total: int) -> List[str]:
+    """`./usuarios_{n}.db` -> ['./usuarios_0.db', './usuarios_1.db', ...]"""
+    if total > 1 and "{n}" not in plantilla:
+        raise ValueError("La plantilla de fragmentos debe contener {n}")
+    return [plantilla.format(n=n) for n in range(total)]
+
+
+class AsignadorIds:
+    """
+    IDs únicos en todos los fragmentos, reservados por bloques (hi/lo)
+
+    Cada proceso reserva `bloque` IDs de una vez en la tabla `secuencias`
+    del fragmento 0 (bajo `BEGIN IMMEDIATE`, así dos workers nunca reciben
+    el mismo bloque) y los entrega desde memoria. Los IDs son únicos pero
+    solo crecientes dentro de cada proceso.
+    """
+
+    def __init__(self, engine: Engine, bloque: int = BLOQUE_IDS, nombre: str = SECUENCIA_USUARIOS):
+        self.engine = engine
+        self.bloque = bloque
+        self.nombre = nombre
+        self._siguiente = 0
+        self._limite = 0
+        self._lock = threading.Lock()
+
+    def _reservar(self):
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            actual = conn.exec_driver_sql(
+                "SELECT siguiente FROM secuencias WHERE nombre = ?", (self.nombre,)
+            ).scalar()
+            if actual is None:
+                actual = 1
+                conn.exec_driver_sql(
+                    "INSERT INTO secuencias (nombre, siguiente) VALUES (?, ?)",
+                    (self.nombre, actual + self.bloque),
+                )
+            else:
+                conn.exec_driver_sql(
+                    "UPDATE secuencias SET siguiente = ? WHERE nombre = ?",
+                    (actual + self.bloque, self.nombre),
+                )
+            conn.commit()
+        self._siguiente = actual
+        self._limite = actual + self.bloque
+
+    def siguiente(self) -> int:
+        with self._lock:
+            if self._siguiente >= self._limite:
+                self._reservar()
+            valor = self._siguiente
+            self._siguiente += 1
+            return valor
+
+
+class Fragmentos:
+    """
+    Un motor y una fábrica de sesiones por archivo SQLite
+
+    `crear_motor(url)` construye cada motor (la misma configuración de
+    pragmas e instrumentación que la BD principal). Las consultas que
+    recorren todos los fragmentos se lanzan en paralelo en un pool de hilos.
+    """
+
+    def __init__(self, rutas: List[str], crear_motor: Callable[[str], Engine]):
+        if not rutas:
+            raise ValueError("Se necesita al menos un fragmento")
+        self.rutas = rutas
+        self.motores = [crear_motor(f"sqlite:///{ruta}") for ruta in rutas]
+        self.fabricas = [
+            sessionmaker(autocommit=False, autoflush=False, bind=motor) for motor in self.motores
+        ]
+        self.ids = AsignadorIds(self.motores[0])
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return len(self.motores)
+
+    def asegurar_esquema(self) -> List[bool]:
+        """Crear o migrar el esquema en cada fragmento"""
+        from app.database import asegurar_esquema
+
+        aplicados = []
+        for motor in self.motores:
+            aplicados.append(asegurar_esquema(motor))
+            metadata_fragmentos.create_all(bind=motor)
+        return aplicados
+
+    def en_paralelo(self, funcion: Callable, argumentos: List[tuple]) -> List:
+        """`funcion(*args)` para cada elemento, en paralelo y en el mismo orden"""
+        if len(argumentos) == 1:
+            return [funcion(*argumentos[0])]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.total, thread_name_prefix="fragmento")
+        # Cada tarea hereda el contexto de la petición (conteo de consultas)
+        futuros = [
+            self._pool.submit(contextvars.copy_context().run, funcion, *args) for args in argumentos
+        ]
+        return [futuro.result() for futuro in futuros]
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        for motor in self.motores:
+            motor.dispose()
+
+
+class SesionFragmentada:
+    """
+    Ocupa el lugar de la `Session` en las dependencias cuando hay fragmentos
+
+    Abre la sesión de cada fragmento la primera vez que se usa y las cierra
+    todas juntas; `UsuarioService` la reconoce y enruta cada operación.
+    """
+
+    def __init__(self, fragmentos: Fragmentos):
+        self.fragmentos = fragmentos
+        self._sesiones: Dict[int, Session] = {}
+
+    def sesion(self, indice: int) -> Session:
+        sesion = self._sesiones.get(indice)
+        if sesion is None:
+            sesion = self._sesiones[indice] = self.fragmentos.fabricas[indice]()
+        return sesion
+
+    def de_usuario(self, usuario_id: int) -> Session:
+        return self.sesion(fragmento_de_id(usuario_id, self.fragmentos.total))
+
+    def de_email(self, email: str) -> Session:
+        return self.sesion(fragmento_de_email(email, self.fragmentos.total))
+
+    def todas(self) -> List[Session]:
+        return [self.sesion(indice) for indice in range(self.fragmentos.total)]
+
+    def close(self):
+        for sesion in self._sesiones.values():
+            sesion.close()
+        self._sesiones.clear()
@@ -0,0 +1,258 @@
+"""
+Serie temporal de registros: resumen por hora y por día mantenido al insertar
+"""
+
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Connection, text
+
+from app.config import settings
+
+INTERVALOS = ("hora", "dia", "semana")
+MAX_PUNTOS = 10_000
+TABLA = "resumen_registros"
+UTC = "UTC"
+_HORA = timedelta(hours=1)
+
+
+def zona_horaria(nombre: str) -> ZoneInfo:
+    """ZoneInfo por nombre IANA; ValueError si no existe"""
+    try:
+        return ZoneInfo(nombre)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria desconocida: {nombre}")
+
+
+@lru_cache(maxsize=8)
+def _zonas(configuradas: str) -> Tuple[str, ...]:
+    nombres = [UTC] + [z.strip() for z in configuradas.split(",") if z.strip()]
+    for nombre in nombres:
+        zona_horaria(nombre)
+    return tuple(dict.fromkeys(nombres))
+
+
+def zonas_resumen() -> Tuple[str, ...]:
+    """Zonas con resumen diario propio (UTC siempre incluida)"""
+    return _zonas(settings.signup_rollup_zones)
+
+
+def clave(granularidad: str, zona: str, creado: datetime) -> str:
+    """
+    Clave de resumen de un `created_at` (UTC sin tzinfo, como se guarda)
+
+    Las horas se guardan en UTC (`2024-03-01T09`); los días, como fecha
+    local de la zona (`2024-03-01`).
+    """
+    if granularidad == "hora":
+        return creado.strftime("%Y-%m-%dT%H")
+    return creado.replace(tzinfo=timezone.utc).astimezone(zona_horaria(zona)).date().isoformat()
+
+
+def claves_registro(creado: datetime) -> List[Tuple[str, str, str]]:
+    """Filas (zona, granularidad, inicio) que suma un registro creado en `creado`"""
+    return [(UTC, "hora", clave("hora", UTC, creado))] + [
+        (zona, "dia", clave("dia", zona, creado)) for zona in zonas_resumen()
+    ]
+
+
+def ajustar_resumen(conn: Connection, creado: datetime, delta: int):
+    """
+    Sumar `delta` registros en las filas de `creado`, en la transacción de `conn`
+
+    Un único INSERT ... ON CONFLICT para todas las filas, así crear un
+    usuario añade una sola consulta.
+    """
+    claves = claves_registro(creado)
+    valores = ", ".join(f"(:z{i}, :g{i}, :i{i}, :delta)" for i in range(len(claves)))
+    parametros = {"delta": delta}
+    for i, (zona, granularidad, inicio) in enumerate(claves):
+        parametros.update({f"z{i}": zona, f"g{i}": granularidad, f"i{i}": inicio})
+    conn.execute(
+        text(
+            f"INSERT INTO {TABLA} (zona, granularidad, inicio, usuarios) VALUES {valores} "
+            "ON CONFLICT (zona, granularidad, inicio) DO UPDATE SET usuarios = usuarios + excluded.usuarios"
+        ),
+        parametros,
+    )
+
+
+def claves_de_ventana(granularidad: str, zona: str, inicio: datetime, fin: datetime) -> Tuple[str, str]:
+    """Primera y última clave del resumen dentro de la ventana UTC [inicio, fin)"""
+    return clave(granularidad, zona, inicio), clave(granularidad, zona, fin - timedelta(microseconds=1))
+
+
+def conteos_de_fechas(granularidad: str, zona: str, fechas: Iterable[datetime]) -> Dict[str, int]:
+    """Conteos por clave calculados desde los `created_at` (motores sin tabla de resumen)"""
+    return dict(Counter(clave(granularidad, zona, creado) for creado in fechas))
+
+
+# ---- consulta ----
+
+def _utc(momento: datetime) -> datetime:
+    return momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def ventana_utc(desde: date, hasta: date, zona: ZoneInfo) -> Tuple[datetime, datetime]:
+    """Desde la medianoche local de `desde` hasta la de `hasta` + 1 día, en UTC sin tzinfo"""
+    return (
+        _utc(datetime.combine(desde, time(), tzinfo=zona)),
+        _utc(datetime.combine(hasta + timedelta(days=1), time(), tzinfo=zona)),
+    )
+
+
+def fuente(intervalo: str, zona: str) -> Tuple[str, str]:
+    """(granularidad, zona) del resumen que responde la consulta"""
+    if intervalo != "hora" and zona in zonas_resumen():
+        return "dia", zona
+    return "hora", UTC
+
+
+def construir_serie(
+    intervalo: str, desde: date, hasta: date, zona: ZoneInfo, granularidad: str, conteos: Dict[str, int]
+) -> List[dict]:
+    """
+    Puntos del rango con ceros donde no hubo registros
+
+    Las horas se etiquetan con su inicio en hora local (con desfase); los
+    días y semanas (desde el lunes) con la fecha local. Con zonas de
+    desfase no entero (p. ej. +05:30) las horas siguen siendo horas UTC.
+    """
+    if granularidad == "hora":
+        if intervalo == "hora":
+            inicio, fin = ventana_utc(desde, hasta, zona)
+            inicio = inicio.replace(minute=0, second=0, microsecond=0)
+            if (fin - inicio) / _HORA > MAX_PUNTOS:
+                raise ValueError(f"El rango supera {MAX_PUNTOS} puntos")
+            puntos = []
+            while inicio < fin:
+                puntos.append({
+                    "inicio": inicio.replace(tzinfo=timezone.utc).astimezone(zona).isoformat(),
+                    "usuarios": conteos.get(clave("hora", UTC, inicio), 0),
+                })
+                inicio += _HORA
+            return puntos
+        # Días locales a partir de las horas UTC (zona sin resumen diario)
+        por_dia: Dict[str, int] = Counter()
+        for hora, usuarios in conteos.items():
+            momento = datetime.fromisoformat(hora).replace(tzinfo=timezone.utc)
+            por_dia[momento.astimezone(zona).date().isoformat()] += usuarios
+        conteos = por_dia
+
+    if (hasta - desde).days >= MAX_PUNTOS:
+        raise ValueError(f"El rango supera {MAX_PUNTOS} puntos")
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    if intervalo == "dia":
+        return [{"inicio": dia.isoformat(), "usuarios": conteos.get(dia.isoformat(), 0)} for dia in dias]
+    semanas: Dict[date, int] = {}
+    for dia in dias:
+        lunes = dia - timedelta(days=dia.weekday())
+        semanas[lunes] = semanas.get(lunes, 0) + conteos.get(dia.isoformat(), 0)
+    return [{"inicio": lunes.isoformat(), "usuarios": usuarios} for lunes, usuarios in semanas.items()]
+
+
+def serie_registros(
+    leer_conteos: Callable[[str, str, datetime, datetime], Dict[str, int]],
+    intervalo: str,
+    desde: date,
+    hasta: date,
+    zona: str = UTC,
+) -> dict:
+    """
+    Registros por hora, día o semana entre dos fechas locales de `zona`
+
+    `leer_conteos(granularidad, zona, inicio, fin)` retorna los conteos del
+    resumen cuyas claves caen en la ventana UTC [inicio, fin). Los días de
+    una zona configurada salen del resumen diario (una fila por día); el
+    resto, del resumen por hora. ValueError si la zona o el rango no valen.
+    """
+    if intervalo not in INTERVALOS:
+        raise ValueError(f"Intervalo inválido: {intervalo}")
+    if hasta < desde:
+        raise ValueError("'hasta' es anterior a 'desde'")
+    tz = zona_horaria(zona)
+    granularidad, zona_resumen = fuente(intervalo, zona)
+    inicio, fin = ventana_utc(desde, hasta, tz)
+    conteos = leer_conteos(granularidad, zona_resumen, inicio, fin)
+    puntos = construir_serie(intervalo, desde, hasta, tz, granularidad, conteos)
+    return {
+        "intervalo": intervalo,
+        "zona": zona,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "fuente": granularidad,
+        "filas_leidas": len(conteos),
+        "total": sum(punto["usuarios"] for punto in puntos),
+        "puntos": puntos,
+    }
+
+
+# ---- reconstrucción ----
+
+def reconstruir_resumen(conn: Connection) -> dict:
+    """
+    Recalcular la tabla de resumen desde `usuarios`, en la transacción de `conn`
+
+    SQLite agrupa por cuartos de hora UTC (todas las zonas tienen desfases
+    múltiplos de 15 minutos), y cada cuarto se asigna a su hora UTC y a su
+    día local en cada zona configurada: con años de historia son decenas de
+    miles de grupos en lugar de una conversión por usuario.
+    """
+    cuartos = conn.execute(text(
+        "SELECT strftime('%Y-%m-%d %H:', created_at) "
+        "|| printf('%02d', CAST(strftime('%M', created_at) AS INTEGER) / 15 * 15), COUNT(*) "
+        "FROM usuarios WHERE created_at IS NOT NULL GROUP BY 1"
+    )).all()
+    filas: Dict[Tuple[str, str, str], int] = Counter()
+    for cuarto, usuarios in cuartos:
+        creado = datetime.strptime(cuarto, "%Y-%m-%d %H:%M")
+        for fila in claves_registro(creado):
+            filas[fila] += usuarios
+    conn.execute(text(f"DELETE FROM {TABLA}"))
+    if filas:
+        conn.execute(
+            text(
+                f"INSERT INTO {TABLA} (zona, granularidad, inicio, usuarios) "
+                "VALUES (:zona, :granularidad, :inicio, :usuarios)"
+            ),
+            [
+                {"zona": zona, "granularidad": granularidad, "inicio": inicio, "usuarios": usuarios}
+                for (zona, granularidad, inicio), usuarios in filas.items()
+            ],
+        )
+    return {"usuarios": sum(usuarios for _, usuarios in cuartos), "filas": len(filas), "zonas": list(zonas_resumen())}
+
+
+def zonas_faltantes(conn: Connection) -> List[str]:
+    """Zonas configuradas sin resumen diario (p. ej. recién añadidas o BD anterior a la tabla)"""
+    if conn.execute(text("SELECT EXISTS (SELECT 1 FROM usuarios)")).scalar() == 0:
+        return []
+    presentes = {
+        zona for (zona,) in conn.execute(text(f"SELECT DISTINCT zona FROM {TABLA} WHERE granularidad = 'dia'"))
+    }
+    return [zona for zona in zonas_resumen() if zona not in presentes]
+
+
+def asegurar_resumen(engine) -> dict:
+    """
+    Reconstruir el resumen al arrancar si le faltan zonas; retorna lo hecho
+
+    La comprobación se repite bajo `BEGIN IMMEDIATE` para que, con varios
+    workers arrancando a la vez, solo uno reconstruya.
+    """
+    with engine.connect() as conn:
+        if not zonas_faltantes(conn):
+            return {"reconstruido": False}
+        conn.rollback()
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        faltantes = zonas_faltantes(conn)
+        if not faltantes:
+            conn.rollback()
+            return {"reconstruido": False}
+        resumen = reconstruir_resumen(conn)
+        conn.commit()
+    return {"reconstruido": True, "zonas_faltantes": faltantes, **resumen}
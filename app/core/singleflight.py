@@ -0,0 +1,81 @@
+"""
+Coalescencia de lecturas idénticas concurrentes (single-flight)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Vuelo:
+    """Ejecución en curso compartida por todas las peticiones con la misma clave"""
+
+    __slots__ = ("evento", "resultado", "error", "seguidores")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+        self.seguidores = 0
+
+
+class SingleFlight:
+    """
+    Deduplicar lecturas idénticas que llegan mientras otra está en curso
+
+    La primera petición con una clave ejecuta la función; las que llegan
+    antes de que termine esperan y reciben el mismo resultado (o la misma
+    excepción). Los endpoints son síncronos, así que la espera es con
+    primitivas de threading.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self.ejecutadas = 0
+        self.coalescidas = 0
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any]) -> Any:
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.ejecutadas += 1
+            else:
+                vuelo.seguidores += 1
+                self.coalescidas += 1
+
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+        except BaseException as error:
+            vuelo.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.evento.set()
+        return vuelo.resultado
+
+    def estado(self) -> dict:
+        total = self.ejecutadas + self.coalescidas
+        return {
+            "en_curso": len(self._vuelos),
+            "ejecutadas": self.ejecutadas,
+            "coalescidas": self.coalescidas,
+            "ratio_coalescencia": round(self.coalescidas / total, 4) if total else 0.0,
+        }
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        yield ("singleflight_executed_total", "counter", "Lecturas ejecutadas contra la BD", (), self.ejecutadas)
+        yield ("singleflight_coalesced_total", "counter", "Lecturas que reutilizaron una en curso", (), self.coalescidas)
+
+
+# Lecturas de usuarios y estadísticas
+lecturas = SingleFlight()
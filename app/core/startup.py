@@ -0,0 +1,75 @@
+"""
+Arranque de la aplicación: fases medidas y calentamiento de la BD
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger("app.arranque")
+
+
+class InformeArranque:
+    """Duración de cada fase del arranque de este proceso"""
+
+    def __init__(self):
+        self.fases: Dict[str, float] = {}
+        self.detalles: Dict[str, object] = {}
+        self.listo_en: Optional[datetime] = None
+
+    def registrar(self, nombre: str, segundos: float):
+        self.fases[nombre] = segundos
+
+    @contextmanager
+    def fase(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nombre, time.perf_counter() - inicio)
+
+    def terminar(self):
+        self.listo_en = datetime.now()
+        logger.info(
+            "Arranque listo en %.1f ms (%s)",
+            sum(self.fases.values()) * 1000,
+            ", ".join(f"{nombre} {segundos * 1000:.1f} ms" for nombre, segundos in self.fases.items()),
+        )
+
+    def informe(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "listo": self.listo_en is not None,
+            "listo_en": self.listo_en,
+            "total_ms": round(sum(self.fases.values()) * 1000, 3),
+            "fases_ms": {nombre: round(segundos * 1000, 3) for nombre, segundos in self.fases.items()},
+            **self.detalles,
+        }
+
+
+informe_arranque = InformeArranque()
+
+
+def calentar(session_factory) -> dict:
+    """
+    Ejecutar una vez las lecturas frecuentes antes de aceptar tráfico
+
+    Carga en la caché de páginas de SQLite los índices que recorren los
+    conteos y la primera página del listado, y deja compiladas las
+    sentencias en la caché de SQLAlchemy y en la conexión del pool.
+    """
+    from app.services.user_service import UsuarioService
+
+    db = session_factory()
+    try:
+        primera_pagina = UsuarioService.obtener_usuarios(db, limit=50)
+        if primera_pagina:
+            UsuarioService.obtener_usuario_por_id(db, primera_pagina[0].id)
+        UsuarioService.obtener_usuarios(db, limit=50, activo=True)
+        estadisticas = UsuarioService.obtener_estadisticas(db)
+    finally:
+        db.close()
+    return {"usuarios": estadisticas["total_usuarios"]}
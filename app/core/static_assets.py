@@ -0,0 +1,201 @@
+"""
+Manifiesto en memoria de `static/` con variantes precomprimidas
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Response
+
+from app.config import settings
+# brotli es opcional: sin él solo se sirve gzip
+from app.core.compression import aceptadas, brotli
+
+# Tipos que vale la pena comprimir (imágenes y fuentes ya vienen comprimidas)
+TIPOS_COMPRIMIBLES = (
+    "text/", "application/javascript", "application/json", "application/xml",
+    "image/svg+xml", "application/manifest+json", "application/wasm",
+)
+MIN_BYTES_COMPRESION = 1024
+
+# Nombre con hash de contenido al estilo de Vite/webpack: app.3f9a2b1c.js, index-DiwrgTda.js
+_NOMBRE_CON_HASH = re.compile(r"[.-](?=[A-Za-z0-9_-]*[0-9A-Z])[A-Za-z0-9_-]{8,}\.\w+$")
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+
+def _gzip(datos: bytes) -> bytes:
+    # mtime=0: la misma entrada produce siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+# (codificación, extensión del archivo precomprimido, compresor o None)
+COMPRESORES = (
+    ("br", ".br", (lambda datos: brotli.compress(datos, quality=11)) if brotli else None),
+    ("gzip", ".gz", _gzip),
+)
+
+
+def comprimible(media_type: str, tamano: int) -> bool:
+    return tamano >= MIN_BYTES_COMPRESION and media_type.startswith(TIPOS_COMPRIMIBLES)
+
+
+class Recurso:
+    """Un archivo de `static/` con sus bytes, variantes y encabezados precalculados"""
+
+    def __init__(self, ruta: str, contenido: bytes, media_type: str, inmutable: bool):
+        self.ruta = ruta
+        self.media_type = media_type
+        self.hash = hashlib.sha256(contenido).hexdigest()[:16]
+        self.cache_control = CACHE_INMUTABLE if inmutable else CACHE_REVALIDAR
+        # codificación ("" = identidad) -> bytes
+        self.variantes: Dict[str, bytes] = {"": contenido}
+
+    def agregar_variante(self, codificacion: str, contenido: bytes):
+        # Solo si realmente ahorra bytes
+        if len(contenido) < len(self.variantes[""]):
+            self.variantes[codificacion] = contenido
+
+    def etag(self, codificacion: str = "") -> str:
+        return f'"{self.hash}-{codificacion}"' if codificacion else f'"{self.hash}"'
+
+    def coincide(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidatos = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+        return any(self.etag(codificacion) in candidatos for codificacion in self.variantes)
+
+    def bytes_en_memoria(self) -> int:
+        return sum(len(contenido) for contenido in self.variantes.values())
+
+    def respuesta(self, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+        """Respuesta 200 con la mejor variante aceptada, o 304 si el ETag coincide"""
+        codificacion = ""
+        if len(self.variantes) > 1:
+            for candidata in aceptadas(accept_encoding):
+                if candidata in self.variantes:
+                    codificacion = candidata
+                    break
+
+        encabezados = {"ETag": self.etag(codificacion), "Cache-Control": self.cache_control}
+        if len(self.variantes) > 1:
+            encabezados["Vary"] = "Accept-Encoding"
+        if self.coincide(if_none_match):
+            return Response(status_code=304, headers=encabezados)
+        if codificacion:
+            encabezados["Content-Encoding"] = codificacion
+        return Response(self.variantes[codificacion], media_type=self.media_type, headers=encabezados)
+
+
+class ManifiestoEstaticos:
+    """
+    Todos los archivos de un directorio cargados en memoria al arrancar
+
+    Para cada archivo comprimible se usan las variantes `.br`/`.gz`
+    generadas en el build (ver scripts/comprimir_estaticos.py) o, si no
+    existen, se comprimen al construir el manifiesto. Atender una petición
+    es una búsqueda en un dict, sin llamadas al sistema de archivos.
+
+    Con `recargar` (STATIC_RELOAD, modo desarrollo) el manifiesto se reconstruye si algún
+    archivo cambió, revisándolo como mucho una vez por segundo.
+    """
+
+    def __init__(self, directorio: str = "static", indice: str = "index.html", recargar: bool = False):
+        self.directorio = directorio
+        self.nombre_indice = indice
+        self.recargar = recargar
+        self.recursos: Dict[str, Recurso] = {}
+        self._construido = False
+        self._firma: Tuple = ()
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+
+    def archivos(self) -> List[str]:
+        archivos = []
+        for raiz, _, nombres in os.walk(self.directorio):
+            for nombre in nombres:
+                if nombre.endswith((".gz", ".br")):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                archivos.append(os.path.relpath(ruta, self.directorio).replace(os.sep, "/"))
+        return sorted(archivos)
+
+    def _firma_actual(self) -> Tuple:
+        firma = []
+        for relativa in self.archivos():
+            estado = os.stat(os.path.join(self.directorio, relativa))
+            firma.append((relativa, estado.st_mtime_ns, estado.st_size))
+        return tuple(firma)
+
+    def construir(self) -> dict:
+        """Leer y comprimir todo el directorio; retorna un resumen"""
+        recursos = {}
+        firma = ()
+        if os.path.isdir(self.directorio):
+            for relativa in self.archivos():
+                recursos[relativa] = self._cargar(relativa)
+            firma = self._firma_actual()
+        with self._lock:
+            self.recursos = recursos
+            self._firma = firma
+            self._revisado = time.monotonic()
+            self._construido = True
+        return self.resumen()
+
+    def _cargar(self, relativa: str) -> Recurso:
+        ruta = os.path.join(self.directorio, relativa)
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        media_type = mimetypes.guess_type(relativa)[0] or "application/octet-stream"
+        if media_type == "application/javascript":
+            # Response solo añade el charset a los tipos text/*
+            media_type += "; charset=utf-8"
+        recurso = Recurso(relativa, contenido, media_type, bool(_NOMBRE_CON_HASH.search(relativa)))
+        if not comprimible(media_type, len(contenido)):
+            return recurso
+
+        for codificacion, extension, comprimir in COMPRESORES:
+            if os.path.exists(ruta + extension):
+                with open(ruta + extension, "rb") as f:
+                    recurso.agregar_variante(codificacion, f.read())
+            elif comprimir is not None:
+                recurso.agregar_variante(codificacion, comprimir(contenido))
+        return recurso
+
+    def _asegurar(self):
+        if not self._construido:
+            self.construir()
+        elif self.recargar and time.monotonic() - self._revisado > 1.0:
+            self._revisado = time.monotonic()
+            if self._firma_actual() != self._firma:
+                self.construir()
+
+    def obtener(self, ruta: str) -> Optional[Recurso]:
+        self._asegurar()
+        return self.recursos.get(ruta)
+
+    @property
+    def indice(self) -> Optional[Recurso]:
+        return self.obtener(self.nombre_indice)
+
+    def bytes_en_memoria(self) -> int:
+        return sum(recurso.bytes_en_memoria() for recurso in self.recursos.values())
+
+    def resumen(self) -> dict:
+        return {
+            "archivos": len(self.recursos),
+            "bytes_en_memoria": self.bytes_en_memoria(),
+            "brotli": brotli is not None,
+        }
+
+
+manifiesto_estaticos = ManifiestoEstaticos("static", recargar=settings.static_reload)
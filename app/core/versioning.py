@@ -0,0 +1,200 @@
+"""
+Versionado de datos y soporte para GET condicional (ETag / 304)
+"""
+
+import mmap
+import os
+import secrets
+import struct
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+
+# Contador, última modificación y token en el archivo compartido
+_FORMATO_COMPARTIDO = struct.Struct("<Qd8s")
+
+
+class DataVersion:
+    """
+    Contador monotónico que se incrementa en cada escritura de usuarios
+
+    El token de arranque evita que un ETag emitido antes de reiniciar el
+    proceso coincida con el contador nuevo (que vuelve a empezar en 0).
+
+    Con varios workers, `compartir(ruta)` mueve contador y token a un
+    archivo mapeado en memoria: leer la versión sigue siendo una lectura de
+    memoria y una escritura en cualquier worker invalida los ETags de todos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valor = 0
+        self._modificado = time.time()
+        self.token = secrets.token_hex(4)
+        self._mapa: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+
+    @property
+    def valor(self) -> int:
+        if self._mapa is not None:
+            return _FORMATO_COMPARTIDO.unpack_from(self._mapa)[0]
+        return self._valor
+
+    @property
+    def ultima_modificacion(self) -> float:
+        if self._mapa is not None:
+            return _FORMATO_COMPARTIDO.unpack_from(self._mapa)[1]
+        return self._modificado
+
+    @property
+    def compartida(self) -> bool:
+        return self._mapa is not None
+
+    def compartir(self, ruta: str):
+        """Usar el contador del archivo `ruta` (se crea si no existe)"""
+        import fcntl
+
+        fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < _FORMATO_COMPARTIDO.size:
+                inicial = _FORMATO_COMPARTIDO.pack(0, time.time(), secrets.token_hex(4).encode("ascii"))
+                os.ftruncate(fd, 0)
+                os.write(fd, inicial)
+            mapa = mmap.mmap(fd, _FORMATO_COMPARTIDO.size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._mapa = fd, mapa
+        self.token = _FORMATO_COMPARTIDO.unpack_from(mapa)[2].decode("ascii")
+
+    def incrementar(self) -> int:
+        """Registrar una escritura y devolver la nueva versión"""
+        if self._mapa is not None:
+            return self._incrementar_compartida()
+        with self._lock:
+            self._valor += 1
+            self._modificado = time.time()
+            return self._valor
+
+    def _incrementar_compartida(self) -> int:
+        import fcntl
+
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                valor, _, token = _FORMATO_COMPARTIDO.unpack_from(self._mapa)
+                valor += 1
+                _FORMATO_COMPARTIDO.pack_into(self._mapa, 0, valor, time.time(), token)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            return valor
+
+    def etag(self, sufijo: Optional[str] = None) -> str:
+        """ETag fuerte para la versión actual de los datos"""
+        base = f"{self.token}-{self.valor}"
+        if sufijo:
+            base = f"{base}-{sufijo}"
+        return f'"{base}"'
+
+
+data_version = DataVersion()
+
+
+def fecha_http(timestamp: float) -> str:
+    """Formatear un timestamp como fecha HTTP (RFC 7231)"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def etag_fila(etag: str, version_fila: int) -> str:
+    """Añadir la versión de una fila al ETag global de los datos"""
+    return f'{etag[:-1]}.{version_fila}"'
+
+
+def _sin_version_fila(etag: str) -> str:
+    cuerpo = etag.strip('"')
+    base, _, version = cuerpo.rpartition(".")
+    if base and version.isdigit():
+        return f'"{base}"'
+    return etag
+
+
+def version_de_if_match(if_match: str) -> Optional[int]:
+    """
+    Extraer la versión de fila de un encabezado If-Match
+
+    Retorna None si ningún ETag del encabezado tiene versión de fila. Los
+    ETags débiles se ignoran: If-Match exige comparación fuerte.
+    """
+    for candidato in if_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            continue
+        _, _, version = candidato.strip('"').rpartition(".")
+        if version.isdigit():
+            return int(version)
+    return None
+
+
+def etag_coincidente(
+    if_none_match: Optional[str],
+    etag: str,
+    por_fila: bool = False
+) -> Optional[str]:
+    """
+    Comparación débil de If-None-Match contra un ETag (RFC 7232)
+
+    Retorna el ETag del cliente que coincide (para reenviarlo en el 304) o
+    None. Con `por_fila` se ignora la versión de fila del candidato.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    objetivo = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        comparable = candidato[2:] if candidato.startswith("W/") else candidato
+        if por_fila:
+            comparable = _sin_version_fila(comparable)
+        if comparable == objetivo:
+            return candidato
+    return None
+
+
+class CacheCondicional:
+    """
+    Dependencia que responde 304 si el cliente ya tiene la versión actual
+
+    Se resuelve antes que la sesión de BD, por lo que una revalidación
+    exitosa no ejecuta consultas ni serializa la respuesta.
+    """
+
+    def __init__(self, por_dia: bool = False, por_fila: bool = False):
+        # Los datos que dependen de "hoy" cambian a medianoche UTC sin escrituras
+        self.por_dia = por_dia
+        # Los recursos individuales añaden su versión de fila (ver etag_fila)
+        self.por_fila = por_fila
+
+    def __call__(self, request: Request, response: Response) -> str:
+        sufijo = datetime.utcnow().date().isoformat() if self.por_dia else None
+        etag = data_version.etag(sufijo)
+        cabeceras = {
+            "ETag": etag,
+            "Last-Modified": fecha_http(data_version.ultima_modificacion),
+            "Cache-Control": "no-cache",
+        }
+
+        coincidente = etag_coincidente(
+            request.headers.get("if-none-match"), etag, self.por_fila
+        )
+        if coincidente:
+            cabeceras["ETag"] = coincidente
+            raise HTTPException(status_code=304, headers=cabeceras)
+
+        response.headers.update(cabeceras)
+        return etag
@@ -2,16 +2,58 @@
 Configuración de base de datos
 """
 
-from sqlalchemy import create_engine
+import zlib
+
+from typing import List
+
+from sqlalchemy import Connection, create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.config import settings
+from app.core.memory_store import SesionMemoria, almacen_memoria
+from app.core.queries import monitor_consultas
+from app.core.sharding import Fragmentos, SesionFragmentada, rutas_fragmentos
+
 # Configuración de BD
-DATABASE_URL = "sqlite:///./usuarios.db"
+DATABASE_URL = settings.database_url
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+
+def configurar_sqlite(engine, wal: bool = True, busy_timeout_ms: int = 5000):
+    """
+    Ajustar cada conexión SQLite para varios procesos escribiendo a la vez
+
+    WAL permite lecturas concurrentes con un escritor; `busy_timeout` hace
+    que un escritor espere el bloqueo en lugar de fallar con
+    "database is locked". Con WAL, `synchronous=NORMAL` es seguro ante
+    caídas del proceso y evita un fsync por transacción.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        # Solo tiene efecto en BDs nuevas: permite devolver páginas libres con
+        # `PRAGMA incremental_vacuum` (ver app/core/maintenance.py)
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if wal:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+
+def crear_motor(url: str):
+    """Motor con los pragmas de SQLite y la instrumentación de consultas"""
+    motor = create_engine(url, connect_args={"check_same_thread": False})
+    configurar_sqlite(motor, settings.sqlite_wal, settings.sqlite_busy_timeout_ms)
+    # Conteo y tiempo de consultas por petición (Server-Timing, consultas lentas)
+    monitor_consultas.instrumentar(motor)
+    return motor
+
+
+engine = crear_motor(DATABASE_URL)
 
 SessionLocal = sessionmaker(
     autocommit=False, 
@@ -21,10 +63,113 @@ SessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+
+def crear_esquema(bind=engine):
+    """
+    Crear tablas y añadir columnas nuevas a bases de datos existentes
+
+    `create_all` no modifica tablas ya creadas, así que las columnas que se
+    agregan al modelo se añaden con ALTER TABLE (SQLite no necesita más).
+    """
+    if isinstance(bind, Connection):
+        _crear_esquema(bind)
+        return
+    with bind.begin() as conn:
+        _crear_esquema(conn)
+
+
+def _crear_esquema(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    for tabla in Base.metadata.sorted_tables:
+        existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name in existentes:
+                continue
+            tipo = columna.type.compile(dialect=conn.dialect)
+            ddl = f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}"
+            if columna.server_default is not None:
+                ddl += f" DEFAULT {columna.server_default.arg}"
+            conn.execute(text(ddl))
+
+
+# URLs de BD cuyo esquema ya se verificó en este proceso
+_esquemas_verificados = set()
+
+
+def huella_esquema(metadata=Base.metadata) -> int:
+    """Hash estable de tablas, columnas, tipos e índices (cabe en PRAGMA user_version)"""
+    partes = []
+    for tabla in metadata.sorted_tables:
+        for columna in tabla.columns:
+            partes.append(f"{tabla.name}.{columna.name}:{columna.type!r}:{columna.nullable}")
+        for indice in sorted(tabla.indexes, key=lambda i: i.name or ""):
+            partes.append(f"{tabla.name}#{indice.name}:{indice.unique}")
+    return zlib.crc32("\n".join(partes).encode("utf-8")) & 0x7FFFFFFF
+
+
+def asegurar_esquema(bind=engine) -> bool:
+    """
+    Crear o migrar el esquema solo si cambió; retorna True si se aplicó
+
+    En SQLite la huella del modelo se guarda en `PRAGMA user_version`: si
+    coincide basta una lectura del pragma, sin introspección de tablas. Si
+    no, la migración corre bajo `BEGIN IMMEDIATE` para que, cuando varios
+    workers arrancan a la vez, solo el primero la aplique.
+    """
+    clave = str(bind.url)
+    if clave in _esquemas_verificados:
+        return False
+
+    if bind.dialect.name != "sqlite":
+        crear_esquema(bind)
+        _esquemas_verificados.add(clave)
+        return True
+
+    huella = huella_esquema()
+    with bind.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == huella:
+            _esquemas_verificados.add(clave)
+            return False
+
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        aplicado = conn.exec_driver_sql("PRAGMA user_version").scalar() != huella
+        if aplicado:
+            crear_esquema(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {huella}")
+        conn.commit()
+    _esquemas_verificados.add(clave)
+    return aplicado
+
+
+# Usuarios repartidos en varios archivos SQLite (None = una sola BD)
+fragmentos = (
+    Fragmentos(rutas_fragmentos(settings.shard_path_template, settings.shard_count), crear_motor)
+    if settings.shard_count > 0 else None
+)
+
+
+def rutas_sqlite() -> List[str]:
+    """Archivos SQLite de usuarios: los fragmentos o la BD de DATABASE_URL (ninguno si no es SQLite)"""
+    if settings.shard_count > 0:
+        return rutas_fragmentos(settings.shard_path_template, settings.shard_count)
+    url = make_url(settings.database_url)
+    return [url.database] if url.get_backend_name() == "sqlite" and url.database else []
+
+
+def nueva_sesion():
+    """Sesión del motor configurado: BD principal, fragmentos o memoria"""
+    if almacen_memoria is not None:
+        return SesionMemoria(almacen_memoria)
+    if fragmentos is not None:
+        return SesionFragmentada(fragmentos)
+    return SessionLocal()
+
+
 # Dependencia para obtener sesión de BD
 def get_db():
     """Generador de sesiones de base de datos"""
-    db = SessionLocal()
+    db = nueva_sesion()
     try:
         yield db
     finally:
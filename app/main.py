@@ -2,20 +2,114 @@
 Aplicación principal FastAPI
 """
 
-from fastapi import FastAPI, HTTPException
+# Antes de cualquier otro import, para medir la fase de importación
+import time
+_inicio_importacion = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
+from sqlalchemy.orm import Session
+from typing import Optional
 
 # Importar routers
 from app.routers.users import router as users_router
 from app.routers.system import router as system_router
-from app.database import engine
-from app.models import UsuarioORM
+from app.routers.events import router as events_router
+from app.routers.analytics import router as analytics_router
+from app.config import settings
+from app.core.adhoc_sql import consultas_adhoc
+from app.core.bootstrap import bootstrap_inicial, consultar_datos_iniciales
+from app.database import SessionLocal, asegurar_esquema, engine, fragmentos, get_db, nueva_sesion
+from app.core.compression import estadisticas_compresion
+from app.core.events import broadcaster
+from app.core.logs import registro_logs
+from app.core.maintenance import planificador_mantenimiento
+from app.core.memory import monitor_memoria
+from app.core.memory_store import almacen_memoria, importar_de_sqlalchemy
+from app.core.metrics import registro_metricas
+from app.core.profiler import gestor_perfiles
+from app.core.queries import monitor_consultas
+from app.core.signups import asegurar_resumen
+from app.core.singleflight import lecturas
+from app.core.startup import calentar, informe_arranque
+from app.core.static_assets import manifiesto_estaticos
+from app.core.versioning import data_version
+from app.middleware.admission import AdmissionControlMiddleware, control_admision
+from app.middleware.compression import CompressionMiddleware, parsear_perfiles
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilerMiddleware
+from app.middleware.queries import QueryStatsMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.models import UsuarioORM  # noqa: F401 - registra las tablas
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Preparar el proceso antes de aceptar tráfico
+
+    Importar este módulo no toca la BD ni arranca hilos, y deja para su
+    primer uso los subsistemas opcionales pesados (la analítica con NumPy,
+    la captura de tráfico). El esquema, el resumen de registros, el
+    calentamiento y el volcado de métricas ocurren aquí, con cada fase
+    medida (ver /api/arranque); después arranca el mantenimiento de
+    SQLite. Al apagar, el servidor ya terminó las peticiones en curso;
+    queda detener el mantenimiento, cerrar el pool de conexiones y retirar
+    las métricas del worker.
+    """
+    registro_logs.instalar()
+    if settings.data_version_file:
+        data_version.compartir(settings.data_version_file)
+    if settings.events_file:
+        broadcaster.compartir(settings.events_file)
+    with informe_arranque.fase("esquema"):
+        informe_arranque.detalles["esquema_actualizado"] = (
+            any(fragmentos.asegurar_esquema()) if fragmentos is not None else asegurar_esquema()
+        )
+    if almacen_memoria is None:
+        # BD anterior a la tabla de resumen o zona recién configurada
+        with informe_arranque.fase("resumen_registros"):
+            motores = fragmentos.motores if fragmentos is not None else [engine]
+            informe_arranque.detalles["resumen_registros"] = [asegurar_resumen(motor) for motor in motores]
+    if almacen_memoria is not None:
+        with informe_arranque.fase("memoria"):
+            informe_arranque.detalles["memoria"] = almacen_memoria.cargar(
+                lambda: importar_de_sqlalchemy(SessionLocal)
+            )
+        almacen_memoria.iniciar_instantaneas(settings.memory_snapshot_interval)
+    if settings.startup_warmup:
+        with informe_arranque.fase("calentamiento"):
+            informe_arranque.detalles["calentamiento"] = calentar(nueva_sesion)
+    with informe_arranque.fase("estaticos"):
+        informe_arranque.detalles["estaticos"] = manifiesto_estaticos.construir()
+    if settings.metrics_enabled and settings.metrics_multiproc_dir:
+        registro_metricas.iniciar_volcado(
+            settings.metrics_multiproc_dir,
+            settings.metrics_flush_interval
+        )
+    if settings.maintenance_enabled and almacen_memoria is None:
+        planificador_mantenimiento.iniciar(
+            fragmentos.motores if fragmentos is not None else [engine],
+            control_admision.en_curso if settings.admission_enabled else None
+        )
+    informe_arranque.terminar()
+    yield
+    planificador_mantenimiento.detener()
+    if grabador_trafico is not None:
+        grabador_trafico.cerrar()
+    if settings.metrics_enabled and settings.metrics_multiproc_dir:
+        registro_metricas.retirar()
+    if almacen_memoria is not None:
+        almacen_memoria.cerrar()
+    consultas_adhoc.cerrar()
+    engine.dispose()
+    if fragmentos is not None:
+        fragmentos.cerrar()
+    registro_logs.desinstalar()
 
-# Crear tablas
-UsuarioORM.metadata.create_all(bind=engine)
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -23,7 +117,8 @@ app = FastAPI(
     description="API REST profesional para gestión de usuarios con interfaz React",
     version="2.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS para React
@@ -40,21 +135,113 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión de respuestas grandes (la más interna: ve el cuerpo tal cual sale de la app)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimo=settings.compression_min_bytes,
+        perfil=settings.compression_profile,
+        perfiles_por_ruta=parsear_perfiles(settings.compression_route_profiles)
+    )
+
+# Consultas SQL por petición (Server-Timing, detección de N+1)
+app.add_middleware(QueryStatsMiddleware)
+
+# Perfilado de peticiones individuales (X-Profile + X-Admin-Token)
+app.add_middleware(ProfilerMiddleware)
+
+# Control de admisión (último en registrarse = más externo)
+if settings.admission_enabled:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# Métricas por ruta, por fuera del control de admisión para contar los 503
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    registro_metricas.registrar_colector(control_admision.metricas)
+    registro_metricas.registrar_colector(lecturas.metricas)
+    registro_metricas.registrar_colector(broadcaster.metricas)
+    registro_metricas.registrar_colector(monitor_consultas.metricas)
+    registro_metricas.registrar_colector(estadisticas_compresion.metricas)
+    registro_metricas.registrar_colector(consultas_adhoc.metricas)
+    registro_metricas.registrar_colector(registro_logs.metricas)
+    registro_metricas.registrar_colector(planificador_mantenimiento.metricas)
+
+# Id por petición en los logs y línea de acceso (incluye lo que rechaza la admisión)
+app.add_middleware(RequestIdMiddleware)
+
+# Captura de tráfico (la más externa, para registrar la llegada real)
+grabador_trafico = None
+if settings.traffic_capture_file:
+    from app.core.capture import GrabadorTrafico
+    from app.middleware.capture import TrafficCaptureMiddleware
+
+    grabador_trafico = GrabadorTrafico(
+        settings.traffic_capture_file,
+        muestreo=settings.traffic_capture_sample_rate,
+        max_bytes=settings.traffic_capture_max_mb * 1024 * 1024
+    )
+    app.add_middleware(TrafficCaptureMiddleware, grabador=grabador_trafico)
+
+# Estructuras en memoria que informa /api/admin/memoria
+monitor_memoria.registrar_cache("lecturas_en_curso", lambda: lecturas.estado()["en_curso"])
+monitor_memoria.registrar_cache("sse_clientes", lambda: broadcaster.clientes)
+monitor_memoria.registrar_cache("sse_mensajes_en_buffers", broadcaster.mensajes_en_buffers)
+monitor_memoria.registrar_cache("metricas_series", registro_metricas.series)
+monitor_memoria.registrar_cache("sql_consultas_lentas", monitor_consultas.lentas_guardadas)
+monitor_memoria.registrar_cache("perfiles_guardados", gestor_perfiles.guardados)
+monitor_memoria.registrar_cache("estaticos_bytes", manifiesto_estaticos.bytes_en_memoria)
+monitor_memoria.registrar_cache("bootstrap_bytes", bootstrap_inicial.bytes_en_memoria)
+monitor_memoria.registrar_cache("sql_adhoc_planes", consultas_adhoc.planes_en_cache)
+monitor_memoria.registrar_cache("logs_en_buffer", lambda: len(registro_logs.buffer))
+if almacen_memoria is not None:
+    monitor_memoria.registrar_cache("usuarios_en_memoria", lambda: len(almacen_memoria.por_id))
+
 # Incluir routers
 app.include_router(system_router)
 app.include_router(users_router)
+app.include_router(events_router)
+app.include_router(analytics_router)
+
+informe_arranque.registrar("importacion", time.perf_counter() - _inicio_importacion)
+
+# Servir archivos estáticos de React (desde el manifiesto en memoria)
+@app.get("/static/{ruta:path}")
+async def servir_estatico(
+    ruta: str,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Archivo de static/ con compresión negociada y ETag"""
+    recurso = manifiesto_estaticos.obtener(ruta)
+    if recurso is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    return recurso.respuesta(accept_encoding, if_none_match)
+
 
-# Servir archivos estáticos de React
-if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+async def _responder_indice(indice, db: Session, accept_encoding, if_none_match):
+    """index.html con los datos iniciales incrustados (si está habilitado)"""
+    if settings.bootstrap_enabled:
+        recurso = bootstrap_inicial.vigente(indice)
+        if recurso is None:
+            recurso = await run_in_threadpool(
+                bootstrap_inicial.obtener,
+                indice,
+                lambda limite: consultar_datos_iniciales(db, limite)
+            )
+        indice = recurso
+    return indice.respuesta(accept_encoding, if_none_match)
 
 
 @app.get("/")
-def home():
+async def home(
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Servir la aplicación React desde la raíz"""
-    index_file = "static/index.html"
-    if os.path.exists(index_file):
-        return FileResponse(index_file)
+    indice = manifiesto_estaticos.indice
+    if indice is not None:
+        return await _responder_indice(indice, db, accept_encoding, if_none_match)
     
     return {
         "mensaje": "FastAPI + React Backend funcionando! 🚀",
@@ -65,21 +252,26 @@ def home():
 
 
 @app.get("/{full_path:path}")
-def serve_react_app(full_path: str):
+async def serve_react_app(
+    full_path: str,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Servir archivos estáticos o la aplicación React para SPA routing"""
     # Evitar conflictos con rutas API
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="API endpoint not found")
     
     # Si existe el archivo estático específico, servirlo
-    static_file = f"static/{full_path}"
-    if os.path.exists(static_file) and os.path.isfile(static_file):
-        return FileResponse(static_file)
+    recurso = manifiesto_estaticos.obtener(full_path)
+    if recurso is not None:
+        return recurso.respuesta(accept_encoding, if_none_match)
     
     # Para rutas de React SPA, servir index.html
-    index_file = "static/index.html"
-    if os.path.exists(index_file):
-        return FileResponse(index_file)
+    indice = manifiesto_estaticos.indice
+    if indice is not None:
+        return await _responder_indice(indice, db, accept_encoding, if_none_match)
     
     # Fallback
     return {
@@ -0,0 +1,14 @@
+"""
+Middlewares ASGI de la aplicación
+"""
+
+from .admission import AdmissionControlMiddleware, control_admision
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+
+__all__ = [
+    "AdmissionControlMiddleware",
+    "control_admision",
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+]
@@ -0,0 +1,197 @@
+"""
+Control de admisión y descarte de carga (middleware ASGI)
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+# Rutas que nunca se limitan: health checks y streams de larga duración
+RUTAS_EXENTAS: Tuple[str, ...] = ("/api/health", "/api/eventos")
+
+METODOS_LECTURA = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class Limitador:
+    """
+    Semáforo con cola acotada para una clase de rutas
+
+    Si hay hueco se admite de inmediato; si no, se espera en una cola FIFO
+    de tamaño limitado. Con la cola llena, o si la espera supera el
+    timeout, la petición se rechaza sin consumir recursos del threadpool.
+    """
+
+    def __init__(self, nombre: str, concurrencia: int, cola: int, timeout_cola: float):
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.max_cola = cola
+        self.timeout_cola = timeout_cola
+        self.activas = 0
+        self._esperando: deque = deque()
+        self.admitidas = 0
+        self.rechazadas = 0
+
+    @property
+    def en_cola(self) -> int:
+        return len(self._esperando)
+
+    async def adquirir(self) -> bool:
+        if self.activas < self.concurrencia and not self._esperando:
+            self.activas += 1
+            self.admitidas += 1
+            return True
+
+        if len(self._esperando) >= self.max_cola:
+            self.rechazadas += 1
+            return False
+
+        turno = asyncio.get_running_loop().create_future()
+        self._esperando.append(turno)
+        try:
+            await asyncio.wait_for(turno, self.timeout_cola)
+        except asyncio.TimeoutError:
+            self._quitar(turno)
+            self.rechazadas += 1
+            return False
+        except asyncio.CancelledError:
+            # El cliente se desconectó: devolver el hueco si ya se lo habían cedido
+            if turno.done() and not turno.cancelled():
+                self.liberar()
+            else:
+                self._quitar(turno)
+            raise
+
+        self.admitidas += 1
+        return True
+
+    def liberar(self):
+        # Ceder el hueco directamente al siguiente en cola (activas no cambia)
+        while self._esperando:
+            turno = self._esperando.popleft()
+            if not turno.done():
+                turno.set_result(True)
+                return
+        self.activas -= 1
+
+    def _quitar(self, turno):
+        try:
+            self._esperando.remove(turno)
+        except ValueError:
+            pass
+
+    def estado(self) -> dict:
+        return {
+            "concurrencia": self.concurrencia,
+            "max_cola": self.max_cola,
+            "activas": self.activas,
+            "en_cola": self.en_cola,
+            "admitidas": self.admitidas,
+            "rechazadas": self.rechazadas,
+        }
+
+
+class ControlAdmision:
+    """Limitadores por clase de ruta: lecturas y escrituras"""
+
+    def __init__(self, lecturas: Limitador, escrituras: Limitador, retry_after: int = 1):
+        self.limitadores: Dict[str, Limitador] = {
+            "lecturas": lecturas,
+            "escrituras": escrituras,
+        }
+        self.retry_after = retry_after
+
+    @classmethod
+    def desde_config(cls) -> "ControlAdmision":
+        return cls(
+            Limitador(
+                "lecturas",
+                settings.admission_read_concurrency,
+                settings.admission_read_queue,
+                settings.admission_queue_timeout,
+            ),
+            Limitador(
+                "escrituras",
+                settings.admission_write_concurrency,
+                settings.admission_write_queue,
+                settings.admission_queue_timeout,
+            ),
+            settings.admission_retry_after,
+        )
+
+    def clasificar(self, scope) -> Optional[Limitador]:
+        """Limitador que corresponde a la petición (None si está exenta)"""
+        path = scope["path"]
+        if path.startswith(RUTAS_EXENTAS):
+            return None
+        if scope["method"] in METODOS_LECTURA:
+            return self.limitadores["lecturas"]
+        return self.limitadores["escrituras"]
+
+    def en_curso(self) -> int:
+        """Peticiones admitidas o esperando turno, en todas las clases"""
+        return sum(l.activas + l.en_cola for l in self.limitadores.values())
+
+    def estado(self) -> dict:
+        return {nombre: l.estado() for nombre, l in self.limitadores.items()}
+
+    def metricas(self):
+        """Muestras para /api/metrics"""
+        for nombre, limitador in self.limitadores.items():
+            clase = (("class", nombre),)
+            yield ("admission_in_flight", "gauge", "Peticiones en ejecución", clase, limitador.activas)
+            yield ("admission_queue_depth", "gauge", "Peticiones esperando turno", clase, limitador.en_cola)
+            yield ("admission_shed_total", "counter", "Peticiones rechazadas con 503", clase, limitador.rechazadas)
+
+
+control_admision = ControlAdmision.desde_config()
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI que limita la concurrencia y responde 503 al saturarse
+
+    Se registra como el middleware más externo para rechazar la carga
+    sobrante antes de que llegue al threadpool de Starlette.
+    """
+
+    def __init__(self, app, control: ControlAdmision = control_admision):
+        self.app = app
+        self.control = control
+        self._respuesta_503 = json.dumps(
+            {"detail": "Servicio sobrecargado, reintente más tarde"}
+        ).encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limitador = self.control.clasificar(scope)
+        if limitador is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limitador.adquirir():
+            await self._rechazar(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limitador.liberar()
+
+    async def _rechazar(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._respuesta_503)).encode("latin-1")),
+                (b"retry-after", str(self.control.retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._respuesta_503})
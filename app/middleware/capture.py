@@ -0,0 +1,69 @@
+"""
+Captura de tráfico para reproducirlo después (middleware ASGI)
+"""
+
+import time
+from urllib.parse import parse_qsl
+
+from app.core.capture import GrabadorTrafico, traza
+from app.middleware.metrics import ruta_plantilla
+
+# Conexiones largas o con credenciales que no tiene sentido reproducir
+RUTAS_EXCLUIDAS = ("/api/eventos", "/api/admin")
+
+
+class TrafficCaptureMiddleware:
+    """
+    Graba una traza saneada por petición: método, ruta plantilla, parámetros,
+    tamaño del cuerpo, status y duración
+
+    El cuerpo se cuenta al pasar por `receive` sin copiarlo; encabezados y
+    cuerpo nunca se guardan.
+    """
+
+    def __init__(self, app, grabador: GrabadorTrafico):
+        self.app = app
+        self.grabador = grabador
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(RUTAS_EXCLUIDAS)
+            or not self.grabador.muestrear()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        llegada = time.time()
+        inicio = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        bytes_cuerpo = 0
+        status = 500
+
+        async def receive_contando():
+            nonlocal bytes_cuerpo
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                bytes_cuerpo += len(mensaje.get("body", b""))
+            return mensaje
+
+        async def send_con_status(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive_contando, send_con_status)
+        finally:
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+            self.grabador.grabar(traza(
+                llegada,
+                scope["method"],
+                ruta_plantilla(scope, root_path),
+                scope.get("path_params", {}),
+                query,
+                bytes_cuerpo,
+                status,
+                time.perf_counter() - inicio,
+            ))
@@ -0,0 +1,205 @@
+"""
+Compresión de respuestas negociada por Accept-Encoding (middleware ASGI)
+"""
+
+import time
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.compression import (
+    COMPRESORES,
+    PERFILES,
+    PERFIL_POR_DEFECTO,
+    SIN_COMPRESION,
+    EstadisticasCompresion,
+    aceptadas,
+    crear_compresor,
+    estadisticas_compresion,
+)
+from app.middleware.metrics import ruta_plantilla
+
+TIPOS_COMPRIMIBLES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "text/",
+)
+# Por debajo de este tamaño la compresión cuesta más de lo que ahorra
+MIN_BYTES = 1024
+
+
+def parsear_perfiles(texto: str) -> Dict[str, str]:
+    """Convertir `/api/eventos=rapido,/api/usuarios/=maximo` en un dict"""
+    perfiles = {}
+    for parte in (texto or "").split(","):
+        if not parte.strip():
+            continue
+        ruta, _, perfil = parte.strip().rpartition("=")
+        if perfil not in PERFILES and perfil != SIN_COMPRESION:
+            raise ValueError(f"Perfil de compresión desconocido: {perfil}")
+        perfiles[ruta] = perfil
+    return perfiles
+
+
+def etag_codificado(etag: str, codificacion: str) -> str:
+    """ETag de la variante comprimida: `"abc"` -> `"abc-gzip"` (como los estáticos precomprimidos)"""
+    return f'{etag[:-1]}-{codificacion}"' if etag.endswith('"') else etag
+
+
+def _sin_codificacion(valor: str, codificaciones, originales: Dict[str, str]) -> str:
+    """Quitar el sufijo de codificación de cada ETag de If-None-Match / If-Match"""
+    etags = []
+    for etag in valor.split(","):
+        etag = etag.strip()
+        for codificacion in codificaciones:
+            sufijo = f'-{codificacion}"'
+            if etag.endswith(sufijo):
+                originales[etag[:-len(sufijo)] + '"'] = etag
+                etag = etag[:-len(sufijo)] + '"'
+                break
+        etags.append(etag)
+    return ", ".join(etags)
+
+
+class CompressionMiddleware:
+    """
+    Comprime con zstd, brotli o gzip (según lo que acepte el cliente y esté
+    instalado) las respuestas de tipos de texto que superan `minimo` bytes
+
+    El nivel sale del perfil de la ruta plantilla (`perfiles_por_ruta`) o
+    del perfil por defecto. Las respuestas en streaming se comprimen trozo a
+    trozo y se vacía el compresor tras cada uno, así que nada se acumula en
+    memoria y los eventos SSE llegan sin retraso. Las respuestas que ya
+    traen Content-Encoding (estáticos precomprimidos) pasan intactas.
+
+    Una respuesta comprimida lleva el ETag con el sufijo de la codificación
+    (sus bytes no son los de la identidad). El sufijo se quita de
+    If-None-Match e If-Match antes de llegar a la app, y un 304 devuelve el
+    ETag tal como lo envió el cliente.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimo: int = MIN_BYTES,
+        perfil: str = PERFIL_POR_DEFECTO,
+        perfiles_por_ruta: Optional[Dict[str, str]] = None,
+        estadisticas: EstadisticasCompresion = estadisticas_compresion,
+    ):
+        self.app = app
+        self.minimo = minimo
+        self.perfil = perfil
+        self.perfiles_por_ruta = perfiles_por_ruta or {}
+        self.estadisticas = estadisticas
+        self._soportadas = tuple(COMPRESORES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        originales: Dict[str, str] = {}
+        if any(nombre in (b"if-none-match", b"if-match") for nombre, _ in scope["headers"]):
+            scope = {**scope, "headers": [
+                (nombre, _sin_codificacion(valor.decode("latin-1"), self._soportadas, originales).encode("latin-1"))
+                if nombre in (b"if-none-match", b"if-match") else (nombre, valor)
+                for nombre, valor in scope["headers"]
+            ]}
+            if originales:
+                send = self._con_etags_originales(send, originales)
+        codificaciones = aceptadas(Headers(scope=scope).get("accept-encoding"), self._soportadas)
+        if not codificaciones:
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = codificaciones[0]
+        root_path = scope.get("root_path", "")
+        inicial = None
+        modo = None  # None: esperando el primer cuerpo; "pasar" o "stream"
+        compresor = None
+        entrada = salida = 0
+        segundos = 0.0
+
+        def nivel() -> Optional[int]:
+            perfil = self.perfiles_por_ruta.get(ruta_plantilla(scope, root_path), self.perfil)
+            if perfil == SIN_COMPRESION:
+                return None
+            return PERFILES[perfil][codificacion]
+
+        def comprimir(datos: bytes, final: bool) -> bytes:
+            nonlocal entrada, salida, segundos
+            inicio = time.perf_counter()
+            resultado = compresor.comprimir(datos) + (compresor.terminar() if final else compresor.vaciar())
+            segundos += time.perf_counter() - inicio
+            entrada += len(datos)
+            salida += len(resultado)
+            return resultado
+
+        async def send_comprimido(mensaje):
+            nonlocal inicial, modo, compresor
+
+            if mensaje["type"] == "http.response.start":
+                encabezados = Headers(raw=mensaje["headers"])
+                tipo = encabezados.get("content-type", "")
+                if (
+                    "content-encoding" in encabezados
+                    or not tipo.startswith(TIPOS_COMPRIMIBLES)
+                    or "no-transform" in encabezados.get("cache-control", "")
+                ):
+                    modo = "pasar"
+                    await send(mensaje)
+                else:
+                    # Se decide al ver el primer trozo del cuerpo
+                    inicial = mensaje
+                return
+
+            if mensaje["type"] != "http.response.body" or modo == "pasar":
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+
+            if modo is None:
+                nivel_ruta = nivel()
+                if nivel_ruta is None or (not mas and len(cuerpo) < self.minimo):
+                    if nivel_ruta is not None:
+                        self.estadisticas.omitir_por_tamano()
+                    modo = "pasar"
+                    await send(inicial)
+                    await send(mensaje)
+                    return
+
+                compresor = crear_compresor(codificacion, nivel_ruta)
+                encabezados = MutableHeaders(raw=inicial["headers"])
+                encabezados["Content-Encoding"] = codificacion
+                encabezados.add_vary_header("Accept-Encoding")
+                if "etag" in encabezados:
+                    encabezados["ETag"] = etag_codificado(encabezados["etag"], codificacion)
+                cuerpo = comprimir(cuerpo, final=not mas)
+                if mas:
+                    modo = "stream"
+                    del encabezados["Content-Length"]
+                else:
+                    encabezados["Content-Length"] = str(len(cuerpo))
+                await send(inicial)
+            else:
+                cuerpo = comprimir(cuerpo, final=not mas)
+
+            await send({"type": "http.response.body", "body": cuerpo, "more_body": mas})
+            if not mas:
+                self.estadisticas.registrar(codificacion, entrada, salida, segundos)
+
+        await self.app(scope, receive, send_comprimido)
+
+    @staticmethod
+    def _con_etags_originales(send, originales: Dict[str, str]):
+        """En un 304, devolver el ETag con el sufijo que envió el cliente"""
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] == 304:
+                encabezados = MutableHeaders(raw=mensaje["headers"])
+                etag = encabezados.get("etag")
+                if etag in originales:
+                    encabezados["ETag"] = originales[etag]
+            await send(mensaje)
+
+        return enviar
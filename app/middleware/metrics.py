@@ -0,0 +1,61 @@
+"""
+Instrumentación de peticiones HTTP (middleware ASGI)
+"""
+
+import time
+
+from app.core.metrics import RegistroMetricas, registro_metricas
+
+# Etiqueta para peticiones que no coinciden con ninguna ruta (evita cardinalidad alta)
+RUTA_DESCONOCIDA = "<sin_ruta>"
+
+
+def ruta_plantilla(scope, root_path_original: str = "") -> str:
+    """Path con parámetros sin resolver (p. ej. /api/usuarios/{usuario_id})"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", RUTA_DESCONOCIDA)
+    root_path = scope.get("root_path", "")
+    if root_path != root_path_original:
+        # Subaplicaciones montadas (StaticFiles): agrupar bajo el punto de montaje
+        return root_path[len(root_path_original):] + "/{path}"
+    return RUTA_DESCONOCIDA
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide peticiones por ruta, método y status
+
+    Solo intercepta el mensaje `http.response.start` para leer el status;
+    el cuerpo pasa sin copiarse. La ruta se resuelve después de atender la
+    petición, cuando el router ya dejó la plantilla en el scope.
+    """
+
+    def __init__(self, app, registro: RegistroMetricas = registro_metricas):
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_con_status(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            self.registro.observar(
+                scope["method"],
+                ruta_plantilla(scope, root_path),
+                status,
+                time.perf_counter() - inicio,
+            )
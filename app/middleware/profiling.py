@@ -0,0 +1,67 @@
+"""
+Perfilado de peticiones individuales bajo demanda (middleware ASGI)
+"""
+
+from app.core.admin import token_admin_valido
+from app.core.profiler import GestorPerfiles, gestor_perfiles
+
+# Intervalo de muestreo para una sola petición (más fino que el del proceso)
+INTERVALO_PETICION = 0.001
+
+
+class ProfilerMiddleware:
+    """
+    Perfila la petición si trae `X-Profile: 1` y un `X-Admin-Token` válido
+
+    Se muestrean todos los hilos del proceso mientras dura la petición. El
+    resultado queda disponible en `/api/admin/perfil/peticiones/{id}` y el
+    id se devuelve en el encabezado `X-Profile-Id`. Sin esos encabezados el
+    costo es recorrer la lista de encabezados una vez.
+    """
+
+    def __init__(self, app, gestor: GestorPerfiles = gestor_perfiles):
+        self.app = app
+        self.gestor = gestor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfilar, token = False, None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"x-profile":
+                perfilar = valor not in (b"", b"0")
+            elif nombre == b"x-admin-token":
+                token = valor.decode("latin-1")
+        if not perfilar or not token_admin_valido(token):
+            await self.app(scope, receive, send)
+            return
+
+        muestreador = self.gestor.comenzar(INTERVALO_PETICION)
+        if muestreador is None:
+            # Ya hay un perfil en curso en este proceso
+            await self.app(scope, receive, send)
+            return
+
+        terminado = False
+
+        def finalizar() -> str:
+            nonlocal terminado
+            terminado = True
+            return self.gestor.guardar(self.gestor.terminar(muestreador))
+
+        async def send_con_perfil(mensaje):
+            if mensaje["type"] == "http.response.start" and not terminado:
+                perfil_id = finalizar()
+                mensaje = {
+                    **mensaje,
+                    "headers": [*mensaje.get("headers", []), (b"x-profile-id", perfil_id.encode("latin-1"))],
+                }
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_perfil)
+        finally:
+            if not terminado:
+                finalizar()
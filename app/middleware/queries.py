@@ -0,0 +1,67 @@
+"""
+Encabezado Server-Timing y detección de N+1 por petición (middleware ASGI)
+"""
+
+import logging
+import time
+
+from app.config import settings
+from app.core.queries import MonitorConsultas, iniciar_peticion, monitor_consultas
+
+logger = logging.getLogger("app.sql")
+
+METODOS_LECTURA = frozenset({"GET", "HEAD"})
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI que expone el costo de BD de cada petición
+
+    Añade `Server-Timing: db;dur=..;desc="N consultas", app;dur=..` a la
+    respuesta y marca como posible N+1 las peticiones que superan el máximo
+    de consultas configurado para lecturas o escrituras.
+    """
+
+    def __init__(
+        self,
+        app,
+        monitor: MonitorConsultas = monitor_consultas,
+        max_lecturas: int = settings.sql_max_queries_read,
+        max_escrituras: int = settings.sql_max_queries_write,
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.max_lecturas = max_lecturas
+        self.max_escrituras = max_escrituras
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estadisticas = iniciar_peticion()
+        inicio = time.perf_counter()
+        limite = self.max_lecturas if scope["method"] in METODOS_LECTURA else self.max_escrituras
+
+        async def send_con_timing(mensaje):
+            if mensaje["type"] == "http.response.start":
+                total = time.perf_counter() - inicio
+                db_ms = estadisticas.tiempo_db * 1000
+                timing = (
+                    f'db;dur={db_ms:.2f};desc="{estadisticas.consultas} consultas", '
+                    f"app;dur={total * 1000 - db_ms:.2f}"
+                )
+                if estadisticas.consultas > limite:
+                    timing += f', n-mas-1;desc="{estadisticas.consultas} > {limite}"'
+                    self.monitor.registrar_n_mas_1()
+                    logger.warning(
+                        "Posible N+1: %s %s ejecutó %d consultas (máximo %d)",
+                        scope["method"], scope["path"], estadisticas.consultas, limite
+                    )
+                mensaje = {
+                    **mensaje,
+                    "headers": [*mensaje.get("headers", []), (b"server-timing", timing.encode("latin-1"))],
+                }
+            await send(mensaje)
+
+        await self.app(scope, receive, send_con_timing)
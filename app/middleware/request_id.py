@@ -0,0 +1,70 @@
+"""
+Id por petición para correlacionar logs y línea de acceso (middleware ASGI)
+"""
+
+import logging
+import re
+import time
+import uuid
+
+from app.config import settings
+from app.core.logs import asignar_id_peticion, restaurar_id_peticion
+
+logger = logging.getLogger("app.acceso")
+
+ENCABEZADO = b"x-request-id"
+# Ids aceptados del cliente o del proxy; cualquier otro se reemplaza
+_ID_VALIDO = re.compile(rb"^[A-Za-z0-9._:-]{1,64}$")
+
+
+def _id_entrante(scope) -> str:
+    for nombre, valor in scope["headers"]:
+        if nombre == ENCABEZADO and _ID_VALIDO.match(valor):
+            return valor.decode("ascii")
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un id a cada petición (el de `X-Request-ID` si viene y es
+    válido) y lo devuelve en la respuesta
+
+    Mientras dura la petición, todo registro del logger "app" lleva ese
+    `request_id`. Con LOG_ACCESS se loguea además una línea de acceso
+    con método, ruta, status y duración; como todo el logging, es solo
+    encolar.
+    """
+
+    def __init__(self, app, acceso: bool = settings.log_access):
+        self.app = app
+        self.acceso = acceso
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        id_peticion = _id_entrante(scope)
+        token = asignar_id_peticion(id_peticion)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_con_id(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+                mensaje["headers"] = [*mensaje.get("headers", []), (ENCABEZADO, id_peticion.encode("ascii"))]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            if self.acceso:
+                duracion_ms = round((time.perf_counter() - inicio) * 1000, 2)
+                logger.info(
+                    "%s %s %d %.2f ms", scope["method"], scope["path"], status, duracion_ms,
+                    extra={"campos": {
+                        "metodo": scope["method"], "ruta": scope["path"], "status": status, "ms": duracion_ms,
+                    }},
+                )
+            restaurar_id_peticion(token)
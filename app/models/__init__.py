@@ -3,5 +3,6 @@ Modelos de base de datos
 """
 
 from .user import UsuarioORM
+from .signups import ResumenRegistrosORM
 
-__all__ = ["UsuarioORM"]
+__all__ = ["UsuarioORM", "ResumenRegistrosORM"]
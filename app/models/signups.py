@@ -0,0 +1,35 @@
+"""
+Modelo del resumen de registros por hora y por día
+"""
+
+from sqlalchemy import Column, Integer, String, event
+
+from app.core.signups import ajustar_resumen
+from app.database import Base
+from app.models.user import UsuarioORM
+
+
+class ResumenRegistrosORM(Base):
+    """
+    Usuarios registrados por hora UTC y por día local de cada zona configurada
+
+    Se mantiene en la misma transacción que cada alta o baja de usuario (ver
+    los eventos de abajo); las cargas masivas que escriben `usuarios`
+    directamente lo reconstruyen con scripts/backfill_registros.py.
+    """
+    __tablename__ = "resumen_registros"
+
+    zona = Column(String, primary_key=True)
+    granularidad = Column(String, primary_key=True)  # "hora" o "dia"
+    inicio = Column(String, primary_key=True)  # "2024-03-01T09" (UTC) o "2024-03-01" (local)
+    usuarios = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+@event.listens_for(UsuarioORM, "after_insert")
+def _sumar_registro(mapper, connection, usuario):
+    ajustar_resumen(connection, usuario.created_at, 1)
+
+
+@event.listens_for(UsuarioORM, "after_delete")
+def _restar_registro(mapper, connection, usuario):
+    ajustar_resumen(connection, usuario.created_at, -1)
@@ -17,6 +17,8 @@ class UsuarioORM(Base):
     edad = Column(Integer, nullable=True)
     activo = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     def __repr__(self):
         return f"<Usuario(id={self.id}, nombre='{self.nombre}', email='{self.email}')>"
@@ -4,5 +4,7 @@ Routers de la aplicación
 
 from .users import router as users_router
 from .system import router as system_router
+from .events import router as events_router
+from .analytics import router as analytics_router
 
-__all__ = ["users_router", "system_router"]
+__all__ = ["users_router", "system_router", "events_router", "analytics_router"]
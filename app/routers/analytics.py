@@ -0,0 +1,102 @@
+"""
+Router para reportes agregados sobre la instantánea de columnas
+"""
+
+from datetime import date
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.signups import UTC, serie_registros
+from app.core.versioning import CacheCondicional
+from app.database import get_db
+from app.services.user_service import UsuarioService
+
+if TYPE_CHECKING:
+    from app.core.analytics import ColumnasUsuarios
+
+router = APIRouter(
+    prefix="/api/estadisticas",
+    tags=["estadísticas"]
+)
+
+PATRON_PERIODO = "^(dia|semana|mes)$"
+
+
+def columnas_al_dia(db: Session = Depends(get_db)) -> "ColumnasUsuarios":
+    """Instantánea refrescada con las filas que cambiaron desde la última petición"""
+    # NumPy se importa con la primera petición de estadísticas, no al arrancar
+    from app.core.analytics import columnas_usuarios
+
+    columnas_usuarios.refrescar(
+        lambda desde: UsuarioService.obtener_filas_analiticas(db, desde),
+        lambda: UsuarioService.obtener_ids(db),
+    )
+    return columnas_usuarios
+
+
+@router.get("/edades")
+def histograma_edades(
+    ancho: int = Query(10, ge=1, le=120, description="Años por rango"),
+    activo: Optional[bool] = Query(None, description="Solo usuarios activos o inactivos"),
+    etag: str = Depends(CacheCondicional()),
+    columnas: "ColumnasUsuarios" = Depends(columnas_al_dia)
+):
+    """Usuarios por rango de edad, con media y percentiles"""
+    return columnas.histograma_edades(ancho, activo)
+
+
+@router.get("/registros")
+def registros_por_periodo(
+    periodo: str = Query("dia", pattern=PATRON_PERIODO),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    etag: str = Depends(CacheCondicional()),
+    columnas: "ColumnasUsuarios" = Depends(columnas_al_dia)
+):
+    """Registros por día, semana (desde el lunes) o mes, en UTC"""
+    return columnas.registros_por_periodo(periodo, desde, hasta)
+
+
+@router.get("/cohortes")
+def activos_por_cohorte(
+    periodo: str = Query("mes", pattern=PATRON_PERIODO),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    etag: str = Depends(CacheCondicional()),
+    columnas: "ColumnasUsuarios" = Depends(columnas_al_dia)
+):
+    """Proporción de usuarios activos según el periodo en que se registraron"""
+    return columnas.activos_por_cohorte(periodo, desde, hasta)
+
+
+@router.get("/serie")
+def serie_de_registros(
+    desde: date,
+    hasta: date,
+    intervalo: str = Query("dia", pattern="^(hora|dia|semana)$"),
+    zona: str = Query(UTC, description="Zona horaria IANA, p. ej. America/Santiago"),
+    etag: str = Depends(CacheCondicional()),
+    db: Session = Depends(get_db)
+):
+    """
+    Registros por hora, día o semana (desde el lunes) entre dos fechas locales de `zona`
+
+    Se responde desde la tabla de resumen, sin recorrer `usuarios`; los
+    periodos sin registros aparecen con 0.
+    """
+    try:
+        return serie_registros(
+            lambda *args: UsuarioService.obtener_conteos_registros(db, *args), intervalo, desde, hasta, zona
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/columnas")
+def estado_columnas():
+    """Tamaño y refrescos de la instantánea de columnas"""
+    from app.core.analytics import columnas_usuarios
+
+    return columnas_usuarios.estado()
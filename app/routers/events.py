@@ -0,0 +1,126 @@
+"""
+Router para el feed de cambios en tiempo real (Server-Sent Events)
+"""
+
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.events import ClienteDescartado, broadcaster, formatear_sse
+from app.core.versioning import data_version
+from app.database import nueva_sesion
+from app.services.user_service import UsuarioService
+
+router = APIRouter(
+    prefix="/api",
+    tags=["eventos"]
+)
+
+# Segundos entre comentarios keep-alive (evitan cierres por proxies)
+KEEPALIVE_SEGUNDOS = 15.0
+# Segundos entre comprobaciones de cambios en las estadísticas
+INTERVALO_ESTADISTICAS = 5.0
+# Segundos entre lecturas de los eventos de otros workers (con varios workers)
+INTERVALO_RELEVO = 0.5
+# Tiempo que el navegador espera antes de reconectar (ms)
+RETRY_MS = 3000
+
+_tarea_estadisticas = None
+_tarea_relevo = None
+
+
+def _calcular_estadisticas() -> dict:
+    db = nueva_sesion()
+    try:
+        return UsuarioService.obtener_estadisticas(db)
+    finally:
+        db.close()
+
+
+async def _emitir_estadisticas():
+    """
+    Publicar deltas de estadísticas mientras haya clientes conectados
+
+    Solo se consulta la BD cuando cambia la versión de los datos o el día
+    (en UTC, como el resto de las cachés), así que con datos inactivos el
+    costo es un temporizador.
+    """
+    anteriores = None
+    clave_anterior = None
+    while broadcaster.clientes:
+        clave = (data_version.valor, datetime.utcnow().date())
+        if clave != clave_anterior:
+            actuales = await run_in_threadpool(_calcular_estadisticas)
+            if anteriores is not None and actuales != anteriores:
+                delta = {
+                    campo: valor - anteriores.get(campo, 0)
+                    for campo, valor in actuales.items()
+                }
+                # Cada worker calcula las suyas: no se reenvían a los demás
+                broadcaster.publicar("estadisticas", {
+                    "estadisticas": actuales,
+                    "delta": delta
+                }, solo_local=True)
+            anteriores, clave_anterior = actuales, clave
+        await asyncio.sleep(INTERVALO_ESTADISTICAS)
+
+
+async def _relevar_eventos():
+    """Publicar a los clientes de este worker los cambios hechos en otros, mientras haya clientes"""
+    broadcaster.iniciar_relevo()
+    while broadcaster.clientes:
+        await run_in_threadpool(broadcaster.relevar)
+        await asyncio.sleep(INTERVALO_RELEVO)
+
+
+def _asegurar_tareas():
+    global _tarea_estadisticas, _tarea_relevo
+    loop = asyncio.get_running_loop()
+    if _tarea_estadisticas is None or _tarea_estadisticas.done():
+        _tarea_estadisticas = loop.create_task(_emitir_estadisticas())
+    if broadcaster.compartido and (_tarea_relevo is None or _tarea_relevo.done()):
+        _tarea_relevo = loop.create_task(_relevar_eventos())
+
+
+broadcaster.al_suscribir(_asegurar_tareas)
+
+
+@router.get("/eventos")
+async def feed_eventos():
+    """
+    Feed de cambios en formato Server-Sent Events
+
+    Eventos: `usuario_creado`, `usuario_actualizado`, `usuario_eliminado`
+    y `estadisticas` (valores y deltas). Un cliente que no consume a tiempo
+    recibe `descartado` y debe reconectar y recargar los datos.
+    """
+    suscripcion = broadcaster.suscribir()
+
+    async def stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode("utf-8")
+            yield formatear_sse("conectado", {"version": data_version.valor})
+            while True:
+                try:
+                    mensaje = await suscripcion.siguiente(KEEPALIVE_SEGUNDOS)
+                except ClienteDescartado:
+                    yield formatear_sse("descartado", {"motivo": "buffer lleno"})
+                    break
+                yield mensaje if mensaje is not None else b": keepalive\n\n"
+        finally:
+            broadcaster.cancelar(suscripcion)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/eventos/estado")
+def estado_eventos():
+    """Clientes conectados y contadores del feed de eventos"""
+    return broadcaster.estado()
@@ -2,11 +2,26 @@
 Router para estadísticas y monitoreo
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
 
+from app.core.admin import requerir_admin
+from app.core.adhoc_sql import ConsultaInterrumpida, ConsultaRechazada, SinConexionLibre, consultas_adhoc
+from app.core.compression import estadisticas_compresion
+from app.core.logs import registro_logs
+from app.core.maintenance import MantenimientoOcupado, planificador_mantenimiento
+from app.core.memory import AGRUPACIONES, SnapshotNoEncontrado, monitor_memoria
+from app.core.metrics import registro_metricas
+from app.core.profiler import gestor_perfiles, perfilar_por
+from app.core.queries import monitor_consultas
+from app.core.singleflight import lecturas
+from app.core.startup import informe_arranque
+from app.core.versioning import CacheCondicional
 from app.database import get_db
+from app.middleware.admission import control_admision
 from app.services.user_service import UsuarioService
 
 router = APIRouter(
@@ -26,16 +41,34 @@ def api_root():
 
 
 @router.get("/estadisticas")
-def obtener_estadisticas(db: Session = Depends(get_db)):
+def obtener_estadisticas(
+    etag: str = Depends(CacheCondicional(por_dia=True)),
+    db: Session = Depends(get_db)
+):
     """
     Estadísticas del sistema para el dashboard
     
-    Retorna información sobre usuarios registrados
+    Retorna información sobre usuarios registrados. Responde 304 si
+    `If-None-Match` coincide con la versión actual de los datos
     """
-    estadisticas = UsuarioService.obtener_estadisticas(db)
+    estadisticas = lecturas.ejecutar(
+        ("obtener_estadisticas", etag),
+        lambda: UsuarioService.obtener_estadisticas(db)
+    )
     return estadisticas
 
 
+@router.get("/coalescencia")
+def estado_coalescencia():
+    """
+    Métricas de coalescencia de lecturas
+
+    Cuántas lecturas se ejecutaron contra la BD y cuántas reutilizaron el
+    resultado de una lectura idéntica en curso
+    """
+    return lecturas.estado()
+
+
 @router.get("/health")
 def health_check():
     """
@@ -48,3 +81,245 @@ def health_check():
         "timestamp": datetime.now(),
         "version": "2.0.0"
     }
+
+
+@router.get("/arranque")
+def informe_de_arranque():
+    """
+    Tiempos del arranque de este worker
+
+    Duración de importación, verificación de esquema y calentamiento
+    """
+    return informe_arranque.informe()
+
+
+@router.get("/compresion")
+def estado_compresion():
+    """
+    Efecto de la compresión de respuestas
+
+    Bytes antes y después, ahorro y tiempo de CPU por formato
+    """
+    return estadisticas_compresion.estado()
+
+
+@router.get("/admision")
+def estado_admision():
+    """
+    Estado del control de admisión
+
+    Peticiones activas, profundidad de cola y rechazos (503) por clase de ruta
+    """
+    return control_admision.estado()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metricas_prometheus():
+    """
+    Métricas en formato de texto de Prometheus
+
+    Peticiones y latencias por ruta, más el estado de admisión, coalescencia
+    y feed de eventos. Con `METRICS_MULTIPROC_DIR` suma todos los workers
+    """
+    return PlainTextResponse(
+        registro_metricas.exportar_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/sql/estado", dependencies=[Depends(requerir_admin)])
+def estado_sql():
+    """Totales de consultas SQL, consultas lentas y peticiones con posible N+1"""
+    return monitor_consultas.estado()
+
+
+@router.get("/sql/lentas", dependencies=[Depends(requerir_admin)])
+def consultas_lentas():
+    """
+    Consultas lentas recientes
+
+    Incluye SQL, tipos de los parámetros (sus valores solo con
+    SQL_LOG_PARAMETERS), duración y `EXPLAIN QUERY PLAN` de cada una
+    """
+    return monitor_consultas.consultas_lentas_recientes()
+
+
+@router.get(
+    "/admin/perfil",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(requerir_admin)]
+)
+async def perfilar_proceso(
+    segundos: float = Query(5.0, gt=0, le=60),
+    intervalo_ms: float = Query(5.0, ge=1, le=100),
+    incluir_ociosos: bool = False
+):
+    """
+    Perfilar el worker que atiende la petición durante N segundos
+
+    Muestrea las pilas de todos los hilos y devuelve pilas colapsadas para
+    flamegraph.pl / speedscope. Requiere `X-Admin-Token`. Para perfilar una
+    sola petición, enviarla con `X-Profile: 1` y el token de administración
+    """
+    resultado = await perfilar_por(segundos, intervalo_ms / 1000, incluir_ociosos)
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="Ya hay un perfil en curso en este worker")
+    return PlainTextResponse(resultado)
+
+
+@router.get(
+    "/admin/perfil/peticiones/{perfil_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(requerir_admin)]
+)
+def obtener_perfil_peticion(perfil_id: str):
+    """Pilas colapsadas de una petición perfilada (id de `X-Profile-Id`)"""
+    resultado = gestor_perfiles.obtener(perfil_id)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado en este worker")
+    return PlainTextResponse(resultado)
+
+
+def _validar_agrupacion(agrupar: str):
+    if agrupar not in AGRUPACIONES:
+        raise HTTPException(status_code=400, detail=f"agrupar debe ser uno de {AGRUPACIONES}")
+
+
+@router.get("/admin/memoria", dependencies=[Depends(requerir_admin)])
+def estado_memoria():
+    """
+    Estado de memoria del worker
+
+    RSS, tracemalloc, snapshots guardados, sesiones ORM e identity maps, y
+    tamaño de las estructuras en memoria de la aplicación
+    """
+    return monitor_memoria.estado()
+
+
+@router.post("/admin/memoria/iniciar", dependencies=[Depends(requerir_admin)])
+def iniciar_tracemalloc(frames: int = Query(1, ge=1, le=50)):
+    """Iniciar tracemalloc con `frames` marcos por asignación"""
+    return {"iniciado": monitor_memoria.iniciar(frames)}
+
+
+@router.post("/admin/memoria/detener", dependencies=[Depends(requerir_admin)])
+def detener_tracemalloc():
+    """Detener tracemalloc (los snapshots guardados se conservan)"""
+    return {"detenido": monitor_memoria.detener()}
+
+
+@router.post("/admin/memoria/snapshots/{nombre}", dependencies=[Depends(requerir_admin)])
+def tomar_snapshot_memoria(nombre: str):
+    """Tomar un snapshot con nombre (requiere tracemalloc activo)"""
+    if not monitor_memoria.activo:
+        raise HTTPException(status_code=409, detail="tracemalloc no está activo")
+    return monitor_memoria.tomar_snapshot(nombre)
+
+
+@router.get("/admin/memoria/snapshots/{nombre}", dependencies=[Depends(requerir_admin)])
+def top_memoria(
+    nombre: str,
+    agrupar: str = "lineno",
+    limite: int = Query(20, ge=1, le=500)
+):
+    """Sitios de asignación con más memoria retenida en un snapshot"""
+    _validar_agrupacion(agrupar)
+    try:
+        return monitor_memoria.top(nombre, agrupar, limite)
+    except SnapshotNoEncontrado:
+        raise HTTPException(status_code=404, detail="Snapshot no encontrado")
+
+
+@router.get("/admin/memoria/diferencia", dependencies=[Depends(requerir_admin)])
+def diferencia_memoria(
+    desde: str,
+    hasta: str,
+    agrupar: str = "lineno",
+    limite: int = Query(20, ge=1, le=500)
+):
+    """Crecimiento de memoria entre dos snapshots, agrupado por archivo o línea"""
+    _validar_agrupacion(agrupar)
+    try:
+        return monitor_memoria.diferencia(desde, hasta, agrupar, limite)
+    except SnapshotNoEncontrado:
+        raise HTTPException(status_code=404, detail="Snapshot no encontrado")
+
+
+@router.get("/admin/sql", dependencies=[Depends(requerir_admin)])
+def consulta_sql(
+    consulta: str = Query(..., max_length=20_000, description="Un único SELECT"),
+    limite: int = Query(1000, ge=1, description="Máximo de filas (tope: ADHOC_SQL_MAX_ROWS)"),
+    fragmento: int = Query(0, ge=0, description="Archivo a consultar con SHARD_COUNT > 0")
+):
+    """
+    Ejecutar un SELECT de solo lectura y devolver las filas en NDJSON
+
+    Primera línea: columnas y `EXPLAIN QUERY PLAN`; después una fila por
+    línea; la última indica filas enviadas y si se truncó. La consulta se
+    interrumpe al agotar ADHOC_SQL_TIMEOUT_MS de SQLite (408 si ocurre antes
+    de la primera fila, línea `error` si ocurre después).
+    """
+    try:
+        _, lineas = consultas_adhoc.ejecutar(consulta, limite, fragmento)
+    except ConsultaRechazada as error:
+        raise HTTPException(status_code=400, detail=f"Consulta rechazada: {error}")
+    except ConsultaInterrumpida as error:
+        raise HTTPException(status_code=408, detail=str(error))
+    except SinConexionLibre as error:
+        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "1"})
+    return StreamingResponse(lineas, media_type="application/x-ndjson")
+
+
+@router.get("/admin/sql/estado", dependencies=[Depends(requerir_admin)])
+def estado_consultas_sql():
+    """Consultas ad hoc ejecutadas, rechazadas, interrumpidas y truncadas, y límites vigentes"""
+    return consultas_adhoc.estado()
+
+
+@router.get("/admin/logs", dependencies=[Depends(requerir_admin)])
+def logs_recientes(
+    n: int = Query(50, ge=1, le=1000),
+    nivel: Optional[str] = Query(None, description="Nivel mínimo: DEBUG, INFO, WARNING, ERROR, CRITICAL"),
+    desde: Optional[datetime] = Query(None, description="Solo entradas posteriores (ISO 8601; sin zona = UTC)"),
+    fuente: str = Query("auto", pattern="^(auto|memoria|archivo)$")
+):
+    """
+    Últimas entradas de log de este worker, de la más antigua a la más reciente
+
+    Se responden desde el buffer en memoria; si ya descartó entradas que
+    hacen falta, desde el final de LOG_FILE leído hacia atrás (sin
+    recorrer el archivo completo)
+    """
+    try:
+        return registro_logs.recientes(n, nivel, desde, fuente)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/admin/logs/estado", dependencies=[Depends(requerir_admin)])
+def estado_logs():
+    """Cola de logs: registros encolados, en espera, omitidos por muestreo y descartados por cola llena"""
+    return registro_logs.estado()
+
+
+@router.get("/admin/mantenimiento", dependencies=[Depends(requerir_admin)])
+def estado_mantenimiento():
+    """
+    Tareas de mantenimiento de SQLite: intervalo, próxima ejecución y la
+    última (de cualquier worker) con su duración y efecto en archivo, WAL y
+    páginas libres
+    """
+    return planificador_mantenimiento.estado()
+
+
+@router.post("/admin/mantenimiento/{tarea}", dependencies=[Depends(requerir_admin)])
+def ejecutar_mantenimiento(tarea: str):
+    """Ejecutar una tarea ya (optimize, analyze, checkpoint, vacuum), sin esperar su turno ni la ventana"""
+    try:
+        return planificador_mantenimiento.ejecutar(tarea)
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    except RuntimeError as error:
+        raise HTTPException(status_code=503, detail=str(error))
+    except MantenimientoOcupado as error:
+        raise HTTPException(status_code=409, detail=str(error), headers={"Retry-After": "5"})
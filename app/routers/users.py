@@ -2,10 +2,19 @@
 Router para endpoints de usuarios
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import timezone
 
+from app.core.singleflight import lecturas
+from app.core.versioning import (
+    CacheCondicional,
+    data_version,
+    etag_fila,
+    fecha_http,
+    version_de_if_match,
+)
 from app.database import get_db
 from app.schemas.user import Usuario, UsuarioCrear, UsuarioActualizar, UsuarioLista
 from app.services.user_service import UsuarioService
@@ -22,6 +31,7 @@ def listar_usuarios(
     skip: int = 0,
     limit: int = 100,
     activo: Optional[bool] = None,
+    etag: str = Depends(CacheCondicional()),
     db: Session = Depends(get_db)
 ):
     """
@@ -30,17 +40,40 @@ def listar_usuarios(
     - **skip**: Número de registros a omitir
     - **limit**: Máximo número de registros a retornar
     - **activo**: Filtrar por estado activo (True/False)
+    
+    Responde 304 si `If-None-Match` coincide con la versión actual de los datos.
+    Peticiones idénticas simultáneas comparten una sola consulta
     """
-    usuarios = UsuarioService.obtener_usuarios(db, skip, limit, activo)
-    return usuarios
+    def consultar():
+        usuarios = UsuarioService.obtener_usuarios(db, skip, limit, activo)
+        return [UsuarioLista.model_validate(u) for u in usuarios]
+    
+    return lecturas.ejecutar(("listar_usuarios", etag, skip, limit, activo), consultar)
 
 
 @router.get("/{usuario_id}", response_model=Usuario)
-def obtener_usuario(usuario_id: int, db: Session = Depends(get_db)):
+def obtener_usuario(
+    usuario_id: int,
+    response: Response,
+    etag: str = Depends(CacheCondicional(por_fila=True)),
+    db: Session = Depends(get_db)
+):
     """
     Obtener un usuario específico por ID
+    
+    Responde 304 si `If-None-Match` coincide con la versión actual de los datos.
+    El ETag incluye la versión de la fila y sirve para `If-Match` en el PUT
     """
-    usuario = UsuarioService.obtener_usuario_por_id(db, usuario_id)
+    usuario = lecturas.ejecutar(
+        ("obtener_usuario", etag, usuario_id),
+        lambda: Usuario.model_validate(UsuarioService.obtener_usuario_por_id(db, usuario_id))
+    )
+    response.headers["ETag"] = etag_fila(etag, usuario.version)
+    modificado = usuario.updated_at or usuario.created_at
+    if modificado:
+        response.headers["Last-Modified"] = fecha_http(
+            modificado.replace(tzinfo=timezone.utc).timestamp()
+        )
     return usuario
 
 
@@ -62,14 +95,27 @@ def crear_usuario(usuario: UsuarioCrear, db: Session = Depends(get_db)):
 def actualizar_usuario(
     usuario_id: int,
     usuario_data: UsuarioActualizar,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar un usuario existente
     
-    Solo se actualizan los campos proporcionados
+    Solo se actualizan los campos proporcionados. Con `If-Match` (ETag de
+    `GET /api/usuarios/{id}`) la actualización solo se aplica si nadie más
+    modificó el usuario; si no, se responde 412
     """
-    usuario_actualizado = UsuarioService.actualizar_usuario(db, usuario_id, usuario_data)
+    version_esperada = None
+    if if_match and if_match.strip() != "*":
+        version_esperada = version_de_if_match(if_match)
+        if version_esperada is None:
+            raise HTTPException(status_code=412, detail="If-Match no corresponde a ningún usuario")
+    
+    usuario_actualizado = UsuarioService.actualizar_usuario(
+        db, usuario_id, usuario_data, version_esperada
+    )
+    response.headers["ETag"] = etag_fila(data_version.etag(), usuario_actualizado.version)
     return usuario_actualizado
 
 
@@ -46,6 +46,8 @@ class Usuario(UsuarioBase):
     """Schema de respuesta con datos completos"""
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int = 1
     
     class Config:
         from_attributes = True
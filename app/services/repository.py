@@ -0,0 +1,74 @@
+"""
+Interfaz de los motores de almacenamiento de usuarios
+"""
+
+import functools
+from datetime import datetime
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from app.schemas.user import UsuarioActualizar, UsuarioCrear
+
+
+class RepositorioUsuarios(Protocol):
+    """
+    Operaciones que `UsuarioService` delega en un motor alternativo
+
+    Cada método recibe como primer argumento el objeto que entrega `get_db`
+    para ese motor. Los usuarios retornados solo necesitan los atributos de
+    `UsuarioORM` (los esquemas de respuesta se validan con from_attributes).
+    Los errores se reportan con HTTPException, igual que en `UsuarioService`.
+    """
+
+    def obtener_usuarios(self, db, skip: int, limit: int, activo: Optional[bool]) -> List: ...
+
+    def obtener_usuario_por_id(self, db, usuario_id: int): ...
+
+    def obtener_usuario_por_email(self, db, email: str): ...
+
+    def crear_usuario(self, db, usuario_data: UsuarioCrear): ...
+
+    def actualizar_usuario(
+        self, db, usuario_id: int, usuario_data: UsuarioActualizar, version_esperada: Optional[int]
+    ): ...
+
+    def eliminar_usuario(self, db, usuario_id: int) -> bool: ...
+
+    def obtener_estadisticas(self, db) -> dict: ...
+
+    def obtener_filas_analiticas(self, db, desde: Optional[datetime]) -> Tuple[List[tuple], int]: ...
+
+    def obtener_ids(self, db) -> List[int]: ...
+
+    def obtener_conteos_registros(
+        self, db, granularidad: str, zona: str, inicio: datetime, fin: datetime
+    ) -> Dict[str, int]: ...
+
+
+# Tipo de sesión -> repositorio; una Session de SQLAlchemy no figura aquí
+_repositorios: Dict[type, RepositorioUsuarios] = {}
+
+
+def registrar_repositorio(tipo_sesion: type, repositorio: RepositorioUsuarios):
+    """Atender con `repositorio` las llamadas que reciban una sesión de `tipo_sesion`"""
+    _repositorios[tipo_sesion] = repositorio
+
+
+def repositorio_de(db) -> Optional[RepositorioUsuarios]:
+    """Repositorio alternativo para esta sesión, o None para usar SQLAlchemy"""
+    return _repositorios.get(type(db))
+
+
+def delegable(metodo):
+    """
+    Decorador de los métodos de `UsuarioService`: si la sesión tiene un
+    repositorio registrado, atiende la llamada su método del mismo nombre
+    """
+
+    @functools.wraps(metodo)
+    def despachar(db, *args, **kwargs):
+        repositorio = repositorio_de(db)
+        if repositorio is not None:
+            return getattr(repositorio, metodo.__name__)(db, *args, **kwargs)
+        return metodo(db, *args, **kwargs)
+
+    return despachar
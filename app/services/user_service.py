@@ -2,19 +2,48 @@
 Servicio de lógica de negocio para usuarios
 """
 
+import heapq
+import itertools
+
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, time
 
+from app.core.events import broadcaster
+from app.core.memory_store import EmailDuplicado, RegistroUsuario, SesionMemoria, VersionNoCoincide
+from app.core.sharding import SesionFragmentada, emails_usuarios
+from app.core.signups import claves_de_ventana, conteos_de_fechas
+from app.services.repository import delegable, registrar_repositorio
+from app.core.versioning import data_version
+from app.models.signups import ResumenRegistrosORM
 from app.models.user import UsuarioORM
-from app.schemas.user import UsuarioCrear, UsuarioActualizar
+from app.schemas.user import Usuario, UsuarioCrear, UsuarioActualizar
+
+
+def _registrar_cambio(evento: str, datos: dict):
+    """Invalidar ETags y notificar a los clientes del feed de eventos"""
+    version = data_version.incrementar()
+    broadcaster.publicar(evento, {"version": version, **datos})
+
+
+def _serializar(usuario: UsuarioORM) -> dict:
+    return Usuario.model_validate(usuario).model_dump(mode="json")
 
 
 class UsuarioService:
-    """Servicio para manejar la lógica de negocio de usuarios"""
+    """
+    Servicio para manejar la lógica de negocio de usuarios
+
+    Con una Session de SQLAlchemy (el motor por defecto) consulta la BD
+    directamente; con la sesión de otro motor delega en el repositorio
+    registrado para ella (`delegable`, en app/services/repository.py).
+    """
     
     @staticmethod
+    @delegable
     def obtener_usuarios(
         db: Session,
         skip: int = 0,
@@ -27,9 +56,11 @@ class UsuarioService:
         if activo is not None:
             query = query.filter(UsuarioORM.activo == activo)
         
-        return query.offset(skip).limit(limit).all()
+        # Orden por id: paginación estable (y combinable entre fragmentos)
+        return query.order_by(UsuarioORM.id).offset(skip).limit(limit).all()
     
     @staticmethod
+    @delegable
     def obtener_usuario_por_id(db: Session, usuario_id: int) -> UsuarioORM:
         """Obtener usuario por ID"""
         usuario = db.query(UsuarioORM).filter(UsuarioORM.id == usuario_id).first()
@@ -38,11 +69,13 @@ class UsuarioService:
         return usuario
     
     @staticmethod
+    @delegable
     def obtener_usuario_por_email(db: Session, email: str) -> Optional[UsuarioORM]:
         """Obtener usuario por email"""
         return db.query(UsuarioORM).filter(UsuarioORM.email == email).first()
     
     @staticmethod
+    @delegable
     def crear_usuario(db: Session, usuario_data: UsuarioCrear) -> UsuarioORM:
         """Crear nuevo usuario"""
         # Verificar si el email ya existe
@@ -58,46 +91,364 @@ class UsuarioService:
         db.add(nuevo_usuario)
         db.commit()
         db.refresh(nuevo_usuario)
+        _registrar_cambio("usuario_creado", {"usuario": _serializar(nuevo_usuario)})
         return nuevo_usuario
     
     @staticmethod
+    @delegable
     def actualizar_usuario(
         db: Session, 
         usuario_id: int, 
-        usuario_data: UsuarioActualizar
+        usuario_data: UsuarioActualizar,
+        version_esperada: Optional[int] = None
     ) -> UsuarioORM:
-        """Actualizar usuario existente"""
-        usuario = UsuarioService.obtener_usuario_por_id(db, usuario_id)
-        
+        """
+        Actualizar usuario existente
+
+        Se ejecuta un único UPDATE condicional (sin leer antes la fila). Con
+        `version_esperada` solo se aplica si la fila sigue en esa versión;
+        si otra petición la modificó primero se responde 412.
+        """
         # Actualizar solo los campos proporcionados
         update_data = usuario_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(usuario, field, value)
+        
+        condiciones = [UsuarioORM.id == usuario_id]
+        if version_esperada is not None:
+            condiciones.append(UsuarioORM.version == version_esperada)
+        
+        resultado = db.execute(
+            update(UsuarioORM)
+            .where(*condiciones)
+            .values(
+                **update_data,
+                version=UsuarioORM.version + 1,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        
+        if resultado.rowcount == 0:
+            db.rollback()
+            # 404 si no existe; si existe, la versión ya no coincide
+            UsuarioService.obtener_usuario_por_id(db, usuario_id)
+            raise HTTPException(
+                status_code=412,
+                detail="El usuario fue modificado por otra petición"
+            )
         
         db.commit()
-        db.refresh(usuario)
+        usuario = UsuarioService.obtener_usuario_por_id(db, usuario_id)
+        _registrar_cambio("usuario_actualizado", {"usuario": _serializar(usuario)})
         return usuario
     
     @staticmethod
+    @delegable
     def eliminar_usuario(db: Session, usuario_id: int) -> bool:
         """Eliminar usuario"""
         usuario = UsuarioService.obtener_usuario_por_id(db, usuario_id)
         db.delete(usuario)
         db.commit()
+        _registrar_cambio("usuario_eliminado", {"id": usuario_id})
         return True
     
     @staticmethod
+    @delegable
     def obtener_estadisticas(db: Session) -> dict:
-        """Obtener estadísticas de usuarios"""
-        total_usuarios = db.query(UsuarioORM).count()
-        usuarios_activos = db.query(UsuarioORM).filter(UsuarioORM.activo == True).count()
-        usuarios_hoy = db.query(UsuarioORM).filter(
-            UsuarioORM.created_at >= datetime.now().date()
-        ).count()
-        
+        """Obtener estadísticas de usuarios (una sola consulta)"""
+        # created_at se guarda en UTC: "hoy" es el día UTC, no el del servidor
+        hoy = datetime.combine(datetime.utcnow().date(), time())
+        total_usuarios, usuarios_activos, usuarios_hoy = db.query(
+            func.count(UsuarioORM.id),
+            func.coalesce(func.sum(case((UsuarioORM.activo == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((UsuarioORM.created_at >= hoy, 1), else_=0)), 0),
+        ).one()
+
         return {
             "total_usuarios": total_usuarios,
             "usuarios_activos": usuarios_activos,
             "usuarios_inactivos": total_usuarios - usuarios_activos,
             "usuarios_hoy": usuarios_hoy
         }
+
+    @staticmethod
+    @delegable
+    def obtener_filas_analiticas(db: Session, desde: Optional[datetime] = None) -> Tuple[List[tuple], int]:
+        """
+        Filas (id, edad, activo, created_at) modificadas desde `desde` y el total actual
+
+        Sin `desde` retorna todas. Alimenta la instantánea de columnas de
+        app/core/analytics.py, que así solo relee lo que cambió.
+        """
+        query = db.query(UsuarioORM.id, UsuarioORM.edad, UsuarioORM.activo, UsuarioORM.created_at)
+        if desde is not None:
+            query = query.filter(UsuarioORM.updated_at >= desde)
+        filas = [tuple(fila) for fila in query.all()]
+        return filas, db.query(UsuarioORM).count()
+
+    @staticmethod
+    @delegable
+    def obtener_ids(db: Session) -> List[int]:
+        """Todos los ids (para detectar eliminaciones)"""
+        return [usuario_id for (usuario_id,) in db.query(UsuarioORM.id)]
+
+    @staticmethod
+    @delegable
+    def obtener_conteos_registros(
+        db: Session, granularidad: str, zona: str, inicio: datetime, fin: datetime
+    ) -> Dict[str, int]:
+        """
+        Registros por hora UTC o por día local de `zona` en la ventana UTC [inicio, fin)
+
+        Lee la tabla de resumen (una fila por periodo), no `usuarios`.
+        """
+        primera, ultima = claves_de_ventana(granularidad, zona, inicio, fin)
+        filas = db.query(ResumenRegistrosORM.inicio, ResumenRegistrosORM.usuarios).filter(
+            ResumenRegistrosORM.zona == zona,
+            ResumenRegistrosORM.granularidad == granularidad,
+            ResumenRegistrosORM.inicio.between(primera, ultima),
+        )
+        return {clave: usuarios for clave, usuarios in filas if usuarios}
+
+
+class UsuariosFragmentados:
+    """
+    Repositorio para `SesionFragmentada`: las operaciones de `UsuarioService` sobre varios fragmentos
+
+    La fila de cada usuario vive en el fragmento de su id y la entrada de su
+    email en `emails_usuarios` del fragmento de su email, cuya clave
+    primaria garantiza la unicidad global. Lecturas y escrituras por id o
+    email tocan uno o dos fragmentos; listados y estadísticas consultan
+    todos en paralelo y combinan los resultados. Cuando una escritura abarca
+    dos fragmentos no es atómica: primero se reserva el email y se deshace
+    la reserva si falla la fila (scripts/reshard.py reconstruye el índice).
+    """
+
+    @staticmethod
+    def obtener_usuarios(
+        db: SesionFragmentada,
+        skip: int = 0,
+        limit: int = 100,
+        activo: Optional[bool] = None
+    ) -> List[UsuarioORM]:
+        # Cada fragmento aporta sus primeras skip + limit filas por id y se
+        # mezclan ordenadas: el resultado es el mismo que con una sola BD
+        paginas = db.fragmentos.en_paralelo(
+            UsuarioService.obtener_usuarios,
+            [(sesion, 0, skip + limit, activo) for sesion in db.todas()],
+        )
+        combinadas = heapq.merge(*paginas, key=lambda usuario: usuario.id)
+        return list(itertools.islice(combinadas, skip, skip + limit))
+
+    @staticmethod
+    def obtener_usuario_por_email(db: SesionFragmentada, email: str) -> Optional[UsuarioORM]:
+        usuario_id = db.de_email(email).execute(
+            emails_usuarios.select().with_only_columns(emails_usuarios.c.usuario_id)
+            .where(emails_usuarios.c.email == email)
+        ).scalar()
+        if usuario_id is None:
+            return None
+        return UsuarioService.obtener_usuario_por_email(db.de_usuario(usuario_id), email)
+
+    @staticmethod
+    def _reservar_email(db: SesionFragmentada, email: str, usuario_id: int) -> Session:
+        sesion = db.de_email(email)
+        try:
+            sesion.execute(insert(emails_usuarios).values(email=email, usuario_id=usuario_id))
+        except IntegrityError:
+            sesion.rollback()
+            raise HTTPException(status_code=400, detail="El email ya está registrado")
+        return sesion
+
+    @staticmethod
+    def _liberar_email(db: SesionFragmentada, email: str, usuario_id: int):
+        sesion = db.de_email(email)
+        sesion.execute(
+            delete(emails_usuarios)
+            .where(emails_usuarios.c.email == email, emails_usuarios.c.usuario_id == usuario_id)
+        )
+        sesion.commit()
+
+    @staticmethod
+    def crear_usuario(db: SesionFragmentada, usuario_data: UsuarioCrear) -> UsuarioORM:
+        usuario_id = db.fragmentos.ids.siguiente()
+        sesion_email = UsuariosFragmentados._reservar_email(db, usuario_data.email, usuario_id)
+        sesion = db.de_usuario(usuario_id)
+        if sesion is not sesion_email:
+            sesion_email.commit()
+
+        nuevo_usuario = UsuarioORM(id=usuario_id, **usuario_data.model_dump())
+        sesion.add(nuevo_usuario)
+        try:
+            # Si ambos viven en el mismo fragmento, un solo commit atómico
+            sesion.commit()
+        except Exception:
+            sesion.rollback()
+            if sesion is not sesion_email:
+                UsuariosFragmentados._liberar_email(db, usuario_data.email, usuario_id)
+            raise
+        sesion.refresh(nuevo_usuario)
+        _registrar_cambio("usuario_creado", {"usuario": _serializar(nuevo_usuario)})
+        return nuevo_usuario
+
+    @staticmethod
+    def actualizar_usuario(
+        db: SesionFragmentada,
+        usuario_id: int,
+        usuario_data: UsuarioActualizar,
+        version_esperada: Optional[int] = None
+    ) -> UsuarioORM:
+        sesion = db.de_usuario(usuario_id)
+        email_nuevo = usuario_data.model_dump(exclude_unset=True).get("email")
+        if email_nuevo is None:
+            return UsuarioService.actualizar_usuario(sesion, usuario_id, usuario_data, version_esperada)
+
+        email_anterior = UsuarioService.obtener_usuario_por_id(sesion, usuario_id).email
+        sesion.rollback()
+        if email_nuevo == email_anterior:
+            return UsuarioService.actualizar_usuario(sesion, usuario_id, usuario_data, version_esperada)
+
+        UsuariosFragmentados._reservar_email(db, email_nuevo, usuario_id).commit()
+        try:
+            usuario = UsuarioService.actualizar_usuario(sesion, usuario_id, usuario_data, version_esperada)
+        except Exception:
+            UsuariosFragmentados._liberar_email(db, email_nuevo, usuario_id)
+            raise
+        UsuariosFragmentados._liberar_email(db, email_anterior, usuario_id)
+        return usuario
+
+    @staticmethod
+    def eliminar_usuario(db: SesionFragmentada, usuario_id: int) -> bool:
+        sesion = db.de_usuario(usuario_id)
+        email = UsuarioService.obtener_usuario_por_id(sesion, usuario_id).email
+        UsuarioService.eliminar_usuario(sesion, usuario_id)
+        UsuariosFragmentados._liberar_email(db, email, usuario_id)
+        return True
+
+    @staticmethod
+    def obtener_estadisticas(db: SesionFragmentada) -> dict:
+        parciales = db.fragmentos.en_paralelo(
+            UsuarioService.obtener_estadisticas, [(sesion,) for sesion in db.todas()]
+        )
+        return {clave: sum(parcial[clave] for parcial in parciales) for clave in parciales[0]}
+
+    @staticmethod
+    def obtener_usuario_por_id(db: SesionFragmentada, usuario_id: int) -> UsuarioORM:
+        return UsuarioService.obtener_usuario_por_id(db.de_usuario(usuario_id), usuario_id)
+
+    @staticmethod
+    def obtener_filas_analiticas(db: SesionFragmentada, desde: Optional[datetime] = None) -> Tuple[List[tuple], int]:
+        parciales = db.fragmentos.en_paralelo(
+            UsuarioService.obtener_filas_analiticas, [(sesion, desde) for sesion in db.todas()]
+        )
+        return [fila for filas, _ in parciales for fila in filas], sum(total for _, total in parciales)
+
+    @staticmethod
+    def obtener_ids(db: SesionFragmentada) -> List[int]:
+        parciales = db.fragmentos.en_paralelo(UsuarioService.obtener_ids, [(sesion,) for sesion in db.todas()])
+        return [usuario_id for ids in parciales for usuario_id in ids]
+
+    @staticmethod
+    def obtener_conteos_registros(
+        db: SesionFragmentada, granularidad: str, zona: str, inicio: datetime, fin: datetime
+    ) -> Dict[str, int]:
+        # Cada fragmento resume sus propios usuarios
+        parciales = db.fragmentos.en_paralelo(
+            UsuarioService.obtener_conteos_registros,
+            [(sesion, granularidad, zona, inicio, fin) for sesion in db.todas()],
+        )
+        conteos: Dict[str, int] = {}
+        for parcial in parciales:
+            for clave, usuarios in parcial.items():
+                conteos[clave] = conteos.get(clave, 0) + usuarios
+        return conteos
+
+
+class RepositorioMemoria:
+    """Repositorio para `SesionMemoria`: todo se responde desde `AlmacenMemoria`"""
+
+    @staticmethod
+    def obtener_usuarios(
+        db: SesionMemoria,
+        skip: int = 0,
+        limit: int = 100,
+        activo: Optional[bool] = None
+    ) -> List[RegistroUsuario]:
+        return db.almacen.listar(skip, limit, activo)
+
+    @staticmethod
+    def obtener_usuario_por_id(db: SesionMemoria, usuario_id: int) -> RegistroUsuario:
+        usuario = db.almacen.obtener(usuario_id)
+        if usuario is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return usuario
+
+    @staticmethod
+    def obtener_usuario_por_email(db: SesionMemoria, email: str) -> Optional[RegistroUsuario]:
+        return db.almacen.obtener_por_email(email)
+
+    @staticmethod
+    def crear_usuario(db: SesionMemoria, usuario_data: UsuarioCrear) -> RegistroUsuario:
+        try:
+            usuario = db.almacen.crear(usuario_data.model_dump())
+        except EmailDuplicado:
+            raise HTTPException(status_code=400, detail="El email ya está registrado")
+        _registrar_cambio("usuario_creado", {"usuario": _serializar(usuario)})
+        return usuario
+
+    @staticmethod
+    def actualizar_usuario(
+        db: SesionMemoria,
+        usuario_id: int,
+        usuario_data: UsuarioActualizar,
+        version_esperada: Optional[int] = None
+    ) -> RegistroUsuario:
+        try:
+            usuario = db.almacen.actualizar(
+                usuario_id, usuario_data.model_dump(exclude_unset=True), version_esperada
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        except VersionNoCoincide:
+            raise HTTPException(status_code=412, detail="El usuario fue modificado por otra petición")
+        except EmailDuplicado:
+            raise HTTPException(status_code=400, detail="El email ya está registrado")
+        _registrar_cambio("usuario_actualizado", {"usuario": _serializar(usuario)})
+        return usuario
+
+    @staticmethod
+    def eliminar_usuario(db: SesionMemoria, usuario_id: int) -> bool:
+        try:
+            db.almacen.eliminar(usuario_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        _registrar_cambio("usuario_eliminado", {"id": usuario_id})
+        return True
+
+    @staticmethod
+    def obtener_estadisticas(db: SesionMemoria) -> dict:
+        return db.almacen.estadisticas()
+
+    @staticmethod
+    def obtener_filas_analiticas(db: SesionMemoria, desde: Optional[datetime] = None) -> Tuple[List[tuple], int]:
+        registros = list(db.almacen.por_id.values())
+        filas = [
+            (r.id, r.edad, r.activo, r.created_at)
+            for r in registros
+            if desde is None or (r.updated_at is not None and r.updated_at >= desde)
+        ]
+        return filas, len(registros)
+
+    @staticmethod
+    def obtener_ids(db: SesionMemoria) -> List[int]:
+        return list(db.almacen.por_id)
+
+    @staticmethod
+    def obtener_conteos_registros(
+        db: SesionMemoria, granularidad: str, zona: str, inicio: datetime, fin: datetime
+    ) -> Dict[str, int]:
+        # Sin tabla de resumen: el índice por fecha de creación ya acota la ventana
+        return conteos_de_fechas(granularidad, zona, db.almacen.creados_entre(inicio, fin))
+
+
+registrar_repositorio(SesionFragmentada, UsuariosFragmentados)
+registrar_repositorio(SesionMemoria, RepositorioMemoria)
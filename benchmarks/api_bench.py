@@ -0,0 +1,279 @@
+"""
+Benchmark HTTP de los endpoints de la API
+
+Ejecuta una carga mixta (listar, obtener, crear, actualizar, eliminar,
+estadísticas) con concurrencia configurable, en proceso contra la app ASGI
+o contra un servidor real, y reporta throughput y p50/p95/p99 por operación.
+
+Uso:
+    python -m benchmarks.api_bench --concurrencia 16 --duracion 10
+    python -m benchmarks.api_bench --url http://127.0.0.1:8000 --duracion 30
+    python -m benchmarks.api_bench --baseline benchmarks/resultados/baseline.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import (
+    cargar_json,
+    comparar_con_baseline,
+    entorno,
+    guardar_json,
+    imprimir_tabla,
+    resumen_latencias,
+)
+
+# Peso relativo de cada operación en la carga mixta
+CARGA_POR_DEFECTO = {
+    "listar": 40,
+    "obtener": 30,
+    "estadisticas": 15,
+    "crear": 7,
+    "actualizar": 5,
+    "eliminar": 3,
+}
+
+
+def parsear_carga(texto: Optional[str]) -> Dict[str, int]:
+    """Convertir `listar=50,crear=10` en un dict de pesos"""
+    if not texto:
+        return dict(CARGA_POR_DEFECTO)
+    carga = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in CARGA_POR_DEFECTO:
+            raise ValueError(f"Operación desconocida: {nombre}")
+        carga[nombre] = int(peso or 1)
+    return carga
+
+
+class EstadoCarga:
+    """IDs disponibles y resultados compartidos por los workers"""
+
+    def __init__(self, semilla: int):
+        self.random = random.Random(semilla)
+        self.ids: List[int] = []
+        self.secuencia = 0
+        self.latencias: Dict[str, List[float]] = {}
+        self.errores: Dict[str, int] = {}
+        self.status: Dict[str, Dict[int, int]] = {}
+
+    def email_nuevo(self) -> str:
+        self.secuencia += 1
+        return f"bench-{os.getpid()}-{time.time_ns()}-{self.secuencia}@ejemplo.com"
+
+    def registrar(self, operacion: str, duracion: float, status: int, ok: bool):
+        self.latencias.setdefault(operacion, []).append(duracion)
+        por_status = self.status.setdefault(operacion, {})
+        por_status[status] = por_status.get(status, 0) + 1
+        if not ok:
+            self.errores[operacion] = self.errores.get(operacion, 0) + 1
+
+
+async def _ejecutar(client: httpx.AsyncClient, estado: EstadoCarga, operacion: str):
+    r = estado.random
+    if operacion == "listar":
+        peticion = client.get("/api/usuarios/", params={"skip": r.randint(0, 50), "limit": 50})
+        esperado = (200,)
+    elif operacion == "obtener" and estado.ids:
+        peticion = client.get(f"/api/usuarios/{r.choice(estado.ids)}")
+        esperado = (200, 404)
+    elif operacion == "estadisticas":
+        peticion = client.get("/api/estadisticas")
+        esperado = (200,)
+    elif operacion == "actualizar" and estado.ids:
+        peticion = client.put(f"/api/usuarios/{r.choice(estado.ids)}", json={"edad": r.randint(18, 90)})
+        esperado = (200, 404)
+    elif operacion == "eliminar" and len(estado.ids) > 10:
+        usuario_id = estado.ids.pop(r.randrange(len(estado.ids)))
+        peticion = client.delete(f"/api/usuarios/{usuario_id}")
+        esperado = (200, 404)
+    else:
+        operacion = "crear"
+        peticion = client.post("/api/usuarios/", json={
+            "nombre": "Usuario Benchmark",
+            "email": estado.email_nuevo(),
+            "edad": r.randint(18, 90),
+        })
+        esperado = (201,)
+
+    inicio = time.perf_counter()
+    try:
+        respuesta = await peticion
+        status = respuesta.status_code
+    except httpx.HTTPError:
+        status = 0
+    duracion = time.perf_counter() - inicio
+
+    estado.registrar(operacion, duracion, status, status in esperado)
+    if operacion == "crear" and status == 201:
+        estado.ids.append(respuesta.json()["id"])
+
+
+async def _worker(client, estado: EstadoCarga, carga: Dict[str, int], fin: float, restantes: list):
+    operaciones = list(carga)
+    pesos = list(carga.values())
+    while time.perf_counter() < fin:
+        if restantes[0] is not None:
+            if restantes[0] <= 0:
+                return
+            restantes[0] -= 1
+        operacion = estado.random.choices(operaciones, pesos)[0]
+        await _ejecutar(client, estado, operacion)
+
+
+async def correr_carga(
+    client: httpx.AsyncClient,
+    concurrencia: int,
+    duracion: float,
+    carga: Dict[str, int],
+    semilla: int = 42,
+    peticiones: Optional[int] = None,
+    precarga: int = 100,
+) -> dict:
+    """Ejecutar la carga y devolver el resumen por operación"""
+    estado = EstadoCarga(semilla)
+
+    # Usuarios iniciales para que obtener/actualizar/eliminar tengan IDs
+    for _ in range(precarga):
+        await _ejecutar(client, estado, "crear")
+    estado.latencias.clear()
+    estado.errores.clear()
+    estado.status.clear()
+
+    inicio = time.perf_counter()
+    fin = inicio + duracion if duracion else float("inf")
+    restantes = [peticiones]
+    await asyncio.gather(*(
+        _worker(client, estado, carga, fin, restantes) for _ in range(concurrencia)
+    ))
+    transcurrido = time.perf_counter() - inicio
+
+    operaciones = {}
+    for nombre in sorted(estado.latencias):
+        resumen = resumen_latencias(estado.latencias[nombre], transcurrido)
+        resumen["errores"] = estado.errores.get(nombre, 0)
+        resumen["status"] = {str(k): v for k, v in sorted(estado.status[nombre].items())}
+        operaciones[nombre] = resumen
+
+    todas = [l for serie in estado.latencias.values() for l in serie]
+    return {
+        "duracion_s": round(transcurrido, 3),
+        "concurrencia": concurrencia,
+        "total": resumen_latencias(todas, transcurrido),
+        "operaciones": operaciones,
+    }
+
+
+@contextmanager
+def base_de_datos_aislada(ruta_db: str):
+    """Apuntar la app a una BD propia del benchmark durante la ejecución"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.queries import monitor_consultas
+    from app.database import crear_esquema, get_db
+    from app.main import app
+
+    engine = create_engine(f"sqlite:///{ruta_db}", connect_args={"check_same_thread": False})
+    monitor_consultas.instrumentar(engine)
+    crear_esquema(engine)
+    Sesion = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db_bench():
+        db = Sesion()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    anterior = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = get_db_bench
+    try:
+        yield app
+    finally:
+        if anterior is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = anterior
+        engine.dispose()
+
+
+async def ejecutar_en_proceso(ruta_db: str, **opciones) -> dict:
+    with base_de_datos_aislada(ruta_db) as app:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+            return await correr_carga(client, **opciones)
+
+
+async def ejecutar_contra_servidor(url: str, concurrencia: int, **opciones) -> dict:
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as client:
+        return await correr_carga(client, concurrencia=concurrencia, **opciones)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark HTTP de la API de usuarios")
+    parser.add_argument("--url", help="Servidor real (si se omite, se usa la app ASGI en proceso)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga")
+    parser.add_argument("--peticiones", type=int, help="Detener tras N peticiones (además de --duracion)")
+    parser.add_argument("--carga", help="Pesos, p. ej. listar=50,obtener=30,crear=20")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--precarga", type=int, default=100, help="Usuarios creados antes de medir")
+    parser.add_argument("--db", default="benchmarks/resultados/bench.db", help="BD del modo en proceso")
+    parser.add_argument("--salida", default="benchmarks/resultados/api_bench.json")
+    parser.add_argument("--baseline", help="JSON de una ejecución previa para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    opciones = dict(
+        concurrencia=args.concurrencia,
+        duracion=args.duracion,
+        carga=parsear_carga(args.carga),
+        semilla=args.semilla,
+        peticiones=args.peticiones,
+        precarga=args.precarga,
+    )
+    if args.url:
+        resultados = asyncio.run(ejecutar_contra_servidor(args.url, **opciones))
+    else:
+        os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+        resultados = asyncio.run(ejecutar_en_proceso(args.db, **opciones))
+
+    resultados["modo"] = args.url or "asgi-en-proceso"
+    resultados["carga"] = opciones["carga"]
+    resultados["entorno"] = entorno()
+    guardar_json(resultados, args.salida)
+
+    imprimir_tabla({**resultados["operaciones"], "TOTAL": resultados["total"]})
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.baseline:
+        baseline = cargar_json(args.baseline)
+        if baseline is None:
+            print(f"Baseline {args.baseline} no existe; se omite la comparación")
+            return 0
+        regresiones = comparar_con_baseline(
+            resultados["operaciones"], baseline.get("operaciones", {}), args.tolerancia
+        )
+        if regresiones:
+            print("\n⚠️  Regresiones respecto al baseline:")
+            for regresion in regresiones:
+                print(f"   - {regresion}")
+            return 1
+        print("\n✅ Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Utilidades compartidas por los benchmarks: percentiles, JSON y baseline
+"""
+
+import json
+import math
+import os
+import platform
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+def resumen_latencias(latencias: List[float], duracion: float) -> dict:
+    """Conteo, throughput y percentiles (en ms) de una serie de latencias en segundos"""
+    ordenados = sorted(latencias)
+    total = len(ordenados)
+    return {
+        "peticiones": total,
+        "throughput_rps": round(total / duracion, 2) if duracion > 0 else 0.0,
+        "media_ms": round(sum(ordenados) / total * 1000, 3) if total else 0.0,
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 3),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 3),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 3),
+        "max_ms": round(ordenados[-1] * 1000, 3) if total else 0.0,
+    }
+
+
+def entorno() -> dict:
+    """Datos de la máquina para poder comparar resultados con contexto"""
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def guardar_json(resultados: dict, ruta: str):
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+def cargar_json(ruta: str) -> Optional[dict]:
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def comparar_con_baseline(
+    actual: Dict[str, dict],
+    baseline: Dict[str, dict],
+    tolerancia: float = 0.15
+) -> List[str]:
+    """
+    Regresiones por operación respecto a un baseline
+
+    Se considera regresión que el p95 suba o que el throughput baje más de
+    `tolerancia` (fracción). Las operaciones sin baseline se ignoran.
+    """
+    regresiones = []
+    for nombre, datos in actual.items():
+        base = baseline.get(nombre)
+        if not base:
+            continue
+        if base.get("p95_ms") and datos["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+            regresiones.append(
+                f"{nombre}: p95 {datos['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms"
+            )
+        if base.get("throughput_rps") and datos["throughput_rps"] < base["throughput_rps"] * (1 - tolerancia):
+            regresiones.append(
+                f"{nombre}: throughput {datos['throughput_rps']:.1f} rps vs baseline {base['throughput_rps']:.1f} rps"
+            )
+    return regresiones
+
+
+def imprimir_tabla(operaciones: Dict[str, dict]):
+    print(f"{'operación':<16}{'n':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for nombre, d in operaciones.items():
+        print(
+            f"{nombre:<16}{d['peticiones']:>8}{d['throughput_rps']:>10.1f}"
+            f"{d['p50_ms']:>10.2f}{d['p95_ms']:>10.2f}{d['p99_ms']:>10.2f}{d.get('errores', 0):>9}"
+        )
@@ -0,0 +1,108 @@
+"""
+Benchmark de compresión: bytes ahorrados frente a CPU gastada
+
+Comprime respuestas representativas de la API (páginas del listado de
+usuarios de distintos tamaños y estadísticas) con cada formato disponible
+y cada perfil de nivel, y reporta tamaño, ahorro, tiempo por respuesta y
+bytes ahorrados por milisegundo de CPU.
+
+Uso:
+    python -m benchmarks.compression_bench
+    python -m benchmarks.compression_bench --repeticiones 50 --salida benchmarks/resultados/compresion.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+from app.core.compression import COMPRESORES, PERFILES, crear_compresor
+from app.middleware.compression import MIN_BYTES
+from benchmarks.common import entorno, guardar_json, percentil
+from scripts.seed_usuarios import COLUMNAS, generar_usuarios
+
+TAMANOS_PAGINA = (10, 100, 1000)
+
+
+def cargas_representativas() -> Dict[str, bytes]:
+    """Cuerpos JSON con la misma forma que devuelve la API"""
+    filas = [dict(zip(COLUMNAS, fila)) for fila in generar_usuarios(max(TAMANOS_PAGINA), semilla=7)]
+    usuarios = [
+        {
+            "id": i + 1,
+            "nombre": fila["nombre"],
+            "email": fila["email"],
+            "activo": bool(fila["activo"]),
+            "created_at": fila["created_at"].replace(" ", "T"),
+        }
+        for i, fila in enumerate(filas)
+    ]
+    cargas = {
+        "estadisticas": {"total_usuarios": 1000, "usuarios_activos": 812, "usuarios_inactivos": 188, "usuarios_hoy": 4},
+    }
+    for tamano in TAMANOS_PAGINA:
+        cargas[f"listar_{tamano}"] = usuarios[:tamano]
+    return {nombre: json.dumps(datos, separators=(",", ":")).encode("utf-8") for nombre, datos in cargas.items()}
+
+
+def medir(cuerpo: bytes, codificacion: str, nivel: int, repeticiones: int) -> dict:
+    tiempos: List[float] = []
+    tamano = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        compresor = crear_compresor(codificacion, nivel)
+        salida = compresor.comprimir(cuerpo) + compresor.terminar()
+        tiempos.append(time.perf_counter() - inicio)
+        tamano = len(salida)
+    tiempos.sort()
+    mediana = percentil(tiempos, 50)
+    ahorrados = len(cuerpo) - tamano
+    return {
+        "bytes_originales": len(cuerpo),
+        "bytes_comprimidos": tamano,
+        "ahorro": round(ahorrados / len(cuerpo), 4),
+        "us_por_respuesta": round(mediana * 1e6, 1),
+        "mb_por_segundo": round(len(cuerpo) / mediana / 1e6, 1) if mediana else 0.0,
+        "bytes_ahorrados_por_ms": round(ahorrados / (mediana * 1000), 1) if mediana else 0.0,
+    }
+
+
+def ejecutar(repeticiones: int = 20) -> dict:
+    resultados = {}
+    for nombre, cuerpo in cargas_representativas().items():
+        por_carga = {}
+        for codificacion in COMPRESORES:
+            for perfil, niveles in PERFILES.items():
+                por_carga[f"{codificacion}/{perfil}"] = medir(cuerpo, codificacion, niveles[codificacion], repeticiones)
+        resultados[nombre] = por_carga
+    return resultados
+
+
+def imprimir(resultados: dict):
+    print(f"{'carga':<16}{'formato/perfil':<20}{'bytes':>10}{'comprimido':>12}{'ahorro':>8}{'µs':>10}{'MB/s':>8}")
+    for carga, formatos in resultados.items():
+        for nombre, d in formatos.items():
+            print(
+                f"{carga:<16}{nombre:<20}{d['bytes_originales']:>10}{d['bytes_comprimidos']:>12}"
+                f"{d['ahorro']:>8.0%}{d['us_por_respuesta']:>10.1f}{d['mb_por_segundo']:>8.1f}"
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bytes ahorrados vs CPU por formato y nivel de compresión")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--salida", default="benchmarks/resultados/compresion.json")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.repeticiones)
+    imprimir(resultados)
+    print(f"\nUmbral actual del middleware: {MIN_BYTES} bytes (las respuestas menores no se comprimen)")
+
+    guardar_json({"formatos": list(COMPRESORES), "resultados": resultados, "entorno": entorno()}, args.salida)
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
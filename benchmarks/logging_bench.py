@@ -0,0 +1,164 @@
+"""
+Benchmark del costo de loguear por petición: handlers síncronos frente a la cola
+
+Cada "petición" hace lo que loguea una petición típica de la app: la línea
+de acceso con campos, un INFO con argumentos y, una de cada diez, un
+WARNING con excepción; entre petición y petición se espera `--trabajo-ms`
+(lo que la petición pasa esperando BD o red, con el GIL libre). Se mide
+cuánto tarda el hilo de la petición en esas llamadas con los handlers en
+el mismo hilo (como antes) y con `ColaLogs`, que solo encola; ambas
+variantes con un disco normal y con uno lento (cada escritura espera
+`--lento-ms`).
+
+Uso:
+    python -m benchmarks.logging_bench
+    python -m benchmarks.logging_bench --peticiones 50000 --lento-ms 2
+    python -m benchmarks.logging_bench --trabajo-ms 0     # ráfaga: la cola se llena y descarta
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from app.core.logs import ColaLogs, FormatoJSON, _Escritor, asignar_id_peticion, restaurar_id_peticion
+from benchmarks.common import entorno, guardar_json, percentil
+
+
+class _DiscoLento(logging.FileHandler):
+    """FileHandler que espera en cada escritura (fsync, disco de red, consola bloqueada)"""
+
+    def __init__(self, ruta: str, espera: float):
+        super().__init__(ruta, encoding="utf-8")
+        self.espera = espera
+
+    def emit(self, record):
+        time.sleep(self.espera)
+        super().emit(record)
+
+
+def _peticion(logger: logging.Logger, i: int):
+    logger.info(
+        "GET /api/usuarios/%d 200 %.2f ms", i, 1.25,
+        extra={"campos": {"metodo": "GET", "ruta": f"/api/usuarios/{i}", "status": 200, "ms": 1.25}},
+    )
+    logger.info("usuario %d leído de la cache (%s)", i, "caliente")
+    if i % 10 == 0:
+        try:
+            raise ValueError(f"edad inválida en {i}")
+        except ValueError:
+            logger.warning("validación fallida", exc_info=True)
+
+
+def medir(
+    peticiones: int, en_cola: bool, espera: float, directorio: str, trabajo: float = 0.0, capacidad: int = 10_000
+) -> dict:
+    """Latencia de las llamadas de log por petición con un archivo JSON como destino"""
+    logger = logging.getLogger(f"bench.logs.{'cola' if en_cola else 'directo'}.{espera}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    ruta = os.path.join(directorio, f"{logger.name}.log")
+    archivo = _DiscoLento(ruta, espera) if espera else logging.FileHandler(ruta, encoding="utf-8")
+    archivo.setFormatter(FormatoJSON())
+    escritor = cola = None
+    if en_cola:
+        cola = ColaLogs(capacidad)
+        escritor = _Escritor(cola.queue, archivo)
+        escritor.start()
+        logger.addHandler(cola)
+    else:
+        logger.addHandler(archivo)
+
+    tiempos: List[float] = []
+    try:
+        for i in range(peticiones):
+            token = asignar_id_peticion(f"bench-{i}")
+            inicio = time.perf_counter()
+            _peticion(logger, i)
+            tiempos.append(time.perf_counter() - inicio)
+            restaurar_id_peticion(token)
+            if trabajo:
+                time.sleep(trabajo)
+        inicio_vaciado = time.perf_counter()
+        if escritor is not None:
+            escritor.stop()
+        vaciado = time.perf_counter() - inicio_vaciado
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        archivo.close()
+
+    with open(ruta, encoding="utf-8") as f:
+        escritas = sum(1 for _ in f)
+    tiempos.sort()
+    resultado = {
+        "p50_us": round(percentil(tiempos, 50) * 1e6, 1),
+        "p99_us": round(percentil(tiempos, 99) * 1e6, 1),
+        "max_us": round(tiempos[-1] * 1e6, 1) if tiempos else 0.0,
+        "lineas_escritas": escritas,
+    }
+    if cola is not None:
+        estado = cola.estado()
+        resultado.update({
+            "omitidas_por_muestreo": estado["omitidos_por_muestreo"],
+            "descartadas_cola_llena": sum(estado["descartados_cola_llena"].values()),
+            "vaciado_al_cerrar_s": round(vaciado, 3),
+        })
+    return resultado
+
+
+def ejecutar(
+    peticiones: int = 5_000, lento_ms: float = 1.0, trabajo_ms: float = 0.2, directorio: str = None
+) -> dict:
+    """Cuatro combinaciones: directo/cola con disco normal y lento"""
+    espera, trabajo = lento_ms / 1000, trabajo_ms / 1000
+    # Con disco lento el directo tardaría peticiones * espera * 2; basta una muestra
+    peticiones_lentas = max(1, min(peticiones, int(2 / espera) if espera else peticiones))
+    with tempfile.TemporaryDirectory(dir=directorio) as temporal:
+        return {
+            "directo": medir(peticiones, False, 0, temporal, trabajo),
+            "cola": medir(peticiones, True, 0, temporal, trabajo),
+            "directo_disco_lento": medir(peticiones_lentas, False, espera, temporal, trabajo),
+            "cola_disco_lento": medir(peticiones_lentas, True, espera, temporal, trabajo),
+        }
+
+
+def imprimir(resultados: dict):
+    print(f"{'variante':<22}{'p50':>10}{'p99':>11}{'escritas':>10}{'descartadas':>13}")
+    for nombre, datos in resultados.items():
+        descartadas = datos.get("omitidas_por_muestreo", 0) + datos.get("descartadas_cola_llena", 0)
+        print(
+            f"{nombre:<22}{datos['p50_us']:>8.1f}µs{datos['p99_us']:>9.1f}µs"
+            f"{datos['lineas_escritas']:>10,}{descartadas:>13,}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Medir el costo de loguear por petición")
+    parser.add_argument("--peticiones", type=int, default=5_000)
+    parser.add_argument("--lento-ms", type=float, default=1.0, help="Espera por escritura del disco lento")
+    parser.add_argument("--trabajo-ms", type=float, default=0.2, help="Espera entre peticiones (0 = ráfaga)")
+    parser.add_argument("--salida", default="benchmarks/resultados/logging.json")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.peticiones, args.lento_ms, args.trabajo_ms)
+    imprimir(resultados)
+    guardar_json(
+        {
+            "peticiones": args.peticiones,
+            "lento_ms": args.lento_ms,
+            "trabajo_ms": args.trabajo_ms,
+            "resultados": resultados,
+            "entorno": entorno(),
+        },
+        args.salida,
+    )
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Reproducción de tráfico capturado (TRAFFIC_CAPTURE_FILE)
+
+Vuelve a emitir las peticiones grabadas respetando los tiempos de llegada
+originales (o escalados con --velocidad) contra la app ASGI en proceso o un
+servidor real, y reporta latencias por ruta junto a las originales.
+
+Uso:
+    python -m benchmarks.replay trafico.jsonl
+    python -m benchmarks.replay trafico-*.jsonl --velocidad 4 --db benchmarks/resultados/usuarios_1m.db
+    python -m benchmarks.replay trafico.jsonl --velocidad 0 --max-en-vuelo 64
+    python -m benchmarks.replay trafico.jsonl --url http://127.0.0.1:8000
+
+Las escrituras grabadas (POST/PUT/DELETE) se aplican sobre la BD de destino;
+conviene usar una copia. Los cuerpos no se graban: se generan cuerpos
+sintéticos válidos para las rutas conocidas.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.capture import VALOR_OCULTO, leer_trazas
+from benchmarks.api_bench import base_de_datos_aislada
+from benchmarks.common import (
+    cargar_json,
+    comparar_con_baseline,
+    entorno,
+    guardar_json,
+    imprimir_tabla,
+    percentil,
+    resumen_latencias,
+)
+
+_PARAMETRO_RUTA = re.compile(r"\{(\w+)(?::\w+)?\}")
+
+
+def _crear_usuario(r: random.Random, secuencia: int) -> dict:
+    return {
+        "nombre": "Usuario Replay",
+        "email": f"replay-{os.getpid()}-{time.time_ns()}-{secuencia}@ejemplo.com",
+        "edad": r.randint(18, 90),
+    }
+
+
+def _actualizar_usuario(r: random.Random, secuencia: int) -> dict:
+    return {"edad": r.randint(18, 90)}
+
+
+# Cuerpos sintéticos por (método, ruta plantilla)
+CUERPOS_SINTETICOS: Dict[Tuple[str, str], Callable[[random.Random, int], dict]] = {
+    ("POST", "/api/usuarios/"): _crear_usuario,
+    ("PUT", "/api/usuarios/{usuario_id}"): _actualizar_usuario,
+}
+
+
+def construir_peticion(registro: dict, r: random.Random, secuencia: int) -> Optional[dict]:
+    """Argumentos para httpx a partir de una traza (None si no es reproducible)"""
+    path_params = registro.get("p", {})
+    faltantes = []
+
+    def sustituir(coincidencia):
+        valor = path_params.get(coincidencia.group(1))
+        if valor is None or valor == VALOR_OCULTO:
+            faltantes.append(coincidencia.group(1))
+            return ""
+        return valor
+
+    url = _PARAMETRO_RUTA.sub(sustituir, registro["r"])
+    if faltantes or not url.startswith("/"):
+        return None
+
+    peticion = {
+        "method": registro["m"],
+        "url": url,
+        "params": {k: v for k, v in registro.get("q", {}).items() if v != VALOR_OCULTO},
+    }
+    generador = CUERPOS_SINTETICOS.get((registro["m"], registro["r"]))
+    if generador is not None:
+        peticion["json"] = generador(r, secuencia)
+    elif registro.get("b"):
+        peticion["json"] = {}
+    return peticion
+
+
+class ResultadosReplay:
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = {}
+        self.originales: Dict[str, List[float]] = {}
+        self.status_distinto: Dict[str, int] = {}
+        self.errores: Dict[str, int] = {}
+        self.retrasos: List[float] = []
+        self.omitidas = 0
+
+    def registrar(self, clave: str, duracion: float, original_ms: float, status: int, status_original: int):
+        self.latencias.setdefault(clave, []).append(duracion)
+        self.originales.setdefault(clave, []).append(original_ms)
+        if status != status_original:
+            self.status_distinto[clave] = self.status_distinto.get(clave, 0) + 1
+        if status == 0 or status >= 500:
+            self.errores[clave] = self.errores.get(clave, 0) + 1
+
+
+async def _enviar(client, registro: dict, peticion: dict, resultados: ResultadosReplay, semaforo):
+    inicio = time.perf_counter()
+    try:
+        status = (await client.request(**peticion)).status_code
+    except httpx.HTTPError:
+        status = 0
+    finally:
+        semaforo.release()
+    resultados.registrar(
+        f"{registro['m']} {registro['r']}",
+        time.perf_counter() - inicio,
+        registro.get("d", 0.0),
+        status,
+        registro.get("s", 0),
+    )
+
+
+async def reproducir(
+    client: httpx.AsyncClient,
+    trazas: List[dict],
+    velocidad: float = 1.0,
+    max_en_vuelo: int = 256,
+    semilla: int = 42,
+) -> dict:
+    """
+    Reproducir las trazas y devolver el resumen por ruta
+
+    Con `velocidad` > 0 cada petición sale en su instante original dividido
+    por la velocidad (carga de lazo abierto); con 0 salen lo antes posible.
+    `max_en_vuelo` limita las peticiones simultáneas: si se alcanza, las
+    siguientes se retrasan y el retraso queda reportado.
+    """
+    resultados = ResultadosReplay()
+    r = random.Random(semilla)
+    semaforo = asyncio.Semaphore(max_en_vuelo)
+    tareas = set()
+    origen = trazas[0]["ts"] if trazas else 0.0
+    inicio = time.perf_counter()
+
+    for secuencia, registro in enumerate(trazas):
+        peticion = construir_peticion(registro, r, secuencia)
+        if peticion is None:
+            resultados.omitidas += 1
+            continue
+        objetivo = inicio
+        if velocidad > 0:
+            objetivo = inicio + (registro["ts"] - origen) / velocidad
+            espera = objetivo - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+        await semaforo.acquire()
+        if velocidad > 0:
+            resultados.retrasos.append(max(0.0, time.perf_counter() - objetivo))
+        tarea = asyncio.create_task(_enviar(client, registro, peticion, resultados, semaforo))
+        tareas.add(tarea)
+        tarea.add_done_callback(tareas.discard)
+
+    if tareas:
+        await asyncio.gather(*tareas)
+    transcurrido = time.perf_counter() - inicio
+
+    rutas = {}
+    for clave in sorted(resultados.latencias):
+        resumen = resumen_latencias(resultados.latencias[clave], transcurrido)
+        originales = sorted(resultados.originales[clave])
+        resumen["original_p50_ms"] = round(percentil(originales, 50), 3)
+        resumen["original_p95_ms"] = round(percentil(originales, 95), 3)
+        resumen["errores"] = resultados.errores.get(clave, 0)
+        resumen["status_distinto"] = resultados.status_distinto.get(clave, 0)
+        rutas[clave] = resumen
+
+    retrasos = sorted(resultados.retrasos)
+    todas = [l for serie in resultados.latencias.values() for l in serie]
+    return {
+        "duracion_s": round(transcurrido, 3),
+        "duracion_original_s": round(trazas[-1]["ts"] - origen, 3) if trazas else 0.0,
+        "velocidad": velocidad,
+        "omitidas": resultados.omitidas,
+        "retraso_programacion_ms": {
+            "p95": round(percentil(retrasos, 95) * 1000, 3),
+            "max": round(retrasos[-1] * 1000, 3) if retrasos else 0.0,
+        },
+        "total": resumen_latencias(todas, transcurrido),
+        "operaciones": rutas,
+    }
+
+
+async def reproducir_en_proceso(ruta_db: str, trazas: List[dict], **opciones) -> dict:
+    with base_de_datos_aislada(ruta_db) as app:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://replay") as client:
+            return await reproducir(client, trazas, **opciones)
+
+
+async def reproducir_contra_servidor(url: str, trazas: List[dict], max_en_vuelo: int, **opciones) -> dict:
+    limites = httpx.Limits(max_connections=max_en_vuelo, max_keepalive_connections=max_en_vuelo)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as client:
+        return await reproducir(client, trazas, max_en_vuelo=max_en_vuelo, **opciones)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reproducir tráfico capturado contra la API")
+    parser.add_argument("archivos", nargs="+", help="Archivos de trazas (uno por worker o combinados)")
+    parser.add_argument("--url", help="Servidor real (si se omite, se usa la app ASGI en proceso)")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="1 = original, 2 = el doble, 0 = sin pausas")
+    parser.add_argument("--max-en-vuelo", type=int, default=256, help="Peticiones simultáneas como máximo")
+    parser.add_argument("--limite", type=int, help="Reproducir solo las primeras N trazas")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--db", default="benchmarks/resultados/replay.db", help="BD del modo en proceso")
+    parser.add_argument("--salida", default="benchmarks/resultados/replay.json")
+    parser.add_argument("--baseline", help="JSON de una reproducción previa para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    trazas = leer_trazas(args.archivos)
+    if args.limite:
+        trazas = trazas[:args.limite]
+    if not trazas:
+        print("No hay trazas para reproducir")
+        return 1
+
+    opciones = dict(velocidad=args.velocidad, max_en_vuelo=args.max_en_vuelo, semilla=args.semilla)
+    print(f"▶️  Reproduciendo {len(trazas):,} peticiones (velocidad {args.velocidad})")
+    if args.url:
+        resultados = asyncio.run(reproducir_contra_servidor(args.url, trazas, **opciones))
+    else:
+        os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+        resultados = asyncio.run(reproducir_en_proceso(args.db, trazas, **opciones))
+
+    resultados["modo"] = args.url or "asgi-en-proceso"
+    resultados["archivos"] = args.archivos
+    resultados["entorno"] = entorno()
+    guardar_json(resultados, args.salida)
+
+    imprimir_tabla({**resultados["operaciones"], "TOTAL": resultados["total"]})
+    retraso = resultados["retraso_programacion_ms"]
+    print(
+        f"\nDuración {resultados['duracion_s']} s (original {resultados['duracion_original_s']} s), "
+        f"retraso de programación p95 {retraso['p95']} ms, omitidas {resultados['omitidas']}"
+    )
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.baseline:
+        baseline = cargar_json(args.baseline)
+        if baseline is None:
+            print(f"Baseline {args.baseline} no existe; se omite la comparación")
+            return 0
+        regresiones = comparar_con_baseline(
+            resultados["operaciones"], baseline.get("operaciones", {}), args.tolerancia
+        )
+        if regresiones:
+            print("\n⚠️  Regresiones respecto al baseline:")
+            for regresion in regresiones:
+                print(f"   - {regresion}")
+            return 1
+        print("\n✅ Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark de motores de usuarios: SQLAlchemy (SQLite) frente a memoria
+
+Carga los mismos usuarios sintéticos en ambos motores y mide, llamando a
+`UsuarioService` directamente (sin HTTP), la latencia de cada operación de
+la API: obtener por id y por email, listar (con y sin filtro), estadísticas,
+crear y actualizar.
+
+Uso:
+    python -m benchmarks.repository_bench
+    python -m benchmarks.repository_bench --filas 100000 --operaciones 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.memory_store import AlmacenMemoria, SesionMemoria
+from app.database import crear_motor
+from app.schemas.user import UsuarioActualizar, UsuarioCrear
+from app.services.user_service import UsuarioService
+from benchmarks.common import entorno, guardar_json, percentil
+from scripts.seed_usuarios import cargar
+
+
+def operaciones(filas: int, semilla: int = 1) -> Dict[str, Callable]:
+    """Operación -> función(db, i); las mismas para los dos motores"""
+    azar = random.Random(semilla)
+    ids = [azar.randint(1, filas) for _ in range(10_000)]
+
+    def obtener(db, i):
+        UsuarioService.obtener_usuario_por_id(db, ids[i % len(ids)])
+
+    def por_email(db, i):
+        usuario = UsuarioService.obtener_usuario_por_id(db, ids[i % len(ids)])
+        UsuarioService.obtener_usuario_por_email(db, usuario.email)
+
+    def crear(db, i):
+        UsuarioService.crear_usuario(db, UsuarioCrear(nombre=f"Bench {i}", email=f"bench-{i}-{semilla}@bench.com"))
+
+    def actualizar(db, i):
+        UsuarioService.actualizar_usuario(db, ids[i % len(ids)], UsuarioActualizar(edad=18 + i % 60))
+
+    return {
+        "obtener": obtener,
+        "por_email": por_email,
+        "listar_100": lambda db, i: UsuarioService.obtener_usuarios(db, skip=(i * 100) % filas, limit=100),
+        "listar_activos": lambda db, i: UsuarioService.obtener_usuarios(db, limit=100, activo=True),
+        "estadisticas": lambda db, i: UsuarioService.obtener_estadisticas(db),
+        "crear": crear,
+        "actualizar": actualizar,
+    }
+
+
+def medir(abrir: Callable, cerrar: Callable, funcion: Callable, repeticiones: int) -> dict:
+    tiempos: List[float] = []
+    for i in range(repeticiones):
+        db = abrir()
+        inicio = time.perf_counter()
+        funcion(db, i)
+        tiempos.append(time.perf_counter() - inicio)
+        cerrar(db)
+    tiempos.sort()
+    return {
+        "p50_us": round(percentil(tiempos, 50) * 1e6, 1),
+        "p95_us": round(percentil(tiempos, 95) * 1e6, 1),
+        "ops_por_segundo": round(len(tiempos) / sum(tiempos), 1),
+    }
+
+
+def ejecutar(filas: int = 10_000, repeticiones: int = 500, directorio: str = None) -> dict:
+    """Mismos datos y operaciones en ambos motores; retorna resultados por motor"""
+    with tempfile.TemporaryDirectory(dir=directorio) as temporal:
+        ruta = os.path.join(temporal, "bench.db")
+        cargar(ruta, filas, semilla=42)
+
+        motor = crear_motor(f"sqlite:///{ruta}")
+        fabrica = sessionmaker(autocommit=False, autoflush=False, bind=motor)
+        resultados = {"sqlalchemy": {}, "memoria": {}}
+        try:
+            for nombre, funcion in operaciones(filas, semilla=1).items():
+                resultados["sqlalchemy"][nombre] = medir(fabrica, lambda db: db.close(), funcion, repeticiones)
+        finally:
+            motor.dispose()
+
+        # El motor en memoria arranca desde una instantánea con los datos originales
+        cargar(os.path.join(temporal, "memoria.db"), filas, semilla=42)
+        almacen = AlmacenMemoria(os.path.join(temporal, "memoria.db"))
+        inicio = time.perf_counter()
+        carga = almacen.cargar()
+        resultados["carga_memoria_s"] = round(time.perf_counter() - inicio, 3)
+        resultados["usuarios_en_memoria"] = carga["usuarios"]
+        try:
+            for nombre, funcion in operaciones(filas, semilla=2).items():
+                resultados["memoria"][nombre] = medir(
+                    lambda: SesionMemoria(almacen), lambda db: None, funcion, repeticiones
+                )
+            inicio = time.perf_counter()
+            almacen.instantanea()
+            resultados["instantanea_s"] = round(time.perf_counter() - inicio, 3)
+        finally:
+            almacen.cerrar()
+    return resultados
+
+
+def imprimir(resultados: dict):
+    print(f"{'operación':<16}{'sqlalchemy p50':>16}{'memoria p50':>14}{'aceleración':>13}")
+    for nombre, sql in resultados["sqlalchemy"].items():
+        memoria = resultados["memoria"][nombre]
+        aceleracion = sql["p50_us"] / memoria["p50_us"] if memoria["p50_us"] else 0.0
+        print(f"{nombre:<16}{sql['p50_us']:>14.1f}µs{memoria['p50_us']:>12.1f}µs{aceleracion:>12.1f}x")
+    print(f"\nCarga en memoria: {resultados['carga_memoria_s']} s ({resultados['usuarios_en_memoria']:,} usuarios); "
+          f"instantánea: {resultados['instantanea_s']} s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Comparar el motor SQLAlchemy con el motor en memoria")
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--operaciones", type=int, default=500, help="Repeticiones de cada operación")
+    parser.add_argument("--salida", default="benchmarks/resultados/repositorios.json")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.filas, args.operaciones)
+    imprimir(resultados)
+    guardar_json({"filas": args.filas, "resultados": resultados, "entorno": entorno()}, args.salida)
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
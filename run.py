@@ -1,19 +1,112 @@
 """
 Punto de entrada para ejecutar la aplicación
+
+Desarrollo (por defecto): un proceso con recarga automática.
+Producción (`--produccion` o DEBUG=False): varios workers con uvloop y
+httptools, apagado ordenado y estado compartido entre workers.
 """
 
+import argparse
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
 import uvicorn
-from app.main import app
 
-if __name__ == "__main__":
+from app.config import settings
+
+
+def _disponible(modulo: str) -> bool:
+    return importlib.util.find_spec(modulo) is not None
+
+
+def _preparar_estado_compartido(workers: int):
+    """
+    Directorio temporal para lo que los workers deben compartir
+
+    Se exporta por variables de entorno antes de lanzar los workers, que las
+    leen al importar la configuración. Si ya están definidas, se respetan.
+    """
+    if workers < 2:
+        return None
+    directorio = tempfile.mkdtemp(prefix="fastapi-crud-")
+    os.environ.setdefault("DATA_VERSION_FILE", os.path.join(directorio, "data_version"))
+    os.environ.setdefault("EVENTS_FILE", os.path.join(directorio, "eventos"))
+    if settings.metrics_enabled:
+        os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(directorio, "metricas"))
+    return directorio
+
+
+def desarrollo(host: str, port: int):
     print("🚀 Iniciando FastAPI + React Professional Backend...")
-    print("📖 Documentación API: http://127.0.0.1:8000/api/docs")
-    print("🌐 React App: http://127.0.0.1:8000")
+    print(f"📖 Documentación API: http://{host}:{port}/api/docs")
+    print(f"🌐 React App: http://{host}:{port}")
     print("📋 Arquitectura: Modular y Profesional")
-    
+
     uvicorn.run(
         "app.main:app", 
-        host="127.0.0.1", 
-        port=8000, 
+        host=host, 
+        port=port, 
         reload=True
     )
+
+
+def produccion(host: str, port: int, workers: int):
+    workers = workers or os.cpu_count() or 1
+    if settings.user_repository == "memoria" and workers > 1:
+        print("⚠️  USER_REPOSITORY=memoria guarda los datos en el proceso: se usa un solo worker")
+        workers = 1
+    # Los workers sirven el manifiesto construido al arrancar, sin revisar el disco.
+    # Los workers lanzados leen la variable; con uno solo, uvicorn sirve la app
+    # en este proceso, que ya leyó la configuración
+    if "STATIC_RELOAD" not in os.environ:
+        from app.core.static_assets import manifiesto_estaticos
+
+        os.environ["STATIC_RELOAD"] = "false"
+        settings.static_reload = False
+        manifiesto_estaticos.recargar = False
+    loop = "uvloop" if _disponible("uvloop") else "asyncio"
+    http = "httptools" if _disponible("httptools") else "h11"
+    directorio = _preparar_estado_compartido(workers)
+
+    print(f"🚀 Producción: {workers} workers en http://{host}:{port} (loop {loop}, http {http})")
+    if loop == "asyncio" or http == "h11":
+        print("⚠️  Instala uvicorn[standard] para usar uvloop y httptools")
+
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            loop=loop,
+            http=http,
+            # SIGTERM: deja de aceptar conexiones y espera las peticiones en curso
+            timeout_graceful_shutdown=settings.shutdown_timeout,
+            proxy_headers=True,
+            access_log=settings.debug,
+        )
+    finally:
+        if directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor FastAPI + React")
+    parser.add_argument("--produccion", action="store_true", help="Varios workers, sin recarga")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers, help="0 = uno por CPU")
+    args = parser.parse_args(argv)
+
+    if args.produccion or not settings.debug:
+        produccion(args.host, args.port, args.workers)
+    else:
+        desarrollo(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Reconstruir el resumen de registros (`resumen_registros`) desde la tabla usuarios
+
+Las altas y bajas por la API lo mantienen solas; esto hace falta tras
+cargas que escriben `usuarios` directamente (restaurar una copia, importar
+filas) o para corregir un resumen desfasado. Se puede ejecutar con el
+servidor en marcha: cada BD se reescribe en una sola transacción.
+
+Uso:
+    python -m scripts.backfill_registros                      # BD de DATABASE_URL o fragmentos
+    python -m scripts.backfill_registros --db usuarios.db
+    SIGNUP_ROLLUP_ZONES=America/Santiago python -m scripts.backfill_registros
+"""
+
+import argparse
+import sys
+import time
+
+from app.database import asegurar_esquema, rutas_sqlite
+
+
+def reconstruir(ruta: str) -> dict:
+    """Crear la tabla si falta y recalcular el resumen de una BD; retorna un resumen"""
+    from sqlalchemy import create_engine
+
+    from app.core.signups import reconstruir_resumen
+    from app.models import UsuarioORM  # noqa: F401 - registra las tablas
+
+    engine = create_engine(f"sqlite:///{ruta}")
+    try:
+        asegurar_esquema(engine)
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            resultado = reconstruir_resumen(conn)
+    finally:
+        engine.dispose()
+    return {**resultado, "segundos": round(time.perf_counter() - inicio, 3)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconstruir el resumen de registros por hora y día")
+    parser.add_argument("--db", nargs="+", help="Archivos SQLite (por defecto los de la configuración)")
+    args = parser.parse_args(argv)
+
+    for ruta in args.db or rutas_sqlite():
+        resultado = reconstruir(ruta)
+        print(
+            f"✅ {ruta}: {resultado['usuarios']:,} usuarios -> {resultado['filas']:,} filas "
+            f"({', '.join(resultado['zonas'])}) en {resultado['segundos']:.2f} s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
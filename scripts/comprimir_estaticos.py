@@ -0,0 +1,53 @@
+"""
+Precomprimir static/ en el build (archivos .gz y .br junto a cada original)
+
+Al arrancar, el manifiesto de estáticos usa estas variantes en lugar de
+comprimir en cada worker.
+
+Uso:
+    python -m scripts.comprimir_estaticos
+    python -m scripts.comprimir_estaticos --directorio dist
+"""
+
+import argparse
+import mimetypes
+import os
+import sys
+
+from app.core.static_assets import COMPRESORES, ManifiestoEstaticos, comprimible
+
+
+def comprimir(directorio: str) -> list:
+    """Escribir las variantes que ahorran bytes; retorna (archivo, codificación, bytes)"""
+    escritos = []
+    for relativa in ManifiestoEstaticos(directorio).archivos():
+        ruta = os.path.join(directorio, relativa)
+        media_type = mimetypes.guess_type(relativa)[0] or "application/octet-stream"
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        if not comprimible(media_type, len(contenido)):
+            continue
+        for codificacion, extension, compresor in COMPRESORES:
+            if compresor is None:
+                continue
+            comprimido = compresor(contenido)
+            if len(comprimido) >= len(contenido):
+                continue
+            with open(ruta + extension, "wb") as f:
+                f.write(comprimido)
+            escritos.append((relativa, codificacion, len(contenido), len(comprimido)))
+    return escritos
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precomprimir archivos estáticos")
+    parser.add_argument("--directorio", default="static")
+    args = parser.parse_args(argv)
+
+    for relativa, codificacion, original, comprimido in comprimir(args.directorio):
+        print(f"   {relativa} [{codificacion}] {original:,} → {comprimido:,} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
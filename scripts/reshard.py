@@ -0,0 +1,189 @@
+"""
+Redistribuir los usuarios en otro número de fragmentos (con el servidor detenido)
+
+Lee las filas de una BD única o de un conjunto de fragmentos y las escribe
+en un conjunto nuevo, conservando los IDs. El índice `emails_usuarios`, la
+secuencia de IDs y el resumen de registros se reconstruyen desde las filas, así que esto también
+repara reservas de email huérfanas que haya dejado una escritura a medias.
+
+Uso:
+    # De la BD única a 4 fragmentos
+    python -m scripts.reshard --origen usuarios.db --destino "./usuarios_{n}.db" --fragmentos 4
+    # De 4 a 8 fragmentos (luego SHARD_COUNT=8 y SHARD_PATH_TEMPLATE=./nuevos_{n}.db)
+    python -m scripts.reshard --origen usuarios_0.db usuarios_1.db usuarios_2.db usuarios_3.db \\
+        --destino "./nuevos_{n}.db" --fragmentos 8
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import List
+
+from app.core.sharding import (
+    SECUENCIA_USUARIOS,
+    fragmento_de_email,
+    fragmento_de_id,
+    rutas_fragmentos,
+)
+
+COLUMNAS = ("id", "nombre", "email", "edad", "activo", "created_at", "updated_at", "version")
+
+
+def _crear_destinos(rutas: List[str]):
+    from sqlalchemy import create_engine
+
+    from app.core.sharding import metadata_fragmentos
+    from app.database import asegurar_esquema
+    from app.models import UsuarioORM  # noqa: F401 - registra la tabla
+
+    for ruta in rutas:
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        engine = create_engine(f"sqlite:///{ruta}")
+        asegurar_esquema(engine)
+        metadata_fragmentos.create_all(bind=engine)
+        engine.dispose()
+
+
+def _reconstruir_resumenes(rutas: List[str]):
+    """Cada fragmento resume solo sus usuarios (ver scripts/backfill_registros.py)"""
+    from sqlalchemy import create_engine
+
+    from app.core.signups import reconstruir_resumen
+
+    for ruta in rutas:
+        engine = create_engine(f"sqlite:///{ruta}")
+        with engine.begin() as conn:
+            reconstruir_resumen(conn)
+        engine.dispose()
+
+
+def _secuencia_origen(conn: sqlite3.Connection) -> int:
+    try:
+        fila = conn.execute(
+            "SELECT siguiente FROM secuencias WHERE nombre = ?", (SECUENCIA_USUARIOS,)
+        ).fetchone()
+    except sqlite3.OperationalError:  # BD única: no tiene la tabla
+        return 0
+    return fila[0] if fila else 0
+
+
+def redistribuir(
+    origenes: List[str],
+    destinos: List[str],
+    lote: int = 50_000,
+    reemplazar: bool = False,
+    progreso=None,
+) -> dict:
+    """
+    Copiar todas las filas de `origenes` a `destinos`; retorna un resumen
+
+    Cada fila va al fragmento de su id y su email al fragmento de su email.
+    Todo se escribe en una transacción por destino, que solo se confirma si
+    el total copiado coincide con el de origen.
+    """
+    for ruta in origenes:
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(ruta)
+    for ruta in destinos:
+        if os.path.abspath(ruta) in map(os.path.abspath, origenes):
+            raise ValueError(f"El destino no puede ser un origen: {ruta}")
+        if os.path.exists(ruta):
+            if not reemplazar:
+                raise FileExistsError(ruta)
+            os.remove(ruta)
+
+    _crear_destinos(destinos)
+    inicio = time.perf_counter()
+    total = len(destinos)
+    salidas = [sqlite3.connect(ruta, isolation_level=None) for ruta in destinos]
+    sql_usuario = f"INSERT INTO usuarios ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' * len(COLUMNAS))})"
+    sql_email = "INSERT INTO emails_usuarios (email, usuario_id) VALUES (?, ?)"
+    copiadas = 0
+    leidas = 0
+    max_id = 0
+    siguiente = 0
+    try:
+        for conn in salidas:
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("BEGIN")
+
+        for ruta in origenes:
+            entrada = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+            try:
+                siguiente = max(siguiente, _secuencia_origen(entrada))
+                leidas += entrada.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+                cursor = entrada.execute(f"SELECT {', '.join(COLUMNAS)} FROM usuarios ORDER BY id")
+                while True:
+                    filas = cursor.fetchmany(lote)
+                    if not filas:
+                        break
+                    usuarios = [[] for _ in range(total)]
+                    emails = [[] for _ in range(total)]
+                    for fila in filas:
+                        usuarios[fragmento_de_id(fila[0], total)].append(fila)
+                        emails[fragmento_de_email(fila[2], total)].append((fila[2], fila[0]))
+                    for conn, filas_destino, emails_destino in zip(salidas, usuarios, emails):
+                        conn.executemany(sql_usuario, filas_destino)
+                        conn.executemany(sql_email, emails_destino)
+                    copiadas += len(filas)
+                    max_id = max(max_id, filas[-1][0])
+                    if progreso:
+                        progreso(copiadas)
+            finally:
+                entrada.close()
+
+        if copiadas != leidas:
+            raise RuntimeError(f"Se copiaron {copiadas} filas de {leidas}")
+        salidas[0].execute(
+            "INSERT INTO secuencias (nombre, siguiente) VALUES (?, ?)",
+            (SECUENCIA_USUARIOS, max(siguiente, max_id + 1)),
+        )
+        por_fragmento = [conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] for conn in salidas]
+        for conn in salidas:
+            conn.execute("COMMIT")
+        for conn in salidas:
+            conn.execute("ANALYZE")
+        _reconstruir_resumenes(destinos)
+    except BaseException:
+        for conn in salidas:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        raise
+    finally:
+        for conn in salidas:
+            conn.close()
+
+    return {
+        "filas": copiadas,
+        "por_fragmento": por_fragmento,
+        "siguiente_id": max(siguiente, max_id + 1),
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Redistribuir usuarios en otro número de fragmentos")
+    parser.add_argument("--origen", nargs="+", required=True, help="BD única o archivos de los fragmentos actuales")
+    parser.add_argument("--destino", required=True, help="Plantilla de los nuevos archivos, con {n}")
+    parser.add_argument("--fragmentos", type=int, required=True)
+    parser.add_argument("--lote", type=int, default=50_000, help="Filas leídas por bloque")
+    parser.add_argument("--reemplazar", action="store_true", help="Borrar los destinos si ya existen")
+    args = parser.parse_args(argv)
+
+    def progreso(copiadas):
+        print(f"\r   {copiadas:,} filas", end="", flush=True)
+
+    destinos = rutas_fragmentos(args.destino, args.fragmentos)
+    print(f"🔀 {len(args.origen)} origen(es) -> {len(destinos)} fragmentos")
+    resumen = redistribuir(args.origen, destinos, args.lote, args.reemplazar, progreso)
+    print(f"\n✅ {resumen['filas']:,} filas en {resumen['segundos']:.1f} s; por fragmento: {resumen['por_fragmento']}")
+    print(f"   Configurar SHARD_COUNT={args.fragmentos} SHARD_PATH_TEMPLATE={args.destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Generador de datos sintéticos para benchmarks a gran escala
+
+Crea usuarios deterministas (misma semilla = mismas filas) con
+distribuciones realistas de edad, estado activo y fecha de registro, y los
+carga con executemany en una sola transacción sobre el esquema de
+UsuarioORM.
+
+Uso:
+    python -m scripts.seed_usuarios --filas 10000 --db benchmarks/resultados/usuarios_10k.db
+    python -m scripts.seed_usuarios --filas 1000000 --db benchmarks/resultados/usuarios_1m.db
+    python -m scripts.seed_usuarios --filas 10000000 --db benchmarks/resultados/usuarios_10m.db --lote 100000
+"""
+
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+NOMBRES = (
+    "Ana", "Carlos", "María", "José", "Lucía", "Juan", "Camila", "Pedro", "Valentina",
+    "Diego", "Sofía", "Javier", "Isabel", "Andrés", "Daniela", "Felipe", "Carmen",
+    "Matías", "Paula", "Tomás", "Fernanda", "Ricardo", "Elena", "Gabriel", "Rosa",
+    "Sebastián", "Martina", "Pablo", "Laura", "Miguel", "Antonia", "Luis",
+)
+APELLIDOS = (
+    "González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva",
+    "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández",
+    "Torres", "Araya", "Flores", "Espinoza", "Valenzuela", "Castillo", "Tapia",
+    "Reyes", "Gutiérrez", "Castro", "Pizarro", "Álvarez", "Vásquez", "Sánchez",
+)
+DOMINIOS = ("gmail.com", "hotmail.com", "outlook.com", "yahoo.com", "empresa.cl", "correo.com")
+
+COLUMNAS = ("nombre", "email", "edad", "activo", "created_at", "updated_at", "version")
+
+_SIN_ACENTOS = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
+
+
+def _formato_fecha(fecha: datetime) -> str:
+    # Mismo formato que usa SQLAlchemy para DateTime en SQLite
+    return fecha.isoformat(" ", "microseconds")
+
+
+def generar_usuarios(
+    filas: int,
+    semilla: int = 42,
+    anos: float = 5.0,
+    hasta: datetime = None,
+    desplazamiento: int = 0,
+) -> Iterator[Tuple]:
+    """
+    Generar filas en el orden de COLUMNAS
+
+    - edad: normal(38, 13) recortada a 18-90, con 6% sin edad
+    - created_at: `anos` hacia atrás con crecimiento (más registros recientes)
+      y ordenado de forma ascendente, como en una tabla real
+    - activo: 90% en cuentas nuevas, bajando hasta ~60% en las más antiguas
+    - email: único por construcción (incluye el índice de la fila más
+      `desplazamiento`, para poder añadir filas a una BD existente)
+    """
+    r = random.Random(semilla)
+    hasta = hasta or datetime(2026, 1, 1)
+    rango = timedelta(days=365.25 * anos).total_seconds()
+    inicio = hasta - timedelta(seconds=rango)
+
+    for i in range(filas):
+        nombre = r.choice(NOMBRES)
+        apellido = r.choice(APELLIDOS)
+        usuario = f"{nombre}.{apellido}".lower().translate(_SIN_ACENTOS)
+        email = f"{usuario}.{i + desplazamiento}@{r.choice(DOMINIOS)}"
+
+        edad = None
+        if r.random() >= 0.06:
+            edad = int(min(90, max(18, r.gauss(38, 13))))
+
+        # Posición en el tiempo con crecimiento: sqrt concentra las altas al final
+        progreso = math.sqrt((i + r.random()) / filas)
+        created_at = inicio + timedelta(seconds=progreso * rango)
+        antiguedad = 1 - progreso
+
+        activo = r.random() < 0.9 - 0.3 * antiguedad
+        updated_at = created_at
+        version = 1
+        if r.random() < 0.25:
+            version = r.randint(2, 6)
+            updated_at = created_at + timedelta(seconds=r.random() * (hasta - created_at).total_seconds())
+
+        yield (
+            f"{nombre} {apellido}",
+            email,
+            edad,
+            int(activo),
+            _formato_fecha(created_at),
+            _formato_fecha(updated_at),
+            version,
+        )
+
+
+def _indices_secundarios(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'usuarios' AND sql IS NOT NULL"
+    ).fetchall()
+
+
+def cargar(
+    ruta_db: str,
+    filas: int,
+    semilla: int = 42,
+    anos: float = 5.0,
+    lote: int = 50_000,
+    reemplazar: bool = False,
+    diferir_indices: bool = True,
+    progreso=None,
+) -> float:
+    """
+    Crear el esquema y cargar `filas` usuarios; retorna los segundos empleados
+
+    La carga usa una única transacción, `synchronous=OFF` y journal en
+    memoria; con `diferir_indices` los índices se eliminan y se recrean al
+    final (mucho más rápido que mantenerlos fila a fila).
+    """
+    from sqlalchemy import create_engine
+
+    from app.core.signups import reconstruir_resumen
+    from app.database import crear_esquema
+    from app.models import UsuarioORM  # noqa: F401 - registra la tabla
+
+    if reemplazar and os.path.exists(ruta_db):
+        os.remove(ruta_db)
+    directorio = os.path.dirname(ruta_db)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+
+    engine = create_engine(f"sqlite:///{ruta_db}")
+    crear_esquema(engine)
+    engine.dispose()
+
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ruta_db, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+        existentes = conn.execute("SELECT COALESCE(MAX(id), 0) FROM usuarios").fetchone()[0]
+        indices = _indices_secundarios(conn) if diferir_indices else []
+        conn.execute("BEGIN")
+        for nombre, _ in indices:
+            conn.execute(f'DROP INDEX "{nombre}"')
+
+        sql = f"INSERT INTO usuarios ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' * len(COLUMNAS))})"
+        filas_generadas = generar_usuarios(filas, semilla, anos, desplazamiento=existentes)
+        cargadas = 0
+        while cargadas < filas:
+            bloque = [fila for _, fila in zip(range(lote), filas_generadas)]
+            conn.executemany(sql, bloque)
+            cargadas += len(bloque)
+            if progreso:
+                progreso(cargadas, filas)
+
+        for _, ddl in indices:
+            conn.execute(ddl)
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    segundos = time.perf_counter() - inicio
+
+    # Las filas se insertaron sin pasar por el ORM: el resumen de registros se recalcula
+    engine = create_engine(f"sqlite:///{ruta_db}")
+    with engine.begin() as conexion:
+        reconstruir_resumen(conexion)
+    engine.dispose()
+    return segundos
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generar usuarios sintéticos para benchmarks")
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--db", default="benchmarks/resultados/usuarios_seed.db")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--anos", type=float, default=5.0, help="Años de historia de registros")
+    parser.add_argument("--lote", type=int, default=50_000, help="Filas por executemany")
+    parser.add_argument("--reemplazar", action="store_true", help="Borrar la BD si ya existe")
+    parser.add_argument("--mantener-indices", action="store_true", help="No diferir la creación de índices")
+    args = parser.parse_args(argv)
+
+    def progreso(cargadas, total):
+        print(f"\r   {cargadas:,}/{total:,} filas", end="", flush=True)
+
+    print(f"🌱 Generando {args.filas:,} usuarios en {args.db} (semilla {args.semilla})")
+    segundos = cargar(
+        args.db,
+        args.filas,
+        semilla=args.semilla,
+        anos=args.anos,
+        lote=args.lote,
+        reemplazar=args.reemplazar,
+        diferir_indices=not args.mantener_indices,
+        progreso=progreso,
+    )
+    print(f"\n✅ {args.filas:,} filas en {segundos:.1f} s ({args.filas / segundos:,.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,18 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.config import settings
 from app.main import app
-from app.database import get_db, Base
+from app.core.queries import monitor_consultas
+from app.database import get_db, crear_esquema
 
 # BD en memoria para tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+monitor_consultas.instrumentar(engine)
 
-Base.metadata.create_all(bind=engine)
+crear_esquema(engine)
 
 def override_get_db():
     try:
@@ -29,3 +32,10 @@ app.dependency_overrides[get_db] = override_get_db
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    """Configura ADMIN_TOKEN y retorna el encabezado para los endpoints de admin"""
+    monkeypatch.setattr(settings, "admin_token", "secreto")
+    return {"X-Admin-Token": "secreto"}
@@ -0,0 +1,73 @@
+"""
+Tests del control de admisión
+"""
+
+import asyncio
+
+from app.middleware.admission import (
+    AdmissionControlMiddleware,
+    ControlAdmision,
+    Limitador,
+)
+
+
+def _control(concurrencia=1, cola=1, timeout=0.5):
+    return ControlAdmision(
+        Limitador("lecturas", concurrencia, cola, timeout),
+        Limitador("escrituras", concurrencia, cola, timeout),
+        retry_after=3,
+    )
+
+
+async def _llamar(middleware, path, method="GET"):
+    enviados = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    scope = {"type": "http", "path": path, "method": method, "headers": []}
+    await middleware(scope, receive, send)
+    return enviados[0]
+
+
+def test_exceso_de_carga_responde_503_y_health_pasa():
+    async def escenario():
+        liberar = asyncio.Event()
+
+        async def app(scope, receive, send):
+            if scope["path"] != "/api/health":
+                await liberar.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        control = _control()
+        middleware = AdmissionControlMiddleware(app, control)
+
+        activa = asyncio.create_task(_llamar(middleware, "/api/usuarios/"))
+        en_cola = asyncio.create_task(_llamar(middleware, "/api/usuarios/"))
+        await asyncio.sleep(0.01)
+
+        rechazada = await _llamar(middleware, "/api/usuarios/")
+        health = await _llamar(middleware, "/api/health")
+        assert control.limitadores["lecturas"].en_cola == 1
+
+        liberar.set()
+        return rechazada, health, await activa, await en_cola, control
+
+    rechazada, health, activa, en_cola, control = asyncio.run(escenario())
+    assert rechazada["status"] == 503
+    assert (b"retry-after", b"3") in rechazada["headers"]
+    assert health["status"] == 200
+    assert activa["status"] == 200 and en_cola["status"] == 200
+    estado = control.estado()["lecturas"]
+    assert estado["rechazadas"] == 1
+    assert estado["activas"] == 0 and estado["en_cola"] == 0
+
+
+def test_escrituras_tienen_su_propio_limite():
+    control = _control()
+    assert control.clasificar({"path": "/api/usuarios/", "method": "POST"}).nombre == "escrituras"
+    assert control.clasificar({"path": "/api/usuarios/", "method": "GET"}).nombre == "lecturas"
+    assert control.clasificar({"path": "/api/health", "method": "GET"}) is None
@@ -0,0 +1,119 @@
+"""
+Tests de la instantánea de columnas y los reportes /api/estadisticas/...
+"""
+
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.core.analytics import ColumnasUsuarios
+from app.core.versioning import data_version
+
+
+class TablaFalsa:
+    """Filas (id, edad, activo, created_at, updated_at) con lecturas contadas"""
+
+    def __init__(self):
+        self.filas = {}
+
+    def poner(self, usuario_id, edad, activo, creado):
+        self.filas[usuario_id] = (usuario_id, edad, activo, creado, datetime.utcnow())
+        data_version.incrementar()
+
+    def quitar(self, usuario_id):
+        del self.filas[usuario_id]
+        data_version.incrementar()
+
+    def leer_filas(self, desde):
+        filas = [f[:4] for f in self.filas.values() if desde is None or f[4] >= desde]
+        return filas, len(self.filas)
+
+    def leer_ids(self):
+        return list(self.filas)
+
+
+def test_refresco_incremental_y_eliminaciones():
+    tabla = TablaFalsa()
+    for i in range(1, 6):
+        tabla.poner(i, 20 + i, True, datetime(2024, 1, i))
+    columnas = ColumnasUsuarios()
+    columnas.refrescar(tabla.leer_filas, tabla.leer_ids)
+    assert len(columnas) == 5 and columnas.refrescos_completos == 1
+
+    # Sin cambios no se consulta nada
+    columnas.refrescar(lambda desde: pytest.fail("no debía leer"), tabla.leer_ids)
+
+    tabla.poner(3, 60, False, datetime(2024, 1, 3))
+    tabla.poner(9, None, True, datetime(2024, 2, 1))
+    tabla.quitar(1)
+    columnas.refrescar(tabla.leer_filas, tabla.leer_ids)
+    assert columnas.refrescos_completos == 1
+    assert columnas.ids.tolist() == [2, 3, 4, 5, 9]
+    assert columnas.edad.tolist() == [22, 60, 24, 25, -1]
+    assert columnas.activo.tolist() == [True, False, True, True, True]
+
+
+def test_agregados():
+    tabla = TablaFalsa()
+    edades = [15, 22, 25, 31, 38, None]
+    fechas = [datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 23), datetime(2024, 1, 3),
+              datetime(2024, 1, 8), datetime(2024, 2, 5), datetime(2024, 2, 6)]
+    for i, (edad, fecha) in enumerate(zip(edades, fechas), start=1):
+        tabla.poner(i, edad, i % 2 == 0, fecha)
+    columnas = ColumnasUsuarios()
+    columnas.refrescar(tabla.leer_filas, tabla.leer_ids)
+
+    edades_por_rango = columnas.histograma_edades(10)
+    assert edades_por_rango["rangos"] == [
+        {"desde": 10, "hasta": 19, "usuarios": 1},
+        {"desde": 20, "hasta": 29, "usuarios": 2},
+        {"desde": 30, "hasta": 39, "usuarios": 2},
+    ]
+    assert edades_por_rango["sin_edad"] == 1
+    assert edades_por_rango["media"] == 26.2
+    assert columnas.histograma_edades(10, activo=True)["sin_edad"] == 1
+
+    assert columnas.registros_por_periodo("dia", hasta=date(2024, 1, 3)) == [
+        {"periodo": "2024-01-01", "usuarios": 2},
+        {"periodo": "2024-01-03", "usuarios": 1},
+    ]
+    # 2024-01-01 fue lunes; el 8 empieza otra semana
+    assert [p["periodo"] for p in columnas.registros_por_periodo("semana")] == [
+        "2024-01-01", "2024-01-08", "2024-02-05"
+    ]
+    assert columnas.activos_por_cohorte("mes") == [
+        {"cohorte": "2024-01-01", "usuarios": 4, "activos": 2, "ratio_activos": 0.5},
+        {"cohorte": "2024-02-01", "usuarios": 2, "activos": 1, "ratio_activos": 0.5},
+    ]
+
+
+def test_tabla_vacia():
+    columnas = ColumnasUsuarios()
+    columnas.refrescar(TablaFalsa().leer_filas, TablaFalsa().leer_ids)
+    assert columnas.histograma_edades(10) == {
+        "ancho": 10, "rangos": [], "sin_edad": 0, "media": None, "percentiles": None
+    }
+    assert columnas.registros_por_periodo("mes") == []
+    assert columnas.activos_por_cohorte("mes") == []
+
+
+def test_endpoints(client):
+    antes = client.get("/api/estadisticas/edades", params={"ancho": 120}).json()
+    total_antes = sum(r["usuarios"] for r in antes["rangos"])
+    client.post("/api/usuarios/", json={"nombre": "Analitica", "email": f"{uuid.uuid4().hex[:8]}@test.com", "edad": 44})
+
+    respuesta = client.get("/api/estadisticas/edades", params={"ancho": 120})
+    assert respuesta.status_code == 200
+    assert sum(r["usuarios"] for r in respuesta.json()["rangos"]) == total_antes + 1
+    assert client.get(
+        "/api/estadisticas/edades", params={"ancho": 120}, headers={"If-None-Match": respuesta.headers["etag"]}
+    ).status_code == 304
+
+    hoy = datetime.utcnow().date().isoformat()
+    registros = client.get("/api/estadisticas/registros", params={"desde": hoy}).json()
+    assert registros and registros[-1]["usuarios"] >= 1
+    cohortes = client.get("/api/estadisticas/cohortes", params={"periodo": "semana"}).json()
+    assert all(0 <= c["ratio_activos"] <= 1 for c in cohortes)
+    assert client.get("/api/estadisticas/registros", params={"periodo": "año"}).status_code == 422
+    assert client.get("/api/estadisticas/columnas").json()["usuarios"] >= 1
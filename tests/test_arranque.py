@@ -0,0 +1,44 @@
+"""
+Tests del arranque: esquema versionado, calentamiento e informe de fases
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.core.startup import InformeArranque, calentar
+from app.database import asegurar_esquema, huella_esquema
+
+
+def test_esquema_solo_se_aplica_si_cambia(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'arranque.db'}")
+    assert asegurar_esquema(engine) is True
+    assert asegurar_esquema(engine) is False
+
+    # Otro proceso: sin caché local, basta con leer PRAGMA user_version
+    database._esquemas_verificados.clear()
+    assert asegurar_esquema(engine) is False
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == huella_esquema()
+    engine.dispose()
+
+
+def test_calentamiento_e_informe(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'calentar.db'}")
+    asegurar_esquema(engine)
+
+    informe = InformeArranque()
+    with informe.fase("calentamiento"):
+        resultado = calentar(sessionmaker(bind=engine))
+    informe.terminar()
+    engine.dispose()
+
+    assert resultado == {"usuarios": 0}
+    datos = informe.informe()
+    assert datos["listo"] is True
+    assert set(datos["fases_ms"]) == {"calentamiento"}
+
+
+def test_endpoint_arranque(client):
+    datos = client.get("/api/arranque").json()
+    assert "importacion" in datos["fases_ms"]
@@ -0,0 +1,62 @@
+"""
+Tests del benchmark HTTP
+"""
+
+import asyncio
+
+from benchmarks.api_bench import ejecutar_en_proceso, parsear_carga
+from benchmarks.common import comparar_con_baseline, percentil
+
+
+def test_percentil_rango_mas_cercano():
+    valores = [float(i) for i in range(1, 101)]
+    assert percentil(valores, 50) == 50.0
+    assert percentil(valores, 99) == 99.0
+    assert percentil([], 95) == 0.0
+
+
+def test_comparacion_detecta_regresiones():
+    baseline = {"listar": {"p95_ms": 10.0, "throughput_rps": 100.0}}
+    assert comparar_con_baseline({"listar": {"p95_ms": 11.0, "throughput_rps": 95.0}}, baseline) == []
+    regresiones = comparar_con_baseline({"listar": {"p95_ms": 20.0, "throughput_rps": 50.0}}, baseline)
+    assert len(regresiones) == 2
+
+
+def test_carga_en_proceso(tmp_path):
+    resultados = asyncio.run(ejecutar_en_proceso(
+        str(tmp_path / "bench.db"),
+        concurrencia=4,
+        duracion=0,
+        carga=parsear_carga("listar=2,obtener=2,crear=1"),
+        peticiones=40,
+        precarga=5,
+    ))
+    assert resultados["total"]["peticiones"] == 40
+    assert all(op["errores"] == 0 for op in resultados["operaciones"].values())
+
+
+def test_benchmark_compresion():
+    from benchmarks.compression_bench import ejecutar
+
+    resultados = ejecutar(repeticiones=1)
+    listado = resultados["listar_1000"]["gzip/equilibrado"]
+    assert listado["bytes_comprimidos"] < listado["bytes_originales"]
+    assert set(resultados) == {"estadisticas", "listar_10", "listar_100", "listar_1000"}
+
+
+def test_benchmark_repositorios(tmp_path):
+    from benchmarks.repository_bench import ejecutar
+
+    resultados = ejecutar(filas=200, repeticiones=3, directorio=str(tmp_path))
+    assert set(resultados["sqlalchemy"]) == set(resultados["memoria"])
+    assert resultados["usuarios_en_memoria"] == 200
+
+
+def test_benchmark_logging(tmp_path):
+    from benchmarks.logging_bench import ejecutar
+
+    resultados = ejecutar(peticiones=50, lento_ms=0.1, trabajo_ms=0, directorio=str(tmp_path))
+    assert set(resultados) == {"directo", "cola", "directo_disco_lento", "cola_disco_lento"}
+    # 2 líneas por petición más un WARNING cada 10: la cola no llega a llenarse
+    assert resultados["cola"]["lineas_escritas"] == resultados["directo"]["lineas_escritas"] == 105
+    assert resultados["cola"]["descartadas_cola_llena"] == 0
@@ -0,0 +1,37 @@
+"""
+Tests de los datos iniciales incrustados en index.html
+"""
+
+import json
+import re
+import uuid
+
+from app.core.bootstrap import bootstrap_inicial, incrustar
+
+
+def _datos(html: str) -> dict:
+    bloque = re.search(r'<script id="datos-iniciales" type="application/json">(.*?)</script>', html)
+    return json.loads(bloque.group(1))
+
+
+def test_incrustar_escapa_html():
+    html = incrustar(b"<html><head></head><body></body></html>", {"nombre": "</script><b>"})
+    assert b"</script><b>" not in html
+    assert json.loads(re.search(rb'json">(.*?)</script>', html).group(1)) == {"nombre": "</script><b>"}
+
+
+def test_index_incluye_datos_y_se_reconstruye_al_cambiar(client):
+    inicial = client.get("/")
+    datos = _datos(inicial.text)
+    assert datos["estadisticas"] == client.get("/api/estadisticas").json()
+    assert datos["usuarios"] == client.get("/api/usuarios/").json()
+
+    reconstrucciones = bootstrap_inicial.reconstrucciones
+    assert client.get("/usuarios").text == inicial.text
+    assert bootstrap_inicial.reconstrucciones == reconstrucciones
+
+    client.post("/api/usuarios/", json={"nombre": "Bootstrap", "email": f"{uuid.uuid4().hex[:12]}@ejemplo.com", "edad": 40})
+    despues = client.get("/")
+    assert despues.headers["etag"] != inicial.headers["etag"]
+    assert _datos(despues.text)["estadisticas"]["total_usuarios"] == datos["estadisticas"]["total_usuarios"] + 1
+    assert client.get("/", headers={"If-None-Match": despues.headers["etag"]}).status_code == 304
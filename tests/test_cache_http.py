@@ -0,0 +1,43 @@
+"""
+Tests de GET condicional (ETag / If-None-Match)
+"""
+
+import uuid
+
+
+def _email():
+    return f"{uuid.uuid4().hex[:12]}@ejemplo.com"
+
+
+def test_listado_responde_304_con_etag_vigente(client):
+    r1 = client.get("/api/usuarios/")
+    assert r1.status_code == 200
+    etag = r1.headers["etag"]
+    assert "last-modified" in r1.headers
+
+    r2 = client.get("/api/usuarios/", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+    assert r2.headers["etag"] == etag
+
+
+def test_escritura_invalida_etag(client):
+    etag = client.get("/api/estadisticas").headers["etag"]
+
+    r = client.post("/api/usuarios/", json={"nombre": "Ana Etag", "email": _email()})
+    assert r.status_code == 201
+
+    r2 = client.get("/api/estadisticas", headers={"If-None-Match": etag})
+    assert r2.status_code == 200
+    assert r2.headers["etag"] != etag
+
+
+def test_usuario_individual_envia_last_modified(client):
+    creado = client.post("/api/usuarios/", json={"nombre": "Beto Etag", "email": _email()}).json()
+
+    r = client.get(f"/api/usuarios/{creado['id']}")
+    assert r.status_code == 200
+    assert "last-modified" in r.headers
+
+    r2 = client.get(f"/api/usuarios/{creado['id']}", headers={"If-None-Match": r.headers["etag"]})
+    assert r2.status_code == 304
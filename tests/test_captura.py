@@ -0,0 +1,78 @@
+"""
+Tests de captura y reproducción de tráfico
+"""
+
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.capture import GrabadorTrafico, leer_trazas
+from app.main import app
+from app.middleware.capture import TrafficCaptureMiddleware
+from benchmarks.replay import construir_peticion, reproducir_en_proceso
+
+
+def test_captura_trazas_saneadas(tmp_path):
+    ruta = str(tmp_path / "trafico.jsonl")
+    grabador = GrabadorTrafico(ruta)
+    client = TestClient(TrafficCaptureMiddleware(app, grabador))
+
+    creado = client.post("/api/usuarios/", json={"nombre": "Traza", "email": "traza@ejemplo.com", "edad": 30})
+    usuario_id = creado.json()["id"]
+    client.get(f"/api/usuarios/{usuario_id}")
+    client.get("/api/usuarios/", params={"skip": 0, "limit": 5, "token": "secreto"})
+    client.delete(f"/api/usuarios/{usuario_id}")
+    assert grabador.vaciar()
+
+    trazas = leer_trazas([ruta])
+    assert [(t["m"], t["r"]) for t in trazas] == [
+        ("POST", "/api/usuarios/"),
+        ("GET", "/api/usuarios/{usuario_id}"),
+        ("GET", "/api/usuarios/"),
+        ("DELETE", "/api/usuarios/{usuario_id}"),
+    ]
+    assert trazas[0]["b"] > 0 and trazas[0]["s"] == 201
+    assert trazas[1]["p"] == {"usuario_id": str(usuario_id)}
+    assert trazas[2]["q"] == {"skip": "0", "limit": "5", "token": "*"}
+    assert "traza@ejemplo.com" not in open(ruta, encoding="utf-8").read()
+    assert grabador.estado()["grabadas"] == 4
+    grabador.cerrar()
+
+
+def test_limite_de_tamano(tmp_path):
+    grabador = GrabadorTrafico(str(tmp_path / "t.jsonl"), max_bytes=60)
+    for _ in range(5):
+        grabador.grabar({"ts": 1.0, "m": "GET", "r": "/api/", "s": 200, "d": 1.0})
+    grabador.cerrar()
+    assert grabador.grabadas == 1 and grabador.descartadas == 4
+
+
+def test_cola_llena_descarta_sin_esperar(tmp_path, monkeypatch):
+    grabador = GrabadorTrafico(str(tmp_path / "t.jsonl"), capacidad=2)
+    disco_libre = threading.Event()
+    escribir = grabador._escribir
+    monkeypatch.setattr(grabador, "_escribir", lambda registros: disco_libre.wait() and escribir(registros))
+    for _ in range(5):
+        grabador.grabar({"ts": 1.0, "m": "GET", "r": "/api/", "s": 200, "d": 1.0})
+    # Con el disco detenido, a lo sumo 3 trazas (una en escritura y 2 en cola)
+    assert grabador.descartadas_cola >= 2
+    disco_libre.set()
+    grabador.cerrar()
+    assert grabador.grabadas + grabador.descartadas_cola == 5
+
+
+def test_reproduccion(tmp_path):
+    trazas = [
+        {"ts": 100.0, "m": "POST", "r": "/api/usuarios/", "b": 60, "s": 201, "d": 2.0},
+        {"ts": 100.01, "m": "GET", "r": "/api/usuarios/", "q": {"limit": "10"}, "s": 200, "d": 1.0},
+        {"ts": 100.02, "m": "GET", "r": "/api/usuarios/{usuario_id}", "p": {"usuario_id": "1"}, "s": 200, "d": 1.0},
+        {"ts": 100.03, "m": "GET", "r": "/api/usuarios/{usuario_id}", "p": {"usuario_id": "*"}, "s": 200, "d": 1.0},
+    ]
+    assert construir_peticion(trazas[3], None, 0) is None
+
+    resultados = asyncio.run(reproducir_en_proceso(str(tmp_path / "replay.db"), trazas, velocidad=2.0))
+    assert resultados["omitidas"] == 1
+    assert resultados["total"]["peticiones"] == 3
+    assert resultados["operaciones"]["POST /api/usuarios/"]["status_distinto"] == 0
+    assert all(op["errores"] == 0 for op in resultados["operaciones"].values())
@@ -0,0 +1,76 @@
+"""
+Tests del middleware de compresión
+"""
+
+import gzip
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import EstadisticasCompresion, aceptadas
+from app.middleware.compression import CompressionMiddleware, etag_codificado, parsear_perfiles
+
+
+def _app_de_prueba(estadisticas, **opciones):
+    app = FastAPI()
+
+    @app.get("/grande")
+    def grande():
+        return PlainTextResponse("usuario," * 1000)
+
+    @app.get("/exportar")
+    def exportar():
+        def filas():
+            for i in range(50):
+                yield f'{{"id": {i}, "nombre": "Usuario {i}"}}\n'
+        return StreamingResponse(filas(), media_type="application/x-ndjson")
+
+    return CompressionMiddleware(app, estadisticas=estadisticas, **opciones)
+
+
+def test_respuestas_pequenas_no_se_comprimen(client):
+    respuesta = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_listado_grande_se_comprime(client):
+    for _ in range(15):
+        client.post("/api/usuarios/", json={"nombre": "Compresión", "email": f"{uuid.uuid4().hex[:12]}@ejemplo.com"})
+    respuesta = client.get("/api/usuarios/?limit=100", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in respuesta.headers["vary"]
+    assert len(respuesta.json()) >= 15
+
+    # Bytes distintos, validador distinto; la revalidación sigue funcionando
+    identidad = client.get("/api/usuarios/?limit=100", headers={"Accept-Encoding": "identity"})
+    assert respuesta.headers["etag"] == etag_codificado(identidad.headers["etag"], "gzip")
+    revalidada = client.get(
+        "/api/usuarios/?limit=100",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": respuesta.headers["etag"]},
+    )
+    assert revalidada.status_code == 304 and revalidada.headers["etag"] == respuesta.headers["etag"]
+
+
+def test_streaming_y_perfiles_por_ruta():
+    estadisticas = EstadisticasCompresion()
+    client = TestClient(_app_de_prueba(estadisticas, perfiles_por_ruta=parsear_perfiles("/grande=ninguno")))
+
+    sin_comprimir = client.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in sin_comprimir.headers
+
+    with client.stream("GET", "/exportar", headers={"Accept-Encoding": "gzip"}) as respuesta:
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert "content-length" not in respuesta.headers
+        crudo = b"".join(respuesta.iter_raw())
+    assert gzip.decompress(crudo).decode().count("\n") == 50
+
+    formato = estadisticas.estado()["formatos"]["gzip"]
+    assert formato["respuestas"] == 1
+    assert formato["bytes_salida"] < formato["bytes_entrada"]
+
+
+def test_negociacion():
+    assert aceptadas("gzip, br", ("zstd", "br", "gzip")) == ["br", "gzip"]
+    assert aceptadas("identity", ("gzip",)) == []
@@ -0,0 +1,38 @@
+"""
+Tests de concurrencia optimista (If-Match / 412)
+"""
+
+import uuid
+
+
+def _crear(client):
+    email = f"{uuid.uuid4().hex[:12]}@ejemplo.com"
+    r = client.post("/api/usuarios/", json={"nombre": "Carla Version", "email": email})
+    assert r.status_code == 201
+    return r.json()
+
+
+def test_if_match_vigente_actualiza_e_incrementa_version(client):
+    usuario = _crear(client)
+    etag = client.get(f"/api/usuarios/{usuario['id']}").headers["etag"]
+
+    r = client.put(f"/api/usuarios/{usuario['id']}", json={"edad": 30}, headers={"If-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["edad"] == 30
+    assert r.json()["version"] == usuario["version"] + 1
+    assert r.headers["etag"] != etag
+
+
+def test_if_match_obsoleto_responde_412(client):
+    usuario = _crear(client)
+    etag = client.get(f"/api/usuarios/{usuario['id']}").headers["etag"]
+
+    assert client.put(f"/api/usuarios/{usuario['id']}", json={"edad": 40}, headers={"If-Match": etag}).status_code == 200
+    r = client.put(f"/api/usuarios/{usuario['id']}", json={"edad": 50}, headers={"If-Match": etag})
+    assert r.status_code == 412
+    assert client.get(f"/api/usuarios/{usuario['id']}").json()["edad"] == 40
+
+
+def test_actualizar_inexistente_responde_404(client):
+    r = client.put("/api/usuarios/999999999", json={"edad": 20}, headers={"If-Match": '"x-1.1"'})
+    assert r.status_code == 404
@@ -0,0 +1,54 @@
+"""
+Tests del manifiesto de estáticos en memoria
+"""
+
+import gzip
+
+from app.core.static_assets import CACHE_INMUTABLE, ManifiestoEstaticos, aceptadas
+
+
+def test_negociacion_de_codificacion():
+    assert aceptadas("gzip, deflate, br") == ["br", "gzip"]
+    assert aceptadas("gzip;q=1.0, br;q=0.5") == ["gzip", "br"]
+    assert aceptadas("br;q=0, *") == ["gzip"]
+    assert aceptadas(None) == []
+
+
+def test_manifiesto_variantes_y_cache(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.3f9a2b1c.js").write_text("console.log('hola');\n" * 200)
+    (tmp_path / "assets" / "settings.js").write_text("x")
+    precomprimido = gzip.compress(b"body{}" * 500)
+    (tmp_path / "estilo.css").write_bytes(b"body{}" * 500)
+    (tmp_path / "estilo.css.gz").write_bytes(precomprimido)
+
+    manifiesto = ManifiestoEstaticos(str(tmp_path))
+    assert manifiesto.construir()["archivos"] == 3
+
+    bundle = manifiesto.obtener("assets/app.3f9a2b1c.js")
+    assert bundle.cache_control == CACHE_INMUTABLE
+    assert "gzip" in bundle.variantes
+    assert manifiesto.obtener("assets/settings.js").cache_control == "no-cache"
+    assert manifiesto.obtener("estilo.css").variantes["gzip"] == precomprimido
+
+    respuesta = bundle.respuesta("gzip", None)
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert bundle.respuesta(None, respuesta.headers["etag"]).status_code == 304
+
+
+def test_index_y_fallback_spa(client):
+    inicial = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert inicial.status_code == 200
+    assert inicial.headers["content-encoding"] == "gzip"
+    assert inicial.headers["cache-control"] == "no-cache"
+    assert "<html" in inicial.text.lower()
+
+    spa = client.get("/usuarios/42/editar", headers={"Accept-Encoding": "gzip"})
+    assert spa.text == inicial.text
+
+    no_modificado = client.get("/", headers={"If-None-Match": inicial.headers["etag"]})
+    assert no_modificado.status_code == 304
+
+    assert client.get("/static/index.html").status_code == 200
+    assert client.get("/static/no-existe.js").status_code == 404
@@ -0,0 +1,69 @@
+"""
+Tests del broadcaster de eventos (SSE)
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.events import Broadcaster, ClienteDescartado
+
+
+def test_publicar_reparte_a_todos_los_clientes():
+    async def escenario():
+        b = Broadcaster(max_buffer=4)
+        s1, s2 = b.suscribir(), b.suscribir()
+        b.publicar("usuario_creado", {"id": 1})
+        await asyncio.sleep(0)
+        return await s1.siguiente(1), await s2.siguiente(1)
+
+    m1, m2 = asyncio.run(escenario())
+    assert m1 == m2
+    assert b"event: usuario_creado" in m1
+    assert b'data: {"id":1}' in m1
+
+
+def test_cliente_lento_es_descartado():
+    async def escenario():
+        b = Broadcaster(max_buffer=2)
+        lento = b.suscribir()
+        for i in range(3):
+            b.publicar("usuario_eliminado", {"id": i})
+        await asyncio.sleep(0)
+        assert b.clientes == 0
+        assert b.descartados == 1
+        with pytest.raises(ClienteDescartado):
+            await lento.siguiente(1)
+
+    asyncio.run(escenario())
+
+
+def test_sin_clientes_no_serializa():
+    b = Broadcaster()
+    b.publicar("usuario_creado", {"id": 1})
+    assert b.publicados == 0
+
+
+def test_eventos_relevados_entre_workers(tmp_path):
+    ruta = str(tmp_path / "eventos")
+    worker_a, worker_b = Broadcaster(), Broadcaster()
+    worker_a.compartir(ruta)
+    worker_b.compartir(ruta)
+    # Máximo chico: el archivo se rota (una vez) entre lecturas y no se pierde nada
+    worker_a.max_bytes_compartido = worker_b.max_bytes_compartido = 600
+
+    async def escenario():
+        cliente = worker_b.suscribir()
+        worker_b.iniciar_relevo()
+        worker_b.publicar("usuario_creado", {"id": 0})
+        for i in range(1, 11):
+            worker_a.publicar("usuario_eliminado", {"id": i})
+        worker_a.publicar("estadisticas", {"total": 1}, solo_local=True)
+        assert worker_b.relevar() == 10
+        await asyncio.sleep(0)
+        return [await cliente.siguiente(1) for _ in range(11)]
+
+    mensajes = asyncio.run(escenario())
+    assert b'data: {"id":0}' in mensajes[0]
+    assert [b'"id":%d' % i in m for i, m in enumerate(mensajes)] == [True] * 11
+    assert worker_b.relevar() == 0 and worker_b.relevados == 10
@@ -0,0 +1,159 @@
+"""
+Tests del almacenamiento fragmentado por hash
+"""
+
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.sharding import (
+    Fragmentos,
+    SesionFragmentada,
+    fragmento_de_email,
+    fragmento_de_id,
+    rutas_fragmentos,
+)
+from app.database import crear_motor, get_db
+from app.main import app
+from app.schemas.user import UsuarioActualizar, UsuarioCrear
+from app.services.user_service import UsuarioService
+from scripts.reshard import redistribuir
+from tests.conftest import override_get_db
+
+
+@pytest.fixture
+def fragmentos(tmp_path):
+    conjunto = Fragmentos(rutas_fragmentos(str(tmp_path / "usuarios_{n}.db"), 3), crear_motor)
+    conjunto.asegurar_esquema()
+    yield conjunto
+    conjunto.cerrar()
+
+
+@pytest.fixture
+def db(fragmentos):
+    sesion = SesionFragmentada(fragmentos)
+    yield sesion
+    sesion.close()
+
+
+def _crear(db, n: int, **extra):
+    return [
+        UsuarioService.crear_usuario(
+            db, UsuarioCrear(nombre=f"Usuario {i}", email=f"u{i}-{uuid.uuid4().hex[:6]}@test.com", edad=20 + i, **extra)
+        )
+        for i in range(n)
+    ]
+
+
+def test_hash_estable_y_en_rango():
+    assert fragmento_de_id(12345, 4) == fragmento_de_id(12345, 4)
+    assert {fragmento_de_id(i, 4) for i in range(100)} == {0, 1, 2, 3}
+    assert fragmento_de_email("Ana@Test.com", 4) == fragmento_de_email("ana@test.com", 4)
+    with pytest.raises(ValueError):
+        rutas_fragmentos("usuarios.db", 2)
+
+
+def test_crud_enrutado_por_id(db, fragmentos):
+    creados = _crear(db, 12)
+    ids = [u.id for u in creados]
+    assert len(set(ids)) == len(ids)
+
+    # Cada fila está solo en el fragmento de su id
+    por_fragmento = [UsuarioService.obtener_estadisticas(s)["total_usuarios"] for s in db.todas()]
+    assert sum(por_fragmento) == 12
+    assert sum(1 for n in por_fragmento if n) > 1
+
+    usuario = UsuarioService.obtener_usuario_por_id(db, ids[5])
+    assert usuario.email == creados[5].email
+    actualizado = UsuarioService.actualizar_usuario(db, ids[5], UsuarioActualizar(edad=99), version_esperada=1)
+    assert actualizado.edad == 99 and actualizado.version == 2
+
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.actualizar_usuario(db, ids[5], UsuarioActualizar(edad=1), version_esperada=1)
+    assert error.value.status_code == 412
+
+    assert UsuarioService.eliminar_usuario(db, ids[5])
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.obtener_usuario_por_id(db, ids[5])
+    assert error.value.status_code == 404
+
+
+def test_email_unico_entre_fragmentos(db):
+    primero, segundo = _crear(db, 2)
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.crear_usuario(db, UsuarioCrear(nombre="Otro", email=primero.email))
+    assert error.value.status_code == 400
+
+    # Cambiar a un email ocupado falla; a uno libre libera el anterior
+    with pytest.raises(HTTPException):
+        UsuarioService.actualizar_usuario(db, segundo.id, UsuarioActualizar(email=primero.email))
+    nuevo = f"nuevo-{uuid.uuid4().hex[:6]}@test.com"
+    anterior = primero.email
+    UsuarioService.actualizar_usuario(db, primero.id, UsuarioActualizar(email=nuevo))
+    assert UsuarioService.obtener_usuario_por_email(db, nuevo).id == primero.id
+    assert UsuarioService.obtener_usuario_por_email(db, anterior) is None
+    assert UsuarioService.crear_usuario(db, UsuarioCrear(nombre="Reusa", email=anterior)).id != primero.id
+
+
+def test_listado_y_estadisticas_combinados(db):
+    creados = _crear(db, 20)
+    for usuario in creados[:5]:
+        UsuarioService.actualizar_usuario(db, usuario.id, UsuarioActualizar(activo=False))
+    ids = sorted(u.id for u in creados)
+
+    pagina = UsuarioService.obtener_usuarios(db, skip=4, limit=7)
+    assert [u.id for u in pagina] == ids[4:11]
+    inactivos = UsuarioService.obtener_usuarios(db, activo=False)
+    assert sorted(u.id for u in inactivos) == sorted(u.id for u in creados[:5])
+
+    estadisticas = UsuarioService.obtener_estadisticas(db)
+    assert estadisticas["total_usuarios"] == 20
+    assert estadisticas["usuarios_activos"] == 15
+    assert estadisticas["usuarios_inactivos"] == 5
+
+
+def test_api_con_fragmentos(client, fragmentos):
+    def get_db_fragmentado():
+        sesion = SesionFragmentada(fragmentos)
+        try:
+            yield sesion
+        finally:
+            sesion.close()
+
+    app.dependency_overrides[get_db] = get_db_fragmentado
+    try:
+        respuesta = client.post("/api/usuarios/", json={"nombre": "Ana", "email": "ana@fragmentos.com"})
+        assert respuesta.status_code == 201
+        usuario_id = respuesta.json()["id"]
+        assert client.get(f"/api/usuarios/{usuario_id}").json()["email"] == "ana@fragmentos.com"
+        assert client.post("/api/usuarios/", json={"nombre": "Ana", "email": "ana@fragmentos.com"}).status_code == 400
+        assert client.get("/api/estadisticas").json()["total_usuarios"] == 1
+        assert client.delete(f"/api/usuarios/{usuario_id}").status_code in (200, 204)
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+
+
+def test_redistribuir_conserva_ids(db, fragmentos, tmp_path):
+    creados = [(u.id, u.email) for u in _crear(db, 30)]
+    db.close()
+    destinos = rutas_fragmentos(str(tmp_path / "nuevos_{n}.db"), 2)
+    resumen = redistribuir(fragmentos.rutas, destinos, lote=7)
+    assert resumen["filas"] == 30
+    assert sum(resumen["por_fragmento"]) == 30
+    assert resumen["siguiente_id"] > max(usuario_id for usuario_id, _ in creados)
+
+    nuevos = Fragmentos(destinos, crear_motor)
+    sesion = SesionFragmentada(nuevos)
+    try:
+        for usuario_id, email in creados:
+            assert UsuarioService.obtener_usuario_por_id(sesion, usuario_id).email == email
+            assert UsuarioService.obtener_usuario_por_email(sesion, email).id == usuario_id
+        nuevo = UsuarioService.crear_usuario(sesion, UsuarioCrear(nombre="Tras", email="tras@test.com"))
+        assert nuevo.id not in dict(creados)
+    finally:
+        sesion.close()
+        nuevos.cerrar()
+
+    with pytest.raises(FileExistsError):
+        redistribuir(fragmentos.rutas, destinos)
@@ -0,0 +1,142 @@
+"""
+Tests del buffer de logs y la lectura del final del archivo (/api/admin/logs)
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.core import logs
+from app.core.logs import BufferLogs, ColaLogs, RegistroLogs, leer_final, lineas_desde_el_final, registro_logs
+
+
+def _registro(mensaje: str, nivel: int = logging.INFO, creado: float = None) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", nivel, __file__, 1, mensaje, None, None)
+    if creado is not None:
+        record.created = creado
+    return record
+
+
+def test_lineas_desde_el_final(tmp_path, monkeypatch):
+    monkeypatch.setattr(logs, "BLOQUE", 7)  # bloques más cortos que las líneas
+    ruta = tmp_path / "app.log"
+    lineas = [f"linea {i} " + "x" * (i % 13) for i in range(200)]
+    ruta.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+
+    assert list(lineas_desde_el_final(str(ruta), 10**6)) == lineas[::-1]
+    # Con límite de bytes solo se leen las últimas líneas completas
+    ultimas = list(lineas_desde_el_final(str(ruta), 60))
+    assert ultimas and ultimas == lineas[::-1][:len(ultimas)]
+
+
+def test_leer_final_con_filtros(tmp_path):
+    ruta = tmp_path / "app.log"
+    inicio = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with open(ruta, "w", encoding="utf-8") as f:
+        for i in range(50_000):
+            nivel = "ERROR" if i % 1000 == 0 else "INFO"
+            ts = (inicio + timedelta(seconds=i)).isoformat(timespec="milliseconds")
+            f.write(json.dumps({"ts": ts, "nivel": nivel, "logger": "app", "mensaje": f"m{i}"}) + "\n")
+
+    resultado = leer_final(str(ruta), 3)
+    assert [e["mensaje"] for e in resultado["entradas"]] == ["m49997", "m49998", "m49999"]
+    assert resultado["lineas_leidas"] == 3
+
+    errores = leer_final(str(ruta), 2, nivel_minimo=logging.ERROR)
+    assert [e["mensaje"] for e in errores["entradas"]] == ["m48000", "m49000"]
+    assert errores["lineas_leidas"] < 2100
+
+    # Se deja de leer en la primera entrada anterior a `desde`
+    desde = (inicio + timedelta(seconds=49_990)).timestamp()
+    recientes = leer_final(str(ruta), 100, desde=desde)
+    assert len(recientes["entradas"]) == 10 and recientes["lineas_leidas"] == 11
+
+
+def test_formato_de_texto_legado(tmp_path):
+    ruta = tmp_path / "fastapi_empresa.log"
+    ruta.write_text(
+        "2026-01-01 10:00:00,000 - FastAPI-Empresa - INFO - iniciado\n"
+        "2026-01-01 10:00:01,500 - FastAPI-Empresa - WARNING - lento - 900 ms\n"
+        "Traceback sin formato\n",
+        encoding="utf-8",
+    )
+    entradas = leer_final(str(ruta), 10, nivel_minimo=logging.WARNING)["entradas"]
+    assert entradas == [{
+        "ts": entradas[0]["ts"], "logger": "FastAPI-Empresa", "nivel": "WARNING", "mensaje": "lento - 900 ms"
+    }]
+
+
+def test_buffer_y_respaldo_en_archivo(tmp_path, monkeypatch):
+    buffer = BufferLogs(capacidad=5)
+    for i in range(8):
+        buffer.emit(_registro(f"m{i}", logging.WARNING if i % 2 else logging.INFO, creado=1000.0 + i))
+    assert len(buffer) == 5 and buffer.descartados == 3
+    assert [e["mensaje"] for e in buffer.recientes(2, logging.WARNING)["entradas"]] == ["m5", "m7"]
+    assert [e["mensaje"] for e in buffer.recientes(10, desde=1005.5)["entradas"]] == ["m6", "m7"]
+    assert buffer.cubre(1004.0) and not buffer.cubre(1001.0) and not buffer.cubre(None)
+
+    # El buffer ya descartó entradas: lo que falta sale del archivo
+    monkeypatch.setattr(settings, "log_buffer_size", 3)
+    registro = RegistroLogs()
+    registro.instalar(archivo=str(tmp_path / "app.log"))
+    try:
+        logger = logging.getLogger("app.test")
+        for i in range(10):
+            logger.info("evento %d", i)
+        assert registro.recientes(2)["fuente"] == "memoria"
+        completo = registro.recientes(6)
+        assert completo["fuente"] == "archivo"
+        assert [e["mensaje"] for e in completo["entradas"]] == [f"evento {i}" for i in range(4, 10)]
+        assert registro.recientes(6, fuente="memoria")["entradas"][-1]["mensaje"] == "evento 9"
+    finally:
+        registro.desinstalar()
+
+
+def test_endpoint_logs(client, admin):
+    registro_logs.instalar()
+    try:
+        logging.getLogger("app.test").error("fallo de prueba")
+        respuesta = client.get("/api/admin/logs", params={"nivel": "error", "n": 5}, headers=admin)
+        assert respuesta.status_code == 200
+        assert respuesta.json()["entradas"][-1]["mensaje"] == "fallo de prueba"
+        assert all(e["nivel"] in ("ERROR", "CRITICAL") for e in respuesta.json()["entradas"])
+        assert client.get("/api/admin/logs", params={"nivel": "ruido"}, headers=admin).status_code == 400
+        assert client.get("/api/admin/logs").status_code == 401
+    finally:
+        registro_logs.desinstalar()
+
+
+def test_cola_muestrea_y_descarta_bajo_presion():
+    cola = ColaLogs(capacidad=12, muestreo=3)
+    for i in range(9):
+        cola.emit(_registro(f"m{i}"))
+    # Desde el 80 % de la cola solo pasa 1 de cada 3 DEBUG/INFO; WARNING siempre
+    for i in range(6):
+        cola.emit(_registro(f"info {i}"))
+    cola.emit(_registro("aviso", logging.WARNING))
+    assert cola.queue.qsize() == 12 and cola.omitidos_por_muestreo == 4
+    # Con la cola llena se descarta cualquier nivel, sin esperar
+    for i in range(3):
+        cola.emit(_registro(f"error {i}", logging.ERROR))
+    estado = cola.estado()
+    assert estado["encolados"] == 12 and estado["descartados_cola_llena"] == {"ERROR": 3}
+
+
+def test_request_id_en_logs_y_respuesta(client, tmp_path, admin):
+    registro = RegistroLogs()
+    registro.instalar(archivo=str(tmp_path / "app.log"))
+    try:
+        respuesta = client.get("/api/usuarios/", headers={"X-Request-ID": "abc-123"})
+        assert respuesta.headers["x-request-id"] == "abc-123"
+        generado = client.get("/api/usuarios/", headers={"X-Request-ID": "no valido!"}).headers["x-request-id"]
+        assert len(generado) == 16 and generado != "no valido!"
+        registro.vaciar()
+        with open(tmp_path / "app.log", encoding="utf-8") as f:
+            acceso = [json.loads(linea) for linea in f if '"app.acceso"' in linea]
+        assert acceso[0]["request_id"] == "abc-123" and acceso[1]["request_id"] == generado
+        assert acceso[0]["ruta"] == "/api/usuarios/" and acceso[0]["status"] == 200
+        estado = client.get("/api/admin/logs/estado", headers=admin).json()
+        assert estado["cola"] is None  # el registro global no está instalado en este test
+    finally:
+        registro.desinstalar()
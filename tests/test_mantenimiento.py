@@ -0,0 +1,121 @@
+"""
+Tests del planificador de mantenimiento de SQLite (/api/admin/mantenimiento)
+"""
+
+import fcntl
+import os
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.config import settings
+from app.core.maintenance import (
+    MantenimientoOcupado,
+    PlanificadorMantenimiento,
+    en_ventana,
+    interpretar_ventana,
+    planificador_mantenimiento,
+)
+from app.database import crear_motor
+
+
+@pytest.fixture
+def motor(tmp_path):
+    """BD con páginas libres (filas borradas) y escrituras pendientes en el WAL"""
+    motor = crear_motor(f"sqlite:///{tmp_path / 'mant.db'}")
+    with motor.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, grupo INTEGER, relleno TEXT)"))
+        conn.execute(text("CREATE INDEX ix_t_grupo ON t (grupo)"))
+        conn.execute(
+            text("INSERT INTO t (grupo, relleno) VALUES (:g, :r)"),
+            [{"g": i % 20, "r": "x" * 500} for i in range(4000)],
+        )
+    with motor.begin() as conn:
+        conn.execute(text("DELETE FROM t WHERE id > 1000"))
+    yield motor
+    motor.dispose()
+
+
+def test_ventana_de_mantenimiento():
+    assert interpretar_ventana("") is None
+    nocturna = interpretar_ventana("23:30-04:00")
+    assert en_ventana(nocturna, datetime(2026, 1, 1, 2, 0, tzinfo=timezone.utc))
+    assert not en_ventana(nocturna, datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc))
+    assert en_ventana(interpretar_ventana("02:00-05:00"), datetime(2026, 1, 1, 4, 59, tzinfo=timezone.utc))
+    with pytest.raises(ValueError):
+        interpretar_ventana("2-5")
+
+
+def test_revisar_respeta_intervalos_ventana_y_carga(motor, monkeypatch):
+    ahora = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+    monkeypatch.setattr(settings, "maintenance_window", "02:00-05:00")
+    planificador = PlanificadorMantenimiento()
+    planificador.configurar([motor], carga=lambda: 0)
+
+    # Fuera de la ventana solo corren las tareas livianas
+    hechas = {e["tarea"]: e for e in planificador.revisar(ahora)}
+    assert set(hechas) == {"optimize", "checkpoint"}
+    assert planificador.omitidas == {"fuera_de_ventana": 2}
+    # El programado es PASSIVE: copia todo el WAL (no hay lectores) sin truncarlo
+    checkpoint = hechas["checkpoint"]["bases"][0]
+    resultado = checkpoint["resultado"]
+    assert resultado["modo"] == "PASSIVE" and not resultado["ocupado"]
+    assert resultado["paginas_wal"] > 0 and resultado["paginas_copiadas"] == resultado["paginas_wal"]
+    assert checkpoint["despues"]["bytes_wal"] == checkpoint["antes"]["bytes_wal"] > 0
+
+    # Ya ejecutadas: el estado compartido las deja para el próximo intervalo
+    assert planificador.revisar(ahora + 60) == []
+
+    # Dentro de la ventana, con carga alta, se posterga todo
+    planificador.carga = lambda: settings.maintenance_max_active + 1
+    nocturno = datetime(2026, 1, 2, 3, 0, tzinfo=timezone.utc).timestamp()
+    assert planificador.revisar(nocturno) == []
+    assert planificador.omitidas["carga"] == 1
+
+    planificador.carga = lambda: 0
+    hechas = {e["tarea"]: e for e in planificador.revisar(nocturno)}
+    assert set(hechas) == {"optimize", "checkpoint", "analyze", "vacuum"}
+    assert hechas["analyze"]["bases"][0]["resultado"]["estadisticas"] > 0
+    vacuum = hechas["vacuum"]["bases"][0]
+    assert vacuum["antes"]["paginas_libres"] > 0 and vacuum["despues"]["paginas_libres"] == 0
+    assert vacuum["despues"]["bytes_archivo"] < vacuum["antes"]["bytes_archivo"]
+
+    # Otro planificador (otro worker) lee el mismo estado
+    otro = PlanificadorMantenimiento()
+    otro.configurar([motor])
+    assert otro.pendientes(nocturno + 60, otro._leer_estado()) == []
+    assert otro.estado()["tareas"]["analyze"]["ultima"]["pid"] == os.getpid()
+
+
+def test_lock_entre_workers_y_endpoint(client, motor, admin):
+    planificador_mantenimiento.configurar([motor], carga=lambda: 0)
+    try:
+        respuesta = client.post("/api/admin/mantenimiento/checkpoint", headers=admin)
+        base = respuesta.json()["bases"][0]
+        assert respuesta.status_code == 200 and base["ruta"] == motor.url.database
+        # El manual es TRUNCATE: el WAL queda en 0 bytes
+        assert base["resultado"]["modo"] == "TRUNCATE"
+        assert base["antes"]["bytes_wal"] > 0 and base["despues"]["bytes_wal"] == 0
+        assert client.post("/api/admin/mantenimiento/reindex", headers=admin).status_code == 404
+        estado = client.get("/api/admin/mantenimiento", headers=admin).json()
+        assert estado["tareas"]["checkpoint"]["ultima"]["ms"] >= 0
+        assert estado["tareas"]["checkpoint"]["proxima_en_s"] > 0
+        assert client.get("/api/admin/mantenimiento").status_code == 401
+
+        # Con el lock tomado por otro proceso no se ejecuta nada
+        fd = os.open(f"{planificador_mantenimiento.ruta_estado}.lock", os.O_RDWR | os.O_CREAT)
+        otro = os.open(f"{planificador_mantenimiento.ruta_estado}.lock", os.O_RDWR)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            with pytest.raises(MantenimientoOcupado):
+                planificador_mantenimiento.ejecutar("optimize")
+            assert client.post("/api/admin/mantenimiento/optimize", headers=admin).status_code == 409
+            assert planificador_mantenimiento.revisar() == []
+            assert planificador_mantenimiento.omitidas["otro_worker"] >= 1
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            os.close(otro)
+    finally:
+        planificador_mantenimiento.motores = []
@@ -0,0 +1,29 @@
+"""
+Tests de diagnóstico de memoria (tracemalloc)
+"""
+
+
+def test_snapshots_y_diferencia(client, admin):
+    assert client.post("/api/admin/memoria/snapshots/antes", headers=admin).status_code == 409
+
+    client.post("/api/admin/memoria/iniciar", headers=admin)
+    try:
+        assert client.post("/api/admin/memoria/snapshots/antes", headers=admin).status_code == 200
+        retenido = [bytearray(1024) for _ in range(2000)]
+        assert client.post("/api/admin/memoria/snapshots/despues", headers=admin).status_code == 200
+
+        top = client.get("/api/admin/memoria/snapshots/despues?limite=5", headers=admin).json()
+        assert len(top) == 5
+
+        diff = client.get("/api/admin/memoria/diferencia?desde=antes&hasta=despues", headers=admin).json()
+        assert any(d["archivo"].endswith("test_memoria.py") and d["diferencia_kb"] > 1000 for d in diff)
+        del retenido
+    finally:
+        client.post("/api/admin/memoria/detener", headers=admin)
+
+
+def test_estado_informa_orm_y_caches(client, admin):
+    estado = client.get("/api/admin/memoria", headers=admin).json()
+    assert estado["rss_kb"] > 0
+    assert "objetos_en_identity_map" in estado["orm"]
+    assert "metricas_series" in estado["caches"]
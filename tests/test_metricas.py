@@ -0,0 +1,51 @@
+"""
+Tests de métricas Prometheus
+"""
+
+import json
+import subprocess
+import sys
+
+from app.core.metrics import RegistroMetricas, exportar_prometheus
+
+
+def test_endpoint_metrics_usa_ruta_plantilla(client):
+    client.get("/api/usuarios/999999999")
+    cuerpo = client.get("/api/metrics").text
+
+    assert 'http_requests_total{method="GET",route="/api/usuarios/{usuario_id}",status="404"}' in cuerpo
+    assert "http_request_duration_seconds_bucket" in cuerpo
+    assert "admission_shed_total" in cuerpo
+
+
+def test_snapshots_de_varios_workers_se_suman(tmp_path):
+    worker_a, worker_b = RegistroMetricas(), RegistroMetricas()
+    worker_a.observar("GET", "/api/health", 200, 0.002)
+    worker_b.observar("GET", "/api/health", 200, 0.3)
+
+    texto = exportar_prometheus([worker_a.snapshot(), worker_b.snapshot()])
+
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"} 2' in texto
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/health",le="0.0025"} 1' in texto
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/health",le="+Inf"} 2' in texto
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/health"} 2' in texto
+
+
+def test_archivos_de_workers_muertos_o_retirados_no_cuentan(tmp_path):
+    vivo, muerto = RegistroMetricas(), RegistroMetricas()
+    vivo._directorio = muerto._directorio = str(tmp_path)
+    vivo.observar("GET", "/api/health", 200, 0.002)
+    muerto.observar("GET", "/api/health", 200, 0.002)
+    vivo.volcar()
+    # El archivo de un proceso que ya terminó
+    proceso = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    archivo_muerto = tmp_path / f"metricas_{proceso.stdout.strip()}.json"
+    archivo_muerto.write_text(json.dumps(muerto.snapshot()))
+
+    assert len(vivo.recolectar()) == 1
+    assert not archivo_muerto.exists()
+
+    vivo.retirar()
+    assert list(tmp_path.iterdir()) == []
+    vivo.volcar()  # ya retirado: no vuelve a escribir
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,153 @@
+"""
+Tests del motor de usuarios en memoria (log de escrituras e instantáneas)
+"""
+
+import os
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from app.core.memory_store import AlmacenMemoria, SesionMemoria
+from app.database import crear_motor, get_db
+from app.main import app
+from app.schemas.user import UsuarioActualizar, UsuarioCrear
+from app.core.memory_store import importar_de_sqlalchemy
+from app.services.user_service import UsuarioService
+from tests.conftest import override_get_db
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenMemoria(str(tmp_path / "memoria.db"))
+    almacen.cargar()
+    yield almacen
+    almacen.cerrar()
+
+
+def _crear(db, n: int):
+    return [
+        UsuarioService.crear_usuario(db, UsuarioCrear(nombre=f"Usuario {i}", email=f"u{i}@memoria.com", edad=20 + i))
+        for i in range(n)
+    ]
+
+
+def test_crud_y_errores(almacen):
+    db = SesionMemoria(almacen)
+    creados = _crear(db, 5)
+    assert [u.id for u in creados] == [1, 2, 3, 4, 5]
+    assert UsuarioService.obtener_usuario_por_email(db, "u3@memoria.com").id == 4
+
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.crear_usuario(db, UsuarioCrear(nombre="Otro", email="u0@memoria.com"))
+    assert error.value.status_code == 400
+
+    actualizado = UsuarioService.actualizar_usuario(db, 2, UsuarioActualizar(edad=50), version_esperada=1)
+    assert actualizado.edad == 50 and actualizado.version == 2
+    # El registro entregado antes no cambia: las escrituras crean uno nuevo
+    assert creados[1].edad == 21
+
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.actualizar_usuario(db, 2, UsuarioActualizar(edad=1), version_esperada=1)
+    assert error.value.status_code == 412
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.actualizar_usuario(db, 3, UsuarioActualizar(email="u0@memoria.com"))
+    assert error.value.status_code == 400
+
+    UsuarioService.actualizar_usuario(db, 3, UsuarioActualizar(email="nuevo@memoria.com"))
+    assert UsuarioService.obtener_usuario_por_email(db, "u2@memoria.com") is None
+    assert UsuarioService.eliminar_usuario(db, 1)
+    with pytest.raises(HTTPException) as error:
+        UsuarioService.obtener_usuario_por_id(db, 1)
+    assert error.value.status_code == 404
+
+
+def test_indices_de_listado_y_estadisticas(almacen):
+    db = SesionMemoria(almacen)
+    _crear(db, 10)
+    for usuario_id in (2, 5, 7):
+        UsuarioService.actualizar_usuario(db, usuario_id, UsuarioActualizar(activo=False))
+
+    assert [u.id for u in UsuarioService.obtener_usuarios(db, skip=3, limit=4)] == [4, 5, 6, 7]
+    assert [u.id for u in UsuarioService.obtener_usuarios(db, activo=False)] == [2, 5, 7]
+    assert [u.id for u in UsuarioService.obtener_usuarios(db, skip=1, limit=2, activo=True)] == [3, 4]
+    assert UsuarioService.obtener_estadisticas(db) == {
+        "total_usuarios": 10,
+        "usuarios_activos": 7,
+        "usuarios_inactivos": 3,
+        "usuarios_hoy": 10,
+    }
+
+
+def test_recuperacion_desde_el_log(tmp_path):
+    ruta = str(tmp_path / "memoria.db")
+    almacen = AlmacenMemoria(ruta)
+    almacen.cargar()
+    db = SesionMemoria(almacen)
+    _crear(db, 3)
+    UsuarioService.actualizar_usuario(db, 2, UsuarioActualizar(nombre="Cambiado"))
+    UsuarioService.eliminar_usuario(db, 3)
+    # Caída sin instantánea y con la última línea a medias
+    with open(almacen.ruta_log, "ab") as f:
+        f.write(b'{"op": "c", "r": [9')
+
+    recuperado = AlmacenMemoria(ruta)
+    resumen = recuperado.cargar()
+    assert resumen["entradas_log"] == 5
+    assert sorted(recuperado.por_id) == [1, 2]
+    assert recuperado.obtener(2).nombre == "Cambiado"
+    assert recuperado.obtener(2).version == 2
+
+    # Las escrituras nuevas no quedan detrás de la línea cortada
+    recuperado.crear({"nombre": "Tras", "email": "tras@memoria.com"})
+    otra_vez = AlmacenMemoria(ruta)
+    otra_vez.cargar()
+    assert otra_vez.obtener_por_email("tras@memoria.com") is not None
+    assert len(otra_vez.por_id) == 3
+    for a in (almacen, recuperado, otra_vez):
+        a.cerrar()
+
+
+def test_instantanea_legible_por_sqlalchemy(tmp_path):
+    ruta = str(tmp_path / "memoria.db")
+    almacen = AlmacenMemoria(ruta)
+    almacen.cargar()
+    db = SesionMemoria(almacen)
+    _crear(db, 4)
+    resumen = almacen.instantanea()
+    assert resumen["usuarios"] == 4
+    assert os.path.getsize(almacen.ruta_log) == 0
+    UsuarioService.eliminar_usuario(db, 4)
+    almacen.cerrar()
+
+    # La instantánea final tiene el mismo esquema que la BD principal
+    motor = crear_motor(f"sqlite:///{ruta}")
+    sesion = sessionmaker(bind=motor)()
+    try:
+        usuarios = UsuarioService.obtener_usuarios(sesion)
+        assert [u.email for u in usuarios] == ["u0@memoria.com", "u1@memoria.com", "u2@memoria.com"]
+
+        # Primer arranque de otro almacén: importa desde SQLAlchemy
+        importado = AlmacenMemoria(str(tmp_path / "importado.db"))
+        resumen = importado.cargar(lambda: importar_de_sqlalchemy(sessionmaker(bind=motor)))
+        assert resumen["origen"] == "importacion" and resumen["usuarios"] == 3
+        assert importado.obtener(2).created_at == usuarios[1].created_at
+        importado.cerrar()
+    finally:
+        sesion.close()
+        motor.dispose()
+
+
+def test_api_con_motor_en_memoria(client, almacen):
+    app.dependency_overrides[get_db] = lambda: SesionMemoria(almacen)
+    try:
+        respuesta = client.post("/api/usuarios/", json={"nombre": "Ana", "email": "ana@memoria.com", "edad": 30})
+        assert respuesta.status_code == 201
+        usuario = respuesta.json()
+        assert client.get(f"/api/usuarios/{usuario['id']}").json()["email"] == "ana@memoria.com"
+        respuesta = client.put(f"/api/usuarios/{usuario['id']}", json={"edad": 31})
+        assert respuesta.status_code == 200 and respuesta.json()["version"] == 2
+        assert client.get("/api/usuarios/").json()[0]["nombre"] == "Ana"
+        assert client.get("/api/estadisticas").json()["total_usuarios"] == 1
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
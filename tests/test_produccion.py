@@ -0,0 +1,48 @@
+"""
+Tests del modo multi-worker: versión de datos compartida y SQLite en WAL
+"""
+
+from sqlalchemy import create_engine
+
+from app.core.versioning import DataVersion
+from app.database import configurar_sqlite
+
+
+def test_version_compartida_entre_procesos(tmp_path):
+    ruta = str(tmp_path / "data_version")
+    worker_a, worker_b = DataVersion(), DataVersion()
+    worker_a.compartir(ruta)
+    worker_b.compartir(ruta)
+
+    assert worker_a.token == worker_b.token
+    assert worker_a.incrementar() == 1
+    assert worker_b.valor == 1
+    assert worker_b.incrementar() == 2
+    assert worker_a.etag() == worker_b.etag()
+    assert worker_a.ultima_modificacion == worker_b.ultima_modificacion
+
+
+def test_pragmas_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    configurar_sqlite(engine, wal=True, busy_timeout_ms=1234)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+    engine.dispose()
+
+
+def test_produccion_desactiva_recarga_de_estaticos(monkeypatch):
+    import run
+    from app.config import settings
+    from app.core.static_assets import manifiesto_estaticos
+
+    llamadas = []
+    # setenv registra el valor original para que el test no deje la variable definida
+    monkeypatch.setenv("STATIC_RELOAD", "")
+    monkeypatch.delenv("STATIC_RELOAD")
+    monkeypatch.setattr(settings, "static_reload", True)
+    monkeypatch.setattr(manifiesto_estaticos, "recargar", True)
+    monkeypatch.setattr(run.uvicorn, "run", lambda *args, **kwargs: llamadas.append(kwargs))
+    # Un worker: uvicorn sirve en este proceso la app ya importada
+    run.produccion("127.0.0.1", 8000, 1)
+    assert llamadas and not settings.static_reload and not manifiesto_estaticos.recargar
@@ -0,0 +1,28 @@
+"""
+Tests del profiler de muestreo
+"""
+
+from app.config import settings
+
+
+def test_perfil_requiere_token(client, admin, monkeypatch):
+    assert client.get("/api/admin/perfil?segundos=0.05", headers={"X-Admin-Token": "otro"}).status_code == 401
+
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert client.get("/api/admin/perfil?segundos=0.05").status_code == 403
+
+
+def test_perfil_devuelve_pilas_colapsadas(client, admin):
+    r = client.get("/api/admin/perfil?segundos=0.2&intervalo_ms=1&incluir_ociosos=true", headers=admin)
+    assert r.status_code == 200
+    linea = r.text.splitlines()[0]
+    pila, cuenta = linea.rsplit(" ", 1)
+    assert ";" in pila and int(cuenta) >= 1
+
+
+def test_perfil_de_una_peticion(client, admin):
+    r = client.get("/api/usuarios/", headers={**admin, "X-Profile": "1"})
+    perfil_id = r.headers["x-profile-id"]
+
+    perfil = client.get(f"/api/admin/perfil/peticiones/{perfil_id}", headers=admin)
+    assert perfil.status_code == 200
@@ -0,0 +1,33 @@
+"""
+Tests del generador de datos sintéticos
+"""
+
+import sqlite3
+
+from scripts.seed_usuarios import cargar, generar_usuarios
+
+
+def test_generacion_determinista():
+    primera = list(generar_usuarios(500, semilla=7))
+    assert primera == list(generar_usuarios(500, semilla=7))
+    assert primera != list(generar_usuarios(500, semilla=8))
+
+    emails = [fila[1] for fila in primera]
+    assert len(set(emails)) == len(emails)
+    fechas = [fila[4] for fila in primera]
+    assert fechas == sorted(fechas)
+
+
+def test_carga_y_anexado(tmp_path):
+    ruta = str(tmp_path / "seed.db")
+    cargar(ruta, 1000, lote=300)
+    cargar(ruta, 200, semilla=43)
+
+    conn = sqlite3.connect(ruta)
+    try:
+        total, distintos = conn.execute("SELECT COUNT(*), COUNT(DISTINCT email) FROM usuarios").fetchone()
+        indices = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+    assert total == distintos == 1200
+    assert "ix_usuarios_email" in indices
@@ -0,0 +1,107 @@
+"""
+Tests del resumen de registros y la serie /api/estadisticas/serie
+"""
+
+import uuid
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.core.memory_store import AlmacenMemoria, SesionMemoria
+from app.core.signups import reconstruir_resumen, serie_registros
+from app.database import crear_esquema, crear_motor
+from app.models import ResumenRegistrosORM, UsuarioORM
+from app.services.user_service import UsuarioService
+
+# 2024-03-10 02:30 UTC es el 9 de marzo en Santiago (UTC-3)
+FECHAS = [datetime(2024, 3, 10, 2, 30), datetime(2024, 3, 10, 2, 45), datetime(2024, 3, 11, 15, 0),
+          datetime(2024, 3, 18, 9, 0)]
+
+
+@pytest.fixture
+def sesiones(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "signup_rollup_zones", "America/Santiago")
+    motor = crear_motor(f"sqlite:///{tmp_path / 'serie.db'}")
+    crear_esquema(motor)
+    yield sessionmaker(bind=motor)
+    motor.dispose()
+
+
+def _resumen(db) -> dict:
+    return {(f.zona, f.granularidad, f.inicio): f.usuarios for f in db.query(ResumenRegistrosORM) if f.usuarios}
+
+
+def _serie(db, intervalo, desde, hasta, zona):
+    return serie_registros(
+        lambda *args: UsuarioService.obtener_conteos_registros(db, *args), intervalo, desde, hasta, zona
+    )
+
+
+def test_resumen_incremental_coincide_con_reconstruccion(sesiones):
+    db = sesiones()
+    for i, fecha in enumerate(FECHAS):
+        db.add(UsuarioORM(nombre=f"Serie {i}", email=f"serie{i}@test.com", created_at=fecha))
+        db.commit()
+    db.delete(db.query(UsuarioORM).filter_by(email="serie3@test.com").one())
+    db.commit()
+
+    incremental = _resumen(db)
+    assert incremental[("UTC", "hora", "2024-03-10T02")] == 2
+    assert incremental[("America/Santiago", "dia", "2024-03-09")] == 2
+    assert incremental[("UTC", "dia", "2024-03-10")] == 2
+    with db.get_bind().begin() as conn:
+        assert reconstruir_resumen(conn)["usuarios"] == 3
+    db.expire_all()
+    assert _resumen(db) == incremental
+    db.close()
+
+
+def test_serie_por_zona_e_intervalo(sesiones):
+    db = sesiones()
+    for i, fecha in enumerate(FECHAS):
+        db.add(UsuarioORM(nombre=f"Serie {i}", email=f"serie{i}@test.com", created_at=fecha))
+    db.commit()
+
+    santiago = _serie(db, "dia", date(2024, 3, 9), date(2024, 3, 11), "America/Santiago")
+    assert santiago["fuente"] == "dia" and santiago["filas_leidas"] == 2
+    assert [p["usuarios"] for p in santiago["puntos"]] == [2, 0, 1]
+    # Zona sin resumen diario: se agrupan las horas UTC, con el mismo resultado
+    lima = _serie(db, "dia", date(2024, 3, 9), date(2024, 3, 11), "America/Lima")
+    assert lima["fuente"] == "hora" and [p["usuarios"] for p in lima["puntos"]] == [2, 0, 1]
+
+    semanas = _serie(db, "semana", date(2024, 3, 1), date(2024, 3, 31), "UTC")
+    assert [(p["inicio"], p["usuarios"]) for p in semanas["puntos"] if p["usuarios"]] == [
+        ("2024-03-04", 2), ("2024-03-11", 1), ("2024-03-18", 1)
+    ]
+    horas = _serie(db, "hora", date(2024, 3, 9), date(2024, 3, 9), "America/Santiago")
+    assert len(horas["puntos"]) == 24
+    assert horas["puntos"][23] == {"inicio": "2024-03-09T23:00:00-03:00", "usuarios": 2}
+
+    # El motor en memoria calcula lo mismo sin tabla de resumen
+    almacen = AlmacenMemoria(str(db.get_bind().url.database))
+    almacen.cargar()
+    memoria = _serie(SesionMemoria(almacen), "dia", date(2024, 3, 9), date(2024, 3, 11), "America/Santiago")
+    assert memoria["puntos"] == santiago["puntos"]
+    almacen.cerrar()
+    db.close()
+
+
+def test_endpoint_serie(client):
+    client.post("/api/usuarios/", json={"nombre": "Serie", "email": f"{uuid.uuid4().hex[:8]}@test.com"})
+    hoy = datetime.utcnow().date().isoformat()
+
+    respuesta = client.get("/api/estadisticas/serie", params={"desde": hoy, "hasta": hoy, "intervalo": "hora"})
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()["puntos"]) == 24 and respuesta.json()["total"] >= 1
+    assert client.get(
+        "/api/estadisticas/serie", params={"desde": hoy, "hasta": hoy}, headers={"If-None-Match": respuesta.headers["etag"]}
+    ).status_code == 304
+    assert client.get(
+        "/api/estadisticas/serie", params={"desde": hoy, "hasta": hoy, "zona": "Marte/Olympus"}
+    ).status_code == 400
+    assert client.get(
+        "/api/estadisticas/serie", params={"desde": "2000-01-01", "hasta": hoy, "intervalo": "hora"}
+    ).status_code == 400
+    assert client.get("/api/estadisticas/serie", params={"desde": hoy, "hasta": "2000-01-01"}).status_code == 400
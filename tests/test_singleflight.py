@@ -0,0 +1,48 @@
+"""
+Tests de coalescencia de lecturas (single-flight)
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_lecturas_simultaneas_ejecutan_una_sola_vez():
+    sf = SingleFlight()
+    llamadas = []
+    inicio = threading.Barrier(5)
+
+    def consulta():
+        llamadas.append(1)
+        time.sleep(0.2)
+        return ["resultado"]
+
+    def peticion(resultados):
+        inicio.wait()
+        resultados.append(sf.ejecutar(("listar", 0, 100), consulta))
+
+    resultados = []
+    hilos = [threading.Thread(target=peticion, args=(resultados,)) for _ in range(5)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert len(llamadas) == 1
+    assert resultados == [["resultado"]] * 5
+    assert sf.estado()["coalescidas"] == 4
+    assert sf.estado()["en_curso"] == 0
+
+
+def test_error_se_propaga_y_libera_la_clave():
+    sf = SingleFlight()
+
+    def falla():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        sf.ejecutar("clave", falla)
+    assert sf.ejecutar("clave", lambda: 42) == 42
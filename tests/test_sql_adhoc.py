@@ -0,0 +1,113 @@
+"""
+Tests de las consultas SQL ad hoc de solo lectura (/api/admin/sql)
+"""
+
+import json
+import os
+
+import pytest
+
+from app.config import settings
+from app.core import adhoc_sql
+from app.core.adhoc_sql import (
+    ConsultaInterrumpida,
+    ConsultaRechazada,
+    ConsultasAdHoc,
+    SinConexionLibre,
+    consultas_adhoc,
+    normalizar,
+)
+from scripts.seed_usuarios import cargar
+
+INFINITA = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+@pytest.fixture(scope="module")
+def ruta(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp("adhoc") / "adhoc.db")
+    cargar(ruta, 2000, semilla=7)
+    return ruta
+
+
+@pytest.fixture
+def consultas(ruta):
+    ejecutor = ConsultasAdHoc(lambda: [ruta])
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def _leer(lineas) -> list:
+    return [json.loads(linea) for trozo in lineas for linea in trozo.splitlines()]
+
+
+def test_normalizar():
+    assert normalizar("  SELECT *\n\tFROM usuarios -- todos\n WHERE nombre = 'a  b';  ") == (
+        "SELECT * FROM usuarios WHERE nombre = 'a  b'"
+    )
+    assert normalizar("SELECT /* x */ 1") == normalizar("SELECT 1")
+
+
+def test_solo_lectura(consultas, ruta):
+    modificado = os.path.getmtime(ruta)
+    for sql in (
+        "DELETE FROM usuarios",
+        "UPDATE usuarios SET nombre = 'x'",
+        "PRAGMA journal_mode = DELETE",
+        f"ATTACH DATABASE '{ruta}' AS otra",
+        "SELECT 1; DELETE FROM usuarios",
+        "SELEC 1",
+        "",
+    ):
+        with pytest.raises(ConsultaRechazada):
+            consultas.ejecutar(sql)
+    assert os.path.getmtime(ruta) == modificado
+    assert consultas.estado()["rechazadas"] == 6
+
+
+def test_limite_de_filas_y_cache_de_planes(consultas):
+    encabezado, lineas = consultas.ejecutar("SELECT id, email FROM usuarios ORDER BY id", limite=1200)
+    filas = _leer(lineas)
+    assert filas[0]["columnas"] == ["id", "email"] and filas[0]["plan"]
+    assert [f["id"] for f in filas[1:-1]] == list(range(1, 1201))
+    assert filas[-1]["fin"] is True and filas[-1]["filas"] == 1200 and filas[-1]["truncado"] is True
+
+    _, lineas = consultas.ejecutar("select count(*) AS n from usuarios")
+    assert _leer(lineas)[1] == {"n": 2000}
+
+    encabezado, lineas = consultas.ejecutar("SELECT id,  email\nFROM usuarios ORDER BY id -- otra vez", limite=3)
+    assert encabezado["plan_en_cache"] is True
+    assert _leer(lineas)[-1]["truncado"] is True
+    assert consultas.estado()["truncadas"] == 2
+
+
+def test_tiempo_y_conexiones_acotados(consultas, monkeypatch):
+    monkeypatch.setattr(settings, "adhoc_sql_timeout_ms", 50)
+    with pytest.raises(ConsultaInterrumpida):
+        consultas.ejecutar(INFINITA)
+    assert consultas.estado()["interrumpidas"] == 1
+
+    monkeypatch.setattr(settings, "adhoc_sql_connections", 1)
+    monkeypatch.setattr(adhoc_sql, "ESPERA_CONEXION", 0.01)
+    _, pendiente = consultas.ejecutar("SELECT id FROM usuarios")
+    with pytest.raises(SinConexionLibre):
+        consultas.ejecutar("SELECT 1")
+    pendiente.close()  # el cliente se desconectó: la conexión vuelve al pool
+    _, lineas = consultas.ejecutar("SELECT 1 AS uno")
+    assert _leer(lineas)[1] == {"uno": 1}
+
+
+def test_endpoint(client, ruta, admin, monkeypatch):
+    monkeypatch.setattr(consultas_adhoc, "_rutas", lambda: [ruta])
+    params = {"consulta": "SELECT activo, count(*) AS n FROM usuarios GROUP BY activo", "limite": 10}
+
+    assert client.get("/api/admin/sql", params=params).status_code == 401
+    respuesta = client.get("/api/admin/sql", params=params, headers=admin)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert sum(fila["n"] for fila in lineas[1:-1]) == 2000 and lineas[-1]["truncado"] is False
+
+    assert client.get("/api/admin/sql", params={"consulta": "DROP TABLE usuarios"}, headers=admin).status_code == 400
+    monkeypatch.setattr(settings, "adhoc_sql_timeout_ms", 50)
+    assert client.get("/api/admin/sql", params={"consulta": INFINITA}, headers=admin).status_code == 408
+    assert client.get("/api/admin/sql/estado", headers=admin).json()["interrumpidas"] >= 1
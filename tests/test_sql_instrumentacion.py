@@ -0,0 +1,63 @@
+"""
+Tests de instrumentación SQL (Server-Timing, N+1, consultas lentas)
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.queries import monitor_consultas
+from app.database import SessionLocal
+from app.middleware.queries import QueryStatsMiddleware
+
+
+def test_server_timing_cuenta_consultas(client):
+    r = client.get("/api/usuarios/")
+    timing = r.headers["server-timing"]
+    assert 'db;dur=' in timing
+    assert 'desc="1 consultas"' in timing
+    assert "n-mas-1" not in timing
+
+
+def test_estadisticas_en_una_consulta(client):
+    antes = monitor_consultas.peticiones_n_mas_1
+    r = client.get("/api/estadisticas")
+    assert 'desc="1 consultas"' in r.headers["server-timing"]
+    assert "n-mas-1" not in r.headers["server-timing"]
+    assert monitor_consultas.peticiones_n_mas_1 == antes
+
+
+def test_consulta_por_fila_se_marca_como_n_mas_1():
+    app = FastAPI()
+
+    @app.get("/por-fila")
+    def por_fila():
+        with SessionLocal() as db:
+            for usuario_id in range(3):
+                db.execute(text("SELECT nombre FROM usuarios WHERE id = :id"), {"id": usuario_id})
+        return {}
+
+    antes = monitor_consultas.peticiones_n_mas_1
+    r = TestClient(QueryStatsMiddleware(app, max_lecturas=2)).get("/por-fila")
+    assert 'n-mas-1;desc="3 > 2"' in r.headers["server-timing"]
+    assert monitor_consultas.peticiones_n_mas_1 == antes + 1
+
+
+def test_consulta_lenta_guarda_plan(client, monkeypatch):
+    monkeypatch.setattr(monitor_consultas, "umbral_lenta", 0.0)
+    client.get("/api/usuarios/?activo=true")
+
+    lenta = monitor_consultas.consultas_lentas_recientes()[0]
+    assert "FROM usuarios" in lenta["sql"]
+    assert lenta["plan"]
+
+
+def test_consultas_lentas_sin_valores_y_con_admin(client, admin, monkeypatch):
+    monkeypatch.setattr(monitor_consultas, "umbral_lenta", 0.0)
+    client.post("/api/usuarios/", json={"nombre": "Lenta", "email": "secreto-lenta@ejemplo.com"})
+
+    assert client.get("/api/sql/lentas").status_code == 401
+    assert client.get("/api/sql/estado").status_code == 401
+    lentas = client.get("/api/sql/lentas", headers=admin).json()
+    assert lentas and all("secreto-lenta@ejemplo.com" not in lenta["parametros"] for lenta in lentas)
+    assert any("str" in lenta["parametros"] for lenta in lentas)